@@ -114,6 +114,11 @@ const AdminDashboard = () => {
   const [analysesTotal, setAnalysesTotal] = useState(0);
   const [loadingAnalyses, setLoadingAnalyses] = useState(false);
 
+  const [statsDays, setStatsDays] = useState(30);
+  const [statsSummary, setStatsSummary] = useState(null);
+  const [leaderboard, setLeaderboard] = useState([]);
+  const [loadingStats, setLoadingStats] = useState(false);
+
   const initialAgentState = {
     name: '',
     email: '',
@@ -174,13 +179,38 @@ const AdminDashboard = () => {
     }
   };
 
+  // Precomputed per-agent daily rollups, so this doesn't scan the history
+  const fetchStatistics = async () => {
+    setLoadingStats(true);
+    try {
+      const [rollups, ranking] = await Promise.all([
+        axiosAuth.get('http://localhost:8080/api/analysis-history/admin/rollups', {
+          params: { days: statsDays }
+        }),
+        axiosAuth.get('http://localhost:8080/api/analysis-history/admin/leaderboard', {
+          params: { days: statsDays, minCount: 5 }
+        })
+      ]);
+
+      setStatsSummary(rollups.data.summary);
+      setLeaderboard(ranking.data.agents);
+    } catch (error) {
+      console.error('Error fetching statistics:', error);
+      setError('Failed to fetch statistics');
+    } finally {
+      setLoadingStats(false);
+    }
+  };
+
   useEffect(() => {
     if (activeTab === 0) {
       fetchAgents();
+    } else if (activeTab === 1) {
+      fetchStatistics();
     } else if (activeTab === 2) {
       fetchAllAnalyses();
     }
-  }, [activeTab, analysesPage, analysesRowsPerPage]);
+  }, [activeTab, analysesPage, analysesRowsPerPage, statsDays]);
 
   const handleAddNewClick = () => {
     setIsNewAgent(true);
@@ -407,9 +437,104 @@ const AdminDashboard = () => {
 
         {activeTab === 1 && (
           <Box sx={{ p: 3 }}>
-            <Typography variant="h5">
-              Statistics Dashboard (Coming soon)
-            </Typography>
+            <Box sx={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', mb: 3 }}>
+              <Typography variant="h5" fontWeight="bold">
+                Statistics
+              </Typography>
+              <FormControl size="small" sx={{ minWidth: 140 }}>
+                <InputLabel>Period</InputLabel>
+                <Select
+                  value={statsDays}
+                  onChange={(e) => setStatsDays(e.target.value)}
+                  label="Period"
+                >
+                  <MenuItem value={1}>Today</MenuItem>
+                  <MenuItem value={7}>Last 7 days</MenuItem>
+                  <MenuItem value={30}>Last 30 days</MenuItem>
+                  <MenuItem value={90}>Last 90 days</MenuItem>
+                </Select>
+              </FormControl>
+            </Box>
+
+            {loadingStats || !statsSummary ? (
+              <Box sx={{ display: 'flex', justifyContent: 'center', p: 3 }}>
+                <CircularProgress />
+              </Box>
+            ) : (
+              <>
+                <Stack direction="row" spacing={2} sx={{ mb: 3 }}>
+                  {[
+                    ['Analyses', statsSummary.count],
+                    ['Mean score', statsSummary.score.mean.toFixed(1)],
+                    ['Median score', statsSummary.score.p50.toFixed(1)],
+                    ['Score spread (p10 – p90)', `${statsSummary.score.p10.toFixed(1)} – ${statsSummary.score.p90.toFixed(1)}`],
+                    ['Mean confidence', `${statsSummary.confidence.mean.toFixed(1)}%`]
+                  ].map(([label, value]) => (
+                    <Paper key={label} variant="outlined" sx={{ p: 2, flex: 1 }}>
+                      <Typography variant="body2" color="text.secondary">{label}</Typography>
+                      <Typography variant="h6" fontWeight="bold">{value}</Typography>
+                    </Paper>
+                  ))}
+                </Stack>
+
+                <Box sx={{ display: 'flex', flexWrap: 'wrap', gap: 1, mb: 3 }}>
+                  {Object.entries(statsSummary.sentiments)
+                    .sort((a, b) => b[1] - a[1])
+                    .map(([sentiment, count]) => (
+                      <Chip
+                        key={sentiment}
+                        label={`${sentiment}: ${count}`}
+                        size="small"
+                        sx={{
+                          backgroundColor: getSentimentColor(sentiment.split(' ').pop()),
+                          color: 'white'
+                        }}
+                      />
+                    ))}
+                </Box>
+
+                <Typography variant="h6" gutterBottom>
+                  Agent Leaderboard
+                </Typography>
+                <TableContainer>
+                  <Table size="small">
+                    <TableHead>
+                      <TableRow>
+                        <TableCell>Rank</TableCell>
+                        <TableCell>Agent</TableCell>
+                        <TableCell>Department</TableCell>
+                        <TableCell>Analyses</TableCell>
+                        <TableCell>Mean Score</TableCell>
+                        <TableCell>Median Score</TableCell>
+                        <TableCell>Std Dev</TableCell>
+                        <TableCell>Mean Confidence</TableCell>
+                      </TableRow>
+                    </TableHead>
+                    <TableBody>
+                      {leaderboard.map((entry) => (
+                        <TableRow key={entry.agent._id}>
+                          <TableCell>{entry.rank}</TableCell>
+                          <TableCell>{entry.agent.name || 'Deleted agent'}</TableCell>
+                          <TableCell>{entry.agent.department}</TableCell>
+                          <TableCell>{entry.count}</TableCell>
+                          <TableCell>{entry.score.mean.toFixed(1)}</TableCell>
+                          <TableCell>{entry.score.p50.toFixed(1)}</TableCell>
+                          <TableCell>{entry.score.stddev.toFixed(1)}</TableCell>
+                          <TableCell>{entry.confidence.mean.toFixed(1)}%</TableCell>
+                        </TableRow>
+                      ))}
+                      {leaderboard.length === 0 && (
+                        <TableRow>
+                          <TableCell colSpan={8} align="center">
+                            No agents with enough analyses in this period
+                          </TableCell>
+                        </TableRow>
+                      )}
+                    </TableBody>
+                  </Table>
+                </TableContainer>
+              </>
+            )}
           </Box>
         )}
 
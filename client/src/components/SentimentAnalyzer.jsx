@@ -231,6 +231,49 @@ const InfoTooltip = styled(({ className, ...props }) => (
   }
 });
 
+// Index order of the int8 state codes in a packed timeline
+const TIMELINE_STATES = [
+  'extremely negative', 'very negative', 'moderately negative', 'slightly negative',
+  'neutral',
+  'slightly positive', 'moderately positive', 'very positive', 'extremely positive',
+  'factual'
+];
+
+const TIMELINE_POINTS = 120;
+
+const decodeArray = (base64, ArrayType) => {
+  const bytes = Uint8Array.from(atob(base64), (char) => char.charCodeAt(0));
+  return new ArrayType(bytes.buffer);
+};
+
+// Sparkline of the per-sentence scores returned with `timeline`
+const TimelineChart = ({ timeline }) => {
+  if (!timeline || !timeline.points) {
+    return null;
+  }
+
+  const index = decodeArray(timeline.index, Uint32Array);
+  const scores = decodeArray(timeline.score, Float32Array);
+  const states = decodeArray(timeline.state, Int8Array);
+
+  const width = 600;
+  const height = 120;
+  const lastIndex = Math.max(timeline.count - 1, 1);
+  const x = (i) => (index[i] / lastIndex) * width;
+  const y = (score) => ((1 - score) / 2) * height;
+  const path = Array.from(scores, (score, i) => `${x(i).toFixed(1)},${y(score).toFixed(1)}`).join(' ');
+
+  return (
+    <svg viewBox={`0 0 ${width} ${height}`} width="100%" height={height} preserveAspectRatio="none">
+      <line x1="0" x2={width} y1={height / 2} y2={height / 2} stroke="#e2e8f0" />
+      <polyline points={path} fill="none" stroke="#64748b" strokeWidth="1.5" />
+      {Array.from(scores, (score, i) => (
+        <circle key={i} cx={x(i)} cy={y(score)} r="2.5" fill={SENTIMENT_COLORS[TIMELINE_STATES[states[i]]]} />
+      ))}
+    </svg>
+  );
+};
+
 const SentimentAnalyzer = () => {
   const [text, setText] = useState('');
   const [result, setResult] = useState(null);
@@ -263,7 +306,7 @@ const SentimentAnalyzer = () => {
       
       const response = await axios.post(
         'http://localhost:8080/api/sentiment/analyze', 
-        { text },
+        { text, timeline: { points: TIMELINE_POINTS } },
         { 
           headers: {
             'Content-Type': 'application/json',
@@ -490,6 +533,15 @@ const SentimentAnalyzer = () => {
                   </Grid>
                 </Grid>
               </MetricCard>
+
+              {result.timeline && result.timeline.points > 1 && (
+                <MetricCard>
+                  <Typography variant="subtitle1" color="#64748b" gutterBottom>
+                    Emotional Timeline
+                  </Typography>
+                  <TimelineChart timeline={result.timeline} />
+                </MetricCard>
+              )}
             </Box>
           </Fade>
         )}
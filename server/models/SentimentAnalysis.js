@@ -41,7 +41,27 @@ const sentimentAnalysisSchema = new mongoose.Schema({
     emotionalRange: {
       min: Number,
       max: Number
-    }
+    },
+    // Shifts in the mean score (see python_services/changepoints.py)
+    changePoints: [{
+      _id: false,
+      index: Number,
+      speaker: String,
+      before: Number,
+      after: Number,
+      shift: Number,
+      kind: { type: String, enum: ['escalation', 'de-escalation'] }
+    }]
+  },
+  // Per-sentence trajectory as base64 little-endian arrays (see timeline.py)
+  timeline: {
+    count: Number,
+    points: Number,
+    method: String,
+    index: String,  // uint32 sentence positions
+    score: String,  // float32
+    speaker: String,  // int8, 0 = Customer, 1 = Agent
+    state: String  // int8 index into the emotional states
   }
 }, {
   timestamps: true,
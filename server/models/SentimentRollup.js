@@ -0,0 +1,37 @@
+const mongoose = require('mongoose');
+
+// Running totals of one agent's analyses on one UTC day, maintained with
+// $inc as analyses are saved and deleted (see services/rollups.js)
+const momentsSchema = new mongoose.Schema({
+  sum: { type: Number, default: 0 },
+  sumSq: { type: Number, default: 0 }
+}, { _id: false });
+
+const sentimentRollupSchema = new mongoose.Schema({
+  agent: {
+    type: mongoose.Schema.Types.ObjectId,
+    ref: 'Agent',
+    required: true
+  },
+  day: {
+    type: String,  // YYYY-MM-DD, UTC
+    required: true
+  },
+  count: { type: Number, default: 0 },
+  sentiments: { type: Map, of: Number, default: {} },
+  emotions: { type: Map, of: Number, default: {} },
+  score: { type: momentsSchema, default: () => ({}) },
+  confidence: { type: momentsSchema, default: () => ({}) },
+  // Score histogram: bin index -> count, only non-empty bins are stored
+  scoreBins: { type: Map, of: Number, default: {} }
+}, {
+  timestamps: true,
+  minimize: true
+});
+
+sentimentRollupSchema.index({ agent: 1, day: 1 }, { unique: true });
+sentimentRollupSchema.index({ day: 1 });
+
+const SentimentRollup = mongoose.model('SentimentRollup', sentimentRollupSchema);
+
+module.exports = SentimentRollup;
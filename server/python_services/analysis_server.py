@@ -0,0 +1,272 @@
+import os
+import sys
+import json
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from sentiment_service import MultilingualSentimentAnalyzer, render_metrics, request_deadline
+
+class Overloaded(Exception):
+    """Raised when a request would push the queue past its bound"""
+
+class AnalysisServer:
+    """
+    asyncio front end for one MultilingualSentimentAnalyzer, speaking the
+    same newline-delimited JSON protocol as serve() over a Unix socket or
+    loopback TCP.
+
+    Concurrent analyze requests are collected into micro-batches, flushed
+    when max_batch texts are waiting or max_wait seconds after the first
+    one arrived. Each batch is translated on an I/O thread (prepare_batch)
+    and then scored on a CPU thread (score_batch), so the event loop never
+    blocks and one batch can translate while the previous one is scored.
+    Each stage has a single thread: the analyzer keeps translation state
+    on the I/O thread and scoring state on the CPU thread, and only the
+    caches and metrics, which lock, are shared between the two.
+
+    Requests that ask for a tier, a deadline or timings, and all requests
+    while the queue is backed up, are analyzed one at a time
+    so the tier planner can downgrade them. Beyond max_queue waiting texts
+    new work is refused with an "overloaded" error instead of queueing.
+    """
+
+    def __init__(self, analyzer, max_batch=32, max_wait=0.005, max_in_flight=2, max_queue=256):
+        self.analyzer = analyzer
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.waiting = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.served = 0
+        self._queue = None
+        self._in_flight = None
+        self._max_in_flight = max_in_flight
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prepare')
+        self._cpu = ThreadPoolExecutor(max_workers=1, thread_name_prefix='score')
+        self._batcher = None
+
+    async def start(self, path=None, host='127.0.0.1', port=None):
+        self._queue = asyncio.Queue()
+        self._in_flight = asyncio.Semaphore(self._max_in_flight)
+        self._batcher = asyncio.create_task(self._collect())
+        if path is not None:
+            if os.path.exists(path):
+                os.unlink(path)  # Left over from a previous run
+            return await asyncio.start_unix_server(self._handle_connection, path=path, limit=2 ** 26)
+        return await asyncio.start_server(self._handle_connection, host=host, port=port, limit=2 ** 26)
+
+    async def close(self):
+        if self._batcher is not None:
+            self._batcher.cancel()
+        self._io.shutdown(wait=False)
+        self._cpu.shutdown(wait=False)
+
+    def analyze(self, text, timeline=None):
+        """Queue one text for the next micro-batch; returns a future for its result"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((text, timeline, future))
+        return future
+
+    def _admit(self, count):
+        """Reserve room for count texts, or raise Overloaded"""
+        if self.waiting + count > self.max_queue:
+            self.rejected += count
+            raise Overloaded(f"Analysis queue is full ({self.waiting} waiting)")
+        self.waiting += count
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            flush_at = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if self._queue.empty():
+                    timeout = flush_at - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self._queue.get_nowait())
+
+            # While both stages are busy, requests keep piling up in the
+            # queue, so the next batch comes out bigger instead of later
+            await self._in_flight.acquire()
+            asyncio.create_task(self._run(batch))
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        texts = [text for text, _, _ in batch]
+        timelines = [timeline for _, timeline, _ in batch]
+        try:
+            prepared = await loop.run_in_executor(self._io, self.analyzer.prepare_batch, texts, timelines)
+            results = await loop.run_in_executor(self._cpu, self.analyzer.score_batch, prepared)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._in_flight.release()
+
+        self.batches += 1
+        self.batched_texts += len(batch)
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _run_single(self, request, backlog):
+        loop = asyncio.get_running_loop()
+        # Split like a batch, so translation stays on the I/O thread
+        prepared = await loop.run_in_executor(self._io, lambda: self.analyzer.prepare_analysis(
+            request.get("text"),
+            timeline=request.get("timeline"),
+            tier=request.get("tier") or 'full',
+            deadline=request_deadline(request),
+            backlog=backlog
+        ))
+        return await loop.run_in_executor(
+            self._cpu, self.analyzer.score_analysis, prepared, bool(request.get("timings"))
+        )
+
+    async def _handle_connection(self, reader, writer):
+        lock = asyncio.Lock()
+
+        async def send(message):
+            async with lock:
+                writer.write((json.dumps(message) + "\n").encode('utf-8'))
+                await writer.drain()
+
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                # Requests on one connection are answered as they finish, not in order
+                task = asyncio.create_task(self._respond(line, send))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+    async def _respond(self, line, send):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            op = request.get("op", "analyze")
+
+            if op == "ping":
+                result = {"status": "ok", "pid": os.getpid(), "served": self.served}
+            elif op == "stats":
+                result = self.stats()
+            elif op == "metrics":
+                result = render_metrics(self.analyzer)
+            elif op == "analyze":
+                deadline = request_deadline(request)
+                if deadline is not None and deadline <= 0:
+                    await send({"id": request_id, "error": "Deadline exceeded before analysis", "code": "deadline_exceeded"})
+                    return
+                self._admit(1)
+                try:
+                    # Work ahead of this request, in batch rounds: a burst
+                    # of small requests is what batching absorbs
+                    backlog = (self.waiting - 1) // self.max_batch
+                    special = any(request.get(key) for key in ("tier", "deadline_ms", "timings"))
+                    if special or backlog >= self.analyzer.planner.fast_backlog:
+                        result = await self._run_single(request, backlog)
+                    else:
+                        result = await self.analyze(request.get("text"), request.get("timeline"))
+                finally:
+                    self.waiting -= 1
+                self.served += 1
+            elif op == "batch":
+                texts = request.get("texts") or []
+                self._admit(len(texts))
+                try:
+                    result = list(await asyncio.gather(*(self.analyze(text) for text in texts)))
+                finally:
+                    self.waiting -= len(texts)
+                self.served += len(result)
+            else:
+                await send({"id": request_id, "error": f"Unknown op: {op}"})
+                return
+            await send({"id": request_id, "result": result})
+        except Overloaded as e:
+            await send({"id": request_id, "error": str(e), "code": "overloaded"})
+        except Exception as e:
+            await send({"id": request_id, "error": str(e)})
+
+    def stats(self):
+        analyzer = self.analyzer
+        caches = {
+            "translation_cache": analyzer.translation_cache,
+            "sentence_cache": analyzer.sentence_cache,
+            "result_cache": analyzer.result_cache
+        }
+        stats = {name: cache.stats() if cache is not None else None for name, cache in caches.items()}
+        stats["translation"] = analyzer.translation_stage.stats()
+        stats["batching"] = {
+            "batches": self.batches,
+            "texts": self.batched_texts,
+            "mean_batch": round(self.batched_texts / self.batches, 3) if self.batches else 0.0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "waiting": self.waiting,
+            "rejected": self.rejected
+        }
+        stats["tiers"] = {
+            "costs": dict(analyzer.planner.costs),
+            "downgrades": dict(analyzer.planner.downgrades)
+        }
+        return stats
+
+async def _serve_forever(args):
+    server = AnalysisServer(
+        MultilingualSentimentAnalyzer(),
+        max_batch=args.max_batch,
+        max_wait=args.max_wait_ms / 1000,
+        max_queue=args.max_queue
+    )
+    listener = await server.start(path=args.socket, host=args.host, port=args.port)
+    address = args.socket or f"{args.host}:{listener.sockets[0].getsockname()[1]}"
+    # Same ready event as serve(), so a parent process knows when to connect
+    print(json.dumps({"event": "ready", "pid": os.getpid(), "address": address}), flush=True)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.close()
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog='sentiment_service.py server',
+        description='Long-running analysis server with micro-batching'
+    )
+    parser.add_argument('--socket', help='Unix socket path to listen on')
+    parser.add_argument('--host', default='127.0.0.1', help='TCP host when no --socket is given')
+    parser.add_argument('--port', type=int, default=0, help='TCP port (default: any free port)')
+    parser.add_argument('--max-batch', type=int, default=32, help='largest micro-batch')
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help='longest a request waits for its batch to fill')
+    parser.add_argument('--max-queue', type=int, default=256, help='texts allowed to wait before new work is refused')
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(_serve_forever(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
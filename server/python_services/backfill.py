@@ -0,0 +1,409 @@
+import os
+import sys
+import json
+import time
+import struct
+import argparse
+from collections import deque
+from datetime import datetime, timezone
+
+import bulk
+from tiers import TierPlanner
+
+def journey_document(journey):
+    """An analyzer emotional_journey in the SentimentAnalysis schema's shape"""
+    return {
+        "start": {"score": journey["start"]["score"], "state": journey["start"]["state"]},
+        "end": {"score": journey["end"]["score"], "state": journey["end"]["state"]},
+        "fluctuation": journey["fluctuation"],
+        "stability": journey["stability"],
+        "trend": {"direction": journey["trend"]["direction"], "strength": journey["trend"]["strength"]},
+        "dominantEmotion": journey["dominant_emotion"],
+        "emotionalRange": {"min": journey["emotional_range"]["min"], "max": journey["emotional_range"]["max"]},
+        "changePoints": journey.get("change_points", [])
+    }
+
+def update_fields(result, fingerprint):
+    """
+    $set fields for one re-scored document, or None for an error result or
+    one from a lower tier, which must not be stamped with the fingerprint.
+    Everything else on the document (agent, text, timestamps) is left alone.
+    """
+    if result.get("error") or result.get("tier", 'full') != 'full':
+        return None
+    fields = {
+        "sentiment": result["sentiment"],
+        "score": result["score"],
+        "confidence": result["confidence"],
+        "emotionalJourney": journey_document(result["emotional_journey"]),
+        # Lets a later run skip documents already scored by the same analyzer
+        "analyzerFingerprint": fingerprint
+    }
+    if "timeline" in result:
+        fields["timeline"] = result["timeline"]
+    return fields
+
+class JsonlSource:
+    """
+    Records exported with mongoexport (one extended-JSON document per
+    line). The position is a byte offset, so resuming seeks straight back.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.invalid = 0
+
+    def pages(self, page_size, position=None):
+        with open(self.path, 'rb') as source:
+            source.seek(position or 0)
+            page = []
+            while True:
+                line = source.readline()
+                if not line:
+                    break
+                if line.strip():
+                    try:
+                        page.append(json.loads(line))
+                    except ValueError as e:
+                        self.invalid += 1
+                        print(f"Byte {source.tell() - len(line)}: invalid JSON ({e})", file=sys.stderr)
+                if len(page) >= page_size:
+                    yield page, source.tell()
+                    page = []
+            if page:
+                yield page, source.tell()
+
+class BsonSource:
+    """
+    A mongodump .bson file: length-prefixed BSON documents back to back.
+    Needs the bson package that ships with pymongo.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.invalid = 0
+
+    def pages(self, page_size, position=None):
+        import bson  # Deferred: only BSON dumps need pymongo
+        with open(self.path, 'rb') as source:
+            source.seek(position or 0)
+            page = []
+            while True:
+                prefix = source.read(4)
+                if len(prefix) < 4:
+                    break
+                length, = struct.unpack('<i', prefix)
+                body = source.read(length - 4)
+                if len(body) < length - 4:
+                    print(f"Truncated document at byte {source.tell() - len(body) - 4}", file=sys.stderr)
+                    break
+                page.append(bson.decode(prefix + body))
+                if len(page) >= page_size:
+                    yield page, source.tell()
+                    page = []
+            if page:
+                yield page, source.tell()
+
+class MongoSource:
+    """
+    A live collection (MongoDB or any server speaking its protocol), read
+    in _id order one page per query. The position is the last _id seen,
+    in extended JSON.
+    """
+
+    PROJECTION = {"text": 1, "analyzerFingerprint": 1, "timeline.points": 1, "timeline.method": 1}
+
+    def __init__(self, collection, projection=None):
+        self.collection = collection
+        self.projection = projection or self.PROJECTION
+        self.invalid = 0
+
+    def pages(self, page_size, position=None):
+        from bson import json_util
+        last = json_util.loads(position) if position else None
+        while True:
+            query = {"_id": {"$gt": last}} if last is not None else {}
+            page = list(self.collection.find(query, self.projection, sort=[("_id", 1)], limit=page_size))
+            if not page:
+                return
+            last = page[-1]["_id"]
+            yield page, json_util.dumps(last)
+
+class JsonlSink:
+    """
+    Writes one {"_id", ...fields} line per update, ready for
+    `mongoimport --mode=merge`. The position is the file size after the
+    last completed batch; resuming truncates anything written after it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._output = None
+
+    def resume(self, position=None):
+        self._output = open(self.path, 'ab' if position is not None else 'wb')
+        if position is not None:
+            self._output.truncate(position)
+            self._output.seek(position)
+
+    def write(self, updates, written_at):
+        stamp = {"$date": written_at.isoformat().replace('+00:00', 'Z')}
+        for document_id, fields in updates:
+            line = {"_id": document_id, **fields, "rescoredAt": stamp}
+            self._output.write((json.dumps(line) + "\n").encode('utf-8'))
+        self._output.flush()
+        os.fsync(self._output.fileno())
+
+    def position(self):
+        return self._output.tell()
+
+    def close(self):
+        if self._output is not None:
+            self._output.close()
+
+class MongoSink:
+    """Applies each batch as one unordered bulk_write of $set updates"""
+
+    def __init__(self, collection, update_one=None):
+        self.collection = collection
+        if update_one is None:
+            from pymongo import UpdateOne
+            update_one = UpdateOne
+        self.update_one = update_one
+
+    def resume(self, position=None):
+        pass  # Updates are idempotent; a replayed batch just rewrites the same values
+
+    def write(self, updates, written_at):
+        if updates:
+            self.collection.bulk_write(
+                [self.update_one({"_id": document_id}, {"$set": {**fields, "rescoredAt": written_at}})
+                 for document_id, fields in updates],
+                ordered=False
+            )
+
+    def position(self):
+        return None
+
+    def close(self):
+        pass
+
+class Throttle:
+    """Paces writes so the average rate stays at or below rate documents per second"""
+
+    def __init__(self, rate=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.clock = clock
+        self.sleep = sleep
+        self.slept = 0.0
+        self._next_at = None
+
+    def wait(self, count):
+        if not self.rate or not count:
+            return
+        now = self.clock()
+        if self._next_at is not None and self._next_at > now:
+            self.sleep(self._next_at - now)
+            self.slept += self._next_at - now
+            now = self._next_at
+        self._next_at = now + count / self.rate
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)
+
+def save_checkpoint(path, state):
+    # Written to a temporary file and renamed, so a crash never leaves half a checkpoint
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as target:
+        json.dump(state, target)
+        target.flush()
+        os.fsync(target.fileno())
+    os.replace(temporary, path)
+
+def _rescore_chunk(chunk):
+    """[(document id, result)] for [(document id, text, timeline options)]"""
+    analyzer = bulk.preloaded()
+    plain = [(i, text) for i, (_, text, timeline) in enumerate(chunk) if timeline is None]
+    results = [None] * len(chunk)
+    for (i, _), result in zip(plain, analyzer.analyze_batch([text for _, text in plain])):
+        results[i] = result
+    for i, (_, text, timeline) in enumerate(chunk):
+        if timeline is not None:
+            # A stored timeline is rebuilt at the same resolution
+            results[i] = analyzer.analyze(text, timeline=timeline)
+    return [(document_id, result) for (document_id, _, _), result in zip(chunk, results)]
+
+def _work(document, fingerprint, force):
+    """(id, text, timeline options) to re-score, or None to skip the document"""
+    text = document.get("text")
+    if not isinstance(text, str) or not text.strip():
+        return None
+    if not force and document.get("analyzerFingerprint") == fingerprint:
+        return None
+    timeline = document.get("timeline")
+    if isinstance(timeline, dict) and timeline.get("points"):
+        timeline = {"points": timeline["points"], "method": timeline.get("method") or 'lttb'}
+    else:
+        timeline = None
+    return document["_id"], text, timeline
+
+def run(source, sink, checkpoint_path=None, workers=None, page_size=1000, chunk_size=64, rate=None,
+        force=False, resume=True, report_every=10.0, analyzer=None):
+    """
+    Re-score every document from source with the current analyzer and
+    write the new fields to sink in one bulk batch per page. Pages are
+    scored on a process pool one page ahead of the writes. After each
+    batch, the source and sink positions go to checkpoint_path, so an
+    interrupted run resumes where the last batch ended. A checkpoint from
+    a different analyzer fingerprint is ignored. rate caps the write rate
+    in documents per second.
+    """
+    workers = workers or os.cpu_count() or 1
+    analyzer = bulk.preload(analyzer)
+    # Long calls must not be downgraded: every stored analysis gets the full tier
+    analyzer.planner = TierPlanner.fixed()
+    fingerprint = analyzer.fingerprint
+
+    state = load_checkpoint(checkpoint_path) if resume else None
+    if state is not None and state.get("fingerprint") != fingerprint:
+        print("Checkpoint was written by a different analyzer; starting over", file=sys.stderr)
+        state = None
+    totals = dict(state["totals"]) if state else {"read": 0, "rescored": 0, "skipped": 0, "failed": 0}
+    sink.resume(state["sink"] if state else None)
+    throttle = Throttle(rate)
+
+    started = time.monotonic()
+    last_report = started
+    processed_before = totals["read"]
+    pool = bulk.worker_pool(workers) if workers > 1 else None
+
+    def submit(documents):
+        work = [item for item in (_work(document, fingerprint, force) for document in documents) if item]
+        chunks = [work[i:i + chunk_size] for i in range(0, len(work), chunk_size)]
+        if pool is None:
+            return chunks
+        return [pool.submit(_rescore_chunk, chunk) for chunk in chunks]
+
+    def finish(documents, pending, position):
+        nonlocal last_report
+        updates = []
+        for item in pending:
+            rescored = item.result() if pool is not None else _rescore_chunk(item)
+            for document_id, result in rescored:
+                fields = update_fields(result, fingerprint)
+                if fields is None:
+                    totals["failed"] += 1
+                else:
+                    updates.append((document_id, fields))
+
+        throttle.wait(len(updates))
+        sink.write(updates, datetime.now(timezone.utc))
+        totals["read"] += len(documents)
+        totals["rescored"] += len(updates)
+        totals["skipped"] = totals["read"] - totals["rescored"] - totals["failed"]
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, {
+                "fingerprint": fingerprint, "source": position, "sink": sink.position(), "totals": totals
+            })
+
+        now = time.monotonic()
+        if now - last_report >= report_every:
+            last_report = now
+            rate_now = (totals["read"] - processed_before) / (now - started)
+            print(f"{totals['read']} read, {totals['rescored']} re-scored, {rate_now:.1f}/s", file=sys.stderr)
+
+    try:
+        ahead = deque()
+        for documents, position in source.pages(page_size, state["source"] if state else None):
+            ahead.append((documents, submit(documents), position))
+            if len(ahead) > 1:
+                finish(*ahead.popleft())
+        while ahead:
+            finish(*ahead.popleft())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        sink.close()
+
+    elapsed = time.monotonic() - started
+    return {
+        **totals,
+        "invalid": source.invalid,
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "per_second": round((totals["read"] - processed_before) / elapsed, 3) if elapsed else 0.0,
+        "throttled_seconds": round(throttle.slept, 3)
+    }
+
+def _open_source(spec, projection=None):
+    if spec.startswith(('mongodb://', 'mongodb+srv://')):
+        return MongoSource(_collection(spec), projection)
+    if spec.endswith('.bson'):
+        return BsonSource(spec)
+    return JsonlSource(spec)
+
+def _collection(uri):
+    """The collection named by mongodb://host/database?...#collection (default sentimentanalyses)"""
+    from pymongo import MongoClient
+    uri, _, name = uri.partition('#')
+    client = MongoClient(uri)
+    return client.get_default_database()[name or 'sentimentanalyses']
+
+# Derived data a re-score leaves stale: the agent rollups and the search
+# index facets still hold the old sentiment, scores and journey fields.
+# The index has a single writer, so it is rebuilt with the server stopped.
+FOLLOW_UP = (
+    "npm run rebuild:rollups",
+    "python3 sentiment_service.py index build <collection> (with the server stopped)",
+)
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog='sentiment_service.py backfill',
+        description='Re-score stored analyses with the current analyzer',
+        epilog='Once the updates are in the collection (after mongoimport for --out), '
+               'rebuild the derived data: ' + '; '.join(FOLLOW_UP),
+    )
+    parser.add_argument('source', help='mongoexport JSONL, mongodump .bson, or mongodb://host/db#collection')
+    parser.add_argument('--out', help='JSONL of updates for mongoimport --mode=merge (default: write back to a mongodb:// source)')
+    parser.add_argument('--checkpoint', help='progress file for resuming (default: OUT.checkpoint or backfill.checkpoint)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--page-size', type=int, default=1000, help='documents read and written per batch')
+    parser.add_argument('--chunk-size', type=int, default=64, help='documents per dispatched chunk')
+    parser.add_argument('--rate', type=float, default=None, help='most documents written per second')
+    parser.add_argument('--force', action='store_true', help='re-score documents already scored by this analyzer')
+    parser.add_argument('--no-resume', dest='resume', action='store_false', help='ignore any checkpoint')
+    parser.add_argument('--report-every', type=float, default=10.0, help='seconds between progress lines')
+    args = parser.parse_args(argv)
+
+    source = _open_source(args.source)
+    if args.out:
+        sink = JsonlSink(args.out)
+    elif isinstance(source, MongoSource):
+        sink = MongoSink(source.collection)
+    else:
+        parser.error('--out is required unless the source is a mongodb:// collection')
+    checkpoint = args.checkpoint or (f"{args.out}.checkpoint" if args.out else 'backfill.checkpoint')
+
+    summary = run(
+        source, sink,
+        checkpoint_path=checkpoint,
+        workers=args.workers,
+        page_size=args.page_size,
+        chunk_size=args.chunk_size,
+        rate=args.rate,
+        force=args.force,
+        resume=args.resume,
+        report_every=args.report_every
+    )
+    if summary["rescored"]:
+        summary["follow_up"] = list(FOLLOW_UP)
+        print("Rollups and the search index are now stale; run: " + '; '.join(FOLLOW_UP), file=sys.stderr)
+    print(json.dumps(summary))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
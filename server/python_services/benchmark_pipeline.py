@@ -0,0 +1,297 @@
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+import platform
+import tracemalloc
+
+import numpy as np
+
+from sentiment_service import MultilingualSentimentAnalyzer, INDIC_SCRIPTS
+from translation import TranslationBackend, TranslationResult, TranslationStage
+from tiers import TierPlanner
+
+STAGES = ('clean_text', 'detect_and_translate', 'journey', 'overall', 'end_to_end')
+
+ENGLISH_LINES = [
+    "I have been waiting for two weeks and nobody helps me",
+    "I am very sorry for the delay let me check your order",
+    "This is terrible service",
+    "I have processed a full refund for you",
+    "Okay thank you that is great",
+    "Please wait while I check the details",
+    "The product broke after one day",
+    "I want my money back",
+    "Thanks for the quick help",
+    "Can you tell me your order number",
+    "I am not happy with this at all",
+    "Your replacement will arrive tomorrow",
+    "That is really helpful thank you so much",
+    "Why does this keep happening",
+    "I will escalate this to my supervisor",
+    "Is there anything else I can help with",
+]
+
+class StubBackend(TranslationBackend):
+    """
+    Deterministic in-process translator for benchmarks: each line maps to
+    one of ENGLISH_LINES by CRC32, so runs are repeatable and network-free.
+    """
+    name = 'stub'
+    local = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def translate_many(self, lang, lines, timeout=None, deadline=None):
+        self.calls += 1
+        return [
+            TranslationResult.ok(ENGLISH_LINES[zlib.crc32(line.encode('utf-8')) % len(ENGLISH_LINES)])
+            for line in lines
+        ]
+
+    def stats(self):
+        return {"backend": self.name, "calls": self.calls}
+
+_SCRIPT_STARTS = dict((lang, start) for start, lang in INDIC_SCRIPTS)
+# Offsets shared by the ISCII-derived blocks: consonants and dependent vowel signs
+_CONSONANTS = range(0x15, 0x29)
+_VOWEL_SIGNS = (0x3E, 0x3F, 0x40, 0x41, 0x42, 0x47, 0x48, 0x4B, 0x4C)
+
+def _load_phrases():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'phrase_table.json')
+    try:
+        with open(path, encoding='utf-8') as table:
+            return {lang: list(phrases) for lang, phrases in json.load(table).items()}
+    except (OSError, ValueError):
+        return {}
+
+_PHRASES = _load_phrases()
+
+def _indic_line(rng, lang):
+    start = _SCRIPT_STARTS[lang]
+    words = [
+        ''.join(chr(start + rng.choice(_CONSONANTS)) + chr(start + rng.choice(_VOWEL_SIGNS))
+                for _ in range(rng.randint(1, 3)))
+        for _ in range(rng.randint(2, 8))
+    ]
+    phrases = _PHRASES.get(lang)
+    if phrases and rng.random() < 0.5:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(phrases))
+    return ' '.join(words)
+
+def generate_transcript(lines, mix=None, repetition=0.0, seed=0):
+    """
+    Synthetic "Speaker: text" transcript. mix maps language codes ("en" or
+    any of INDIC_SCRIPTS) to relative weights; repetition is the chance a
+    line repeats an earlier one verbatim, as scripted replies do.
+    """
+    rng = random.Random(seed)
+    mix = mix or {'en': 1.0}
+    languages, weights = zip(*mix.items())
+    contents = []
+    transcript = []
+    for i in range(lines):
+        if contents and rng.random() < repetition:
+            content = rng.choice(contents)
+        else:
+            lang = rng.choices(languages, weights)[0]
+            content = rng.choice(ENGLISH_LINES) if lang == 'en' else _indic_line(rng, lang)
+            contents.append(content)
+        transcript.append(f"{'Customer' if i % 2 == 0 else 'Agent'}: {content}")
+    return '\n'.join(transcript)
+
+def _timed_stages(analyzer, text):
+    """Run the pipeline once, returning {stage: seconds}"""
+    timings = {}
+    clock = time.perf_counter
+
+    started = clock()
+    cleaned = analyzer.clean_text(text)
+    timings['clean_text'] = clock() - started
+
+    started = clock()
+    english = analyzer.detect_and_translate(cleaned)
+    timings['detect_and_translate'] = clock() - started
+
+    started = clock()
+    scores, neutral_ratios, sentence_scores = analyzer._score_sentences(english)
+    journey = analyzer._journey_from_scores(scores, neutral_ratios)
+    timings['journey'] = clock() - started
+
+    started = clock()
+    overall_vader, overall_polarity = analyzer.scorer.score_overall(english, sentence_scores)
+    analyzer._build_result(overall_vader, overall_polarity, journey)
+    timings['overall'] = clock() - started
+    return timings
+
+def _reset(analyzer, warm):
+    if not warm and analyzer.sentence_cache is not None:
+        analyzer.sentence_cache.clear()
+
+def _percentile(values, q):
+    return float(np.percentile(values, q, method='nearest'))
+
+def benchmark_size(analyzer, text, repeat, warm=False):
+    lines = text.count('\n') + 1
+    samples = {stage: [] for stage in STAGES}
+    for _ in range(repeat):
+        _reset(analyzer, warm)
+        started = time.perf_counter()
+        analyzer.analyze_sentiment(text)
+        samples['end_to_end'].append(time.perf_counter() - started)
+
+        _reset(analyzer, warm)
+        for stage, seconds in _timed_stages(analyzer, text).items():
+            samples[stage].append(seconds)
+
+    # Peak memory in a separate pass; tracemalloc would skew the timings
+    _reset(analyzer, warm)
+    peaks = _stage_peaks(analyzer, text, warm)
+
+    report = {}
+    for stage in STAGES:
+        values = samples[stage]
+        mean = sum(values) / len(values)
+        report[stage] = {
+            "p50_ms": round(_percentile(values, 50) * 1000, 4),
+            "p99_ms": round(_percentile(values, 99) * 1000, 4),
+            "lines_per_s": round(lines / mean, 1) if mean else None,
+            "peak_kb": round(peaks.get(stage, 0) / 1024, 1)
+        }
+    return report
+
+def _stage_peaks(analyzer, text, warm=False):
+    """Peak traced allocation of each stage, in bytes above what it started with"""
+    peaks = {}
+    tracemalloc.start()
+    try:
+        def measure(stage, step):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            value = step()
+            peaks[stage] = tracemalloc.get_traced_memory()[1] - before
+            return value
+
+        measure('end_to_end', lambda: analyzer.analyze_sentiment(text))
+        _reset(analyzer, warm)
+        cleaned = measure('clean_text', lambda: analyzer.clean_text(text))
+        english = measure('detect_and_translate', lambda: analyzer.detect_and_translate(cleaned))
+
+        def journey():
+            scores, neutral_ratios, sentence_scores = analyzer._score_sentences(english)
+            analyzer._journey_from_scores(scores, neutral_ratios)
+            return sentence_scores
+
+        sentence_scores = measure('journey', journey)
+        measure('overall', lambda: analyzer.scorer.score_overall(english, sentence_scores))
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+def run_benchmark(sizes=(5, 50, 500, 5000), mix=None, repetition=0.2, repeat=5, seed=0, warm=False):
+    analyzer = MultilingualSentimentAnalyzer(translation_stage=TranslationStage(StubBackend()))
+    # No persistent caches: every run must do the same work
+    analyzer.translation_cache = None
+    analyzer.result_cache = None
+    # Every size runs the full tier the per-stage timings measure
+    analyzer.planner = TierPlanner.fixed()
+    mix = mix or {'en': 0.6, 'hi': 0.2, 'te': 0.1, 'ml': 0.1}
+
+    results = {}
+    for size in sizes:
+        text = generate_transcript(size, mix=mix, repetition=repetition, seed=seed)
+        analyzer.analyze_sentiment(text)  # Warm up lazy imports and lexicons
+        results[str(size)] = benchmark_size(analyzer, text, repeat, warm=warm)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "mix": mix,
+            "repetition": repetition,
+            "repeat": repeat,
+            "seed": seed,
+            "warm": warm
+        },
+        "results": results
+    }
+
+def compare(report, baseline, threshold=0.25, min_ms=0.05):
+    """
+    Return a list of regressions: stages whose p50 grew by more than
+    threshold (a fraction) over the baseline, ignoring differences under
+    min_ms, which are timer noise.
+    """
+    regressions = []
+    for size, stages in report["results"].items():
+        for stage, current in stages.items():
+            previous = baseline.get("results", {}).get(size, {}).get(stage)
+            if not previous:
+                continue
+            before, after = previous["p50_ms"], current["p50_ms"]
+            if after - before > min_ms and after > before * (1 + threshold):
+                regressions.append({
+                    "size": int(size),
+                    "stage": stage,
+                    "baseline_ms": before,
+                    "current_ms": after,
+                    "change": round(after / before - 1, 3) if before else None
+                })
+    return regressions
+
+def _parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        lang, _, weight = part.partition('=')
+        lang = lang.strip()
+        if lang != 'en' and lang not in _SCRIPT_STARTS:
+            raise argparse.ArgumentTypeError(f"Unknown language in mix: {lang}")
+        mix[lang] = float(weight or 1)
+    return mix
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmark the sentiment analysis pipeline stage by stage')
+    parser.add_argument('--sizes', default='5,50,500,5000', help='comma-separated transcript lengths in lines')
+    parser.add_argument('--mix', type=_parse_mix, default=None, help='script mix, e.g. en=0.6,hi=0.2,te=0.2')
+    parser.add_argument('--repetition', type=float, default=0.2, help='chance a line repeats an earlier one')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per size')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--warm', action='store_true', help='keep the sentence cache between runs')
+    parser.add_argument('--save', help='write the report to this JSON file as a new baseline')
+    parser.add_argument('--baseline', help='compare against this JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed p50 slowdown, as a fraction')
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        sizes=[int(size) for size in args.sizes.split(',') if size.strip()],
+        mix=args.mix,
+        repetition=args.repetition,
+        repeat=args.repeat,
+        seed=args.seed,
+        warm=args.warm
+    )
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as source:
+            report["regressions"] = compare(report, json.load(source), threshold=args.threshold)
+        if report["regressions"]:
+            status = 1
+            for item in report["regressions"]:
+                print(f"REGRESSION {item['stage']} @ {item['size']} lines: "
+                      f"{item['baseline_ms']}ms -> {item['current_ms']}ms", file=sys.stderr)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as target:
+            json.dump(report, target, indent=2)
+
+    print(json.dumps(report, indent=2))
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
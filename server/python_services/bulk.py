@@ -0,0 +1,191 @@
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from sentiment_service import MultilingualSentimentAnalyzer
+
+# Built once in the parent before the pool forks, so every worker shares the
+# loaded lexicons copy-on-write instead of rebuilding them.
+_analyzer = None
+_frozen = False
+
+def _init_worker():
+    # SQLite connections must not cross fork; give this worker its own
+    for cache in (_analyzer.translation_cache, _analyzer.result_cache):
+        if cache is not None:
+            cache.reopen()
+
+def preload(analyzer=None):
+    """Build the shared analyzer in the parent, before any worker forks"""
+    global _analyzer
+    _analyzer = analyzer if analyzer is not None else MultilingualSentimentAnalyzer()
+    return _analyzer
+
+def preloaded():
+    """The analyzer preload() built, in the parent or a forked worker"""
+    return _analyzer
+
+def worker_pool(workers):
+    """A forking process pool whose workers share the preloaded analyzer"""
+    global _frozen
+    # Keep the loaded objects out of the collector's way so the children
+    # don't dirty every shared page by touching refcount/GC headers. Once
+    # per process: there is no unfreeze, so repeated freezes would keep
+    # growing the permanent generation.
+    if not _frozen:
+        gc.freeze()
+        _frozen = True
+    context = multiprocessing.get_context('fork')
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker)
+
+def _analyze_chunk(chunk):
+    results = _analyzer.analyze_batch([text for _, _, text in chunk])
+    return [(index, record_id, result) for (index, record_id, _), result in zip(chunk, results)]
+
+def read_records(path, done=()):
+    """
+    Yield (index, id, text) for each input line not already in done. A line
+    is either a JSON object with "text" (and optionally "id") or a bare JSON
+    string. index is the 0-based line number.
+    """
+    with open(path, encoding='utf-8') as source:
+        for index, line in enumerate(source):
+            if index in done or not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                print(f"Line {index + 1}: invalid JSON ({e})", file=sys.stderr)
+                yield index, None, None
+                continue
+            if isinstance(record, dict):
+                yield index, record.get('id'), record.get('text')
+            else:
+                yield index, None, record
+
+def load_checkpoint(path):
+    """
+    Return the input indices already written to an output file. A torn
+    final line from an interrupted run is truncated away.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'rb+') as output:
+        good = 0
+        for line in output:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                done.add(json.loads(line)['index'])
+            except (ValueError, KeyError, TypeError):
+                break
+            good += len(line)
+        output.truncate(good)
+    return done
+
+def _chunks(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _results(chunks, workers, ordered):
+    """Yield result lists, keeping at most a few chunks per worker in flight"""
+    if workers <= 1:
+        for chunk in chunks:
+            yield _analyze_chunk(chunk)
+        return
+
+    limit = workers * 4
+    with worker_pool(workers) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(executor.submit(_analyze_chunk, chunk))
+            while len(in_flight) >= limit:
+                yield from _collect(in_flight, ordered)
+        while in_flight:
+            yield from _collect(in_flight, ordered)
+
+def _collect(in_flight, ordered):
+    if ordered:
+        yield in_flight.popleft().result()
+        return
+    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+    for future in done:
+        in_flight.remove(future)
+        yield future.result()
+
+def run(input_path, output_path, workers=None, chunk_size=64, ordered=False, resume=True, report_every=10.0):
+    """
+    Score every record of a JSONL file into another JSONL file, one
+    {"index", "id", "result"} line per record. The output doubles as the
+    checkpoint: with resume, records already written are skipped.
+    """
+    workers = workers or os.cpu_count() or 1
+    done = load_checkpoint(output_path) if resume else set()
+    preload()
+
+    started = time.monotonic()
+    last_report = started
+    processed = 0
+    chunks = _chunks(read_records(input_path, done), chunk_size)
+
+    with open(output_path, 'a' if resume else 'w', encoding='utf-8') as output:
+        for results in _results(chunks, workers, ordered):
+            for index, record_id, result in results:
+                output.write(json.dumps({"index": index, "id": record_id, "result": result}) + "\n")
+            output.flush()
+            processed += len(results)
+
+            now = time.monotonic()
+            if now - last_report >= report_every:
+                last_report = now
+                print(f"{processed} records, {processed / (now - started):.1f}/s", file=sys.stderr)
+
+    elapsed = time.monotonic() - started
+    return {
+        "processed": processed,
+        "skipped": len(done),
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "per_second": round(processed / elapsed, 3) if elapsed else 0.0
+    }
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog='sentiment_service.py batch',
+        description='Score a JSONL archive of conversations on a process pool'
+    )
+    parser.add_argument('input', help='JSONL input, one {"id", "text"} object or JSON string per line')
+    parser.add_argument('output', help='JSONL output; also the checkpoint for --resume')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=64, help='records per dispatched chunk')
+    parser.add_argument('--ordered', action='store_true', help='write results in input order')
+    parser.add_argument('--no-resume', dest='resume', action='store_false', help='overwrite the output')
+    parser.add_argument('--report-every', type=float, default=10.0, help='seconds between progress lines')
+    args = parser.parse_args(argv)
+
+    summary = run(
+        args.input, args.output,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        ordered=args.ordered,
+        resume=args.resume,
+        report_every=args.report_every
+    )
+    print(json.dumps(summary))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,199 @@
+# Cost reduction a change point must buy: a shift of d between two
+# segments of lengths a and b saves d^2 * ab / (a + b)
+PENALTY = 0.5
+# Fewest sentences on each side of a change point
+MIN_SIZE = 2
+# Smallest mean shift reported
+MIN_SHIFT = 0.2
+# Most candidate segment starts kept; bounds the work per sentence
+MAX_CANDIDATES = 64
+
+class _Boundary:
+    """Start of a segment, linked to the start of the segment before it"""
+    __slots__ = ('start', 'total', 'label', 'previous')
+
+    def __init__(self, start, total, previous):
+        self.start = start
+        self.total = total  # Sum of the scores before start
+        self.label = None  # Speaker of the sentence at start
+        self.previous = previous
+
+class _Candidate:
+    """A possible start for the last segment, with the running sums at that point"""
+    __slots__ = ('boundary', 'squares', 'best')
+
+    def __init__(self, boundary, squares, best):
+        self.boundary = boundary
+        self.squares = squares
+        self.best = best  # Optimal penalized cost of the scores before the start
+
+class OnlinePelt:
+    """
+    PELT (Killick et al., 2012) for shifts in the mean score, under a
+    squared-error cost, fed one sentence at a time. The penalty is a
+    constant rather than one estimated from the whole series, so a
+    detector fed sentence by sentence agrees exactly with one run over
+    the finished call.
+
+    Only the candidate starts for the last segment are kept, each with
+    the running sums at that point and a link into the chain of segment
+    boundaries before it. Boundaries no candidate leads back to are
+    dropped, so memory doesn't grow with the call. Pruning keeps the
+    candidate set small while the score keeps moving, but a long stable
+    stretch prunes almost nothing, so past max_candidates the start
+    closest to being pruned is dropped. add() therefore costs at most
+    O(max_candidates), and change_points() O(segments).
+    """
+
+    def __init__(self, penalty=PENALTY, min_size=MIN_SIZE, max_candidates=MAX_CANDIDATES):
+        self.penalty = penalty
+        self.min_size = min_size
+        self.max_candidates = max_candidates
+        self._count = 0
+        self._total = 0.0
+        self._squares = 0.0
+        self._last = _Boundary(0, 0.0, None)  # Start of the optimum's last segment
+        self._candidates = [_Candidate(self._last, 0.0, -penalty)]
+
+    def __len__(self):
+        return self._count
+
+    def add(self, value, label=None):
+        """Feed one score; label (the speaker) is reported with a change point there"""
+        newest = self._candidates[-1].boundary
+        if newest.start == self._count:
+            newest.label = label
+        self._count += 1
+        self._total += value
+        self._squares += value * value
+        end = self._count
+
+        costs = {}
+        for candidate in self._candidates:
+            start = candidate.boundary.start
+            if start == 0 or end - start >= self.min_size:
+                total = self._total - candidate.boundary.total
+                costs[candidate] = candidate.best + self._squares - candidate.squares - total * total / (end - start)
+        last = min(costs, key=lambda candidate: (costs[candidate], candidate.boundary.start))
+        best = costs[last] + self.penalty
+        self._last = last.boundary
+
+        # A start that can't beat the optimum now never will (the cost is
+        # additive), so it is pruned; starts too recent to judge are kept
+        self._candidates = [
+            candidate for candidate in self._candidates if candidate not in costs or costs[candidate] <= best
+        ]
+        if self.max_candidates and len(self._candidates) > self.max_candidates:
+            worst = max(
+                (candidate for candidate in self._candidates if candidate in costs and candidate is not last),
+                key=lambda candidate: (costs[candidate], -candidate.boundary.start),
+                default=None
+            )
+            if worst is not None:
+                self._candidates.remove(worst)
+        if end >= self.min_size:
+            self._candidates.append(_Candidate(_Boundary(end, self._total, self._last), self._squares, best))
+
+    def _boundaries(self):
+        boundaries = []
+        boundary = self._last if self._count else None
+        while boundary is not None:
+            boundaries.append(boundary)
+            boundary = boundary.previous
+        return boundaries[::-1]
+
+    def segments(self):
+        """[(start, end)] of the current optimal segmentation, in order"""
+        starts = [boundary.start for boundary in self._boundaries()]
+        return list(zip(starts, starts[1:] + [self._count]))
+
+    def change_points(self, positions=None, min_shift=MIN_SHIFT):
+        """
+        The segmentation's boundaries as journey entries: the sentence
+        index (positions maps to transcript positions), its speaker, the
+        mean score before and after, and whether the shift is an
+        escalation (down) or a de-escalation (up).
+        """
+        boundaries = self._boundaries()
+        ends = [(boundary.start, boundary.total) for boundary in boundaries[1:]] + [(self._count, self._total)]
+        means = [
+            (total - boundary.total) / (end - boundary.start) for boundary, (end, total) in zip(boundaries, ends)
+        ]
+        points = []
+        for boundary, before, after in zip(boundaries[1:], means, means[1:]):
+            shift = after - before
+            if abs(shift) < min_shift:
+                continue
+            points.append({
+                'index': positions[boundary.start] if positions is not None else boundary.start,
+                'speaker': boundary.label,
+                'before': round(before, 3),
+                'after': round(after, 3),
+                'shift': round(shift, 3),
+                'kind': 'escalation' if shift < 0 else 'de-escalation'
+            })
+        return points
+
+def detect_change_points(scores, speakers=None, positions=None, penalty=PENALTY, min_size=MIN_SIZE,
+                         min_shift=MIN_SHIFT):
+    """Change points of a finished call's scores; see OnlinePelt.change_points()"""
+    detector = OnlinePelt(penalty, min_size)
+    for i, score in enumerate(scores):
+        detector.add(float(score), speakers[i] if speakers is not None else None)
+    return detector.change_points(positions, min_shift)
+
+class EscalationMonitor:
+    """
+    Live escalation alarm over the scores of the watched speakers (the
+    customer, by default). The first `warmup` scores after a start or an
+    alarm set the baseline. From then on, cumulative sums of the
+    shortfall (and the excess) beyond `drift` raise an alert when they
+    pass `threshold`. A sharp drop alerts within a sentence or two, and a
+    slow slide alerts once it adds up. After an alert the baseline is
+    learned again, so a call that stays angry alerts only once.
+    """
+
+    def __init__(self, speakers=('Customer',), drift=0.1, threshold=0.6, warmup=2, calming=False):
+        self.speakers = set(speakers) if speakers else None
+        self.drift = drift
+        self.threshold = threshold
+        self.warmup = warmup
+        self.calming = calming
+        self.alerts = []
+        self._reset()
+
+    def _reset(self):
+        self._baseline_scores = []
+        self._baseline = None
+        self._low = 0.0
+        self._high = 0.0
+
+    def add(self, index, speaker, score):
+        """Feed one sentence; returns the alert it raised, or None"""
+        if self.speakers is not None and speaker not in self.speakers:
+            return None
+        if self._baseline is None:
+            self._baseline_scores.append(score)
+            if len(self._baseline_scores) >= self.warmup:
+                self._baseline = sum(self._baseline_scores) / len(self._baseline_scores)
+            return None
+
+        self._low = max(0.0, self._low + (self._baseline - score) - self.drift)
+        self._high = max(0.0, self._high + (score - self._baseline) - self.drift)
+        if self._low > self.threshold:
+            kind = 'escalation'
+        elif self.calming and self._high > self.threshold:
+            kind = 'de-escalation'
+        else:
+            return None
+
+        alert = {
+            'kind': kind,
+            'index': index,
+            'speaker': speaker,
+            'baseline': round(self._baseline, 3),
+            'score': round(score, 3)
+        }
+        self.alerts.append(alert)
+        self._reset()
+        return alert
@@ -0,0 +1,33 @@
+import pytest
+
+import disk_cache
+import lexicons
+import search_index
+from sentiment_service import MultilingualSentimentAnalyzer
+
+@pytest.fixture(scope='session')
+def cache_dir(tmp_path_factory):
+    """Stands in for server/python_services/.cache, shared by the session's tests"""
+    return tmp_path_factory.mktemp('cache')
+
+@pytest.fixture(autouse=True)
+def isolated_caches(cache_dir, monkeypatch):
+    # Tests stub out translation, so their results must never reach the
+    # real caches under the production fingerprint. Tests of the caches
+    # open their own files under tmp_path.
+    monkeypatch.setenv('SENTIMENT_RESULT_CACHE', 'off')
+    monkeypatch.setenv('SENTIMENT_TRANSLATION_CACHE', 'off')
+    monkeypatch.setenv('SENTIMENT_CACHE_DIR', str(cache_dir))
+    # The default directory is read at import, and worker processes re-read it
+    for module in (disk_cache, lexicons, search_index):
+        monkeypatch.setattr(module, 'DEFAULT_CACHE_DIR', str(cache_dir))
+
+@pytest.fixture
+def make_analyzer():
+    """Factory for analyzers that skip translation and the result cache"""
+    def make(**kwargs):
+        analyzer = MultilingualSentimentAnalyzer(**kwargs)
+        analyzer.translate_text = lambda text: (text, True)  # Keep the tests offline
+        analyzer.result_cache = None
+        return analyzer
+    return make
@@ -0,0 +1,212 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'SENTIMENT_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+)
+
+class SQLiteCache:
+    """
+    Persistent key/value cache in a SQLite file, shared by every process that
+    opens the same path. WAL mode lets readers proceed while one process
+    writes. Entries expire after ttl_seconds and the table is trimmed back to
+    max_entries by least recent access.
+    """
+    # Last-access times are only rewritten when older than this, so hot keys
+    # don't turn every read into a write.
+    TOUCH_INTERVAL = 60
+    # Check the entry count once every this many writes
+    EVICT_EVERY = 100
+
+    def __init__(self, path, table='cache', max_entries=100000, ttl_seconds=30 * 24 * 3600):
+        if not re.match(r'^[A-Za-z_][A-Za-z0-9_]*$', table):
+            raise ValueError(f"Invalid table name: {table}")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            f'CREATE TABLE IF NOT EXISTS {self.table} ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)'
+        )
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table} (accessed)')
+        return conn
+
+    def reopen(self):
+        """
+        Open a fresh connection in a forked child. SQLite connections must
+        not be used across fork, so the inherited one is abandoned, not closed.
+        """
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT value, created, accessed FROM {self.table} WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created, accessed = row
+            if self.ttl_seconds and now - created > self.ttl_seconds:
+                self._conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+                self.misses += 1
+                return None
+
+            if now - accessed > self.TOUCH_INTERVAL:
+                self._conn.execute(f'UPDATE {self.table} SET accessed = ? WHERE key = ?', (now, key))
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, created, accessed) VALUES (?, ?, ?, ?)',
+                (key, value, now, now)
+            )
+            self._writes += 1
+            if self._writes % self.EVICT_EVERY == 0:
+                self._evict()
+
+    def _evict(self):
+        (count,) = self._conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                f'DELETE FROM {self.table} WHERE key IN '
+                f'(SELECT key FROM {self.table} ORDER BY accessed LIMIT ?)',
+                (excess,)
+            )
+            self.evictions += excess
+        if self.ttl_seconds:
+            cursor = self._conn.execute(
+                f'DELETE FROM {self.table} WHERE created < ?', (time.time() - self.ttl_seconds,)
+            )
+            self.evictions += cursor.rowcount
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()
+        return count
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f'DELETE FROM {self.table}')
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self),
+            "max_entries": self.max_entries
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class TranslationCache(SQLiteCache):
+    """Translations keyed by (source language, normalized line)"""
+
+    def __init__(self, path=None, max_entries=200000, ttl_seconds=90 * 24 * 3600):
+        super().__init__(
+            path or os.path.join(DEFAULT_CACHE_DIR, 'translations.sqlite3'),
+            table='translations',
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds
+        )
+
+    @staticmethod
+    def normalize(line):
+        return ' '.join(unicodedata.normalize('NFC', line).split())
+
+    def _key(self, lang, line):
+        return f"{lang}\x1f{self.normalize(line)}"
+
+    def get_translation(self, lang, line):
+        return self.get(self._key(lang, line))
+
+    def set_translation(self, lang, line, translated):
+        self.set(self._key(lang, line), translated)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build the cache configured by SENTIMENT_TRANSLATION_CACHE
+        (a file path, or "off" to disable). Returns None when disabled.
+        """
+        setting = os.environ.get('SENTIMENT_TRANSLATION_CACHE', '')
+        if setting.lower() in ('off', '0', 'false', 'none'):
+            return None
+        max_entries = int(os.environ.get('SENTIMENT_TRANSLATION_CACHE_SIZE', 200000))
+        return cls(path=setting or None, max_entries=max_entries)
+
+class ResultCache(SQLiteCache):
+    """
+    Whole analysis results, content-addressed by a SHA-256 of the analyzer
+    fingerprint and the cleaned text. A new fingerprint (changed weights,
+    lexicons, code or translator) simply stops matching the old entries,
+    which then age out through LRU eviction.
+    """
+
+    def __init__(self, path=None, max_entries=50000, ttl_seconds=30 * 24 * 3600):
+        super().__init__(
+            path or os.path.join(DEFAULT_CACHE_DIR, 'results.sqlite3'),
+            table='results',
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds
+        )
+
+    @staticmethod
+    def _key(fingerprint, text):
+        return hashlib.sha256(f"{fingerprint}\x1f{text}".encode('utf-8')).hexdigest()
+
+    def get_result(self, fingerprint, text):
+        value = self.get(self._key(fingerprint, text))
+        return json.loads(value) if value is not None else None
+
+    def set_result(self, fingerprint, text, result):
+        self.set(self._key(fingerprint, text), json.dumps(result))
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build the cache configured by SENTIMENT_RESULT_CACHE (a file path, or
+        "off" to disable). Returns None when disabled.
+        """
+        setting = os.environ.get('SENTIMENT_RESULT_CACHE', '')
+        if setting.lower() in ('off', '0', 'false', 'none'):
+            return None
+        max_entries = int(os.environ.get('SENTIMENT_RESULT_CACHE_SIZE', 50000))
+        return cls(path=setting or None, max_entries=max_entries)
@@ -0,0 +1,270 @@
+import io
+import sys
+import json
+import time
+import random
+import fnmatch
+import argparse
+from collections import namedtuple
+
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from benchmark_pipeline import StubBackend, generate_transcript
+from sentence_scoring import FusedScorer
+from sentiment_service import MultilingualSentimentAnalyzer
+from translation import TranslationStage
+
+# Transcript shapes the corpus cycles through: (most lines, script mix, repetition)
+CORPUS_SHAPES = (
+    (1, {'en': 1.0}, 0.0),
+    (3, {'en': 0.7, 'hi': 0.3}, 0.0),
+    (8, {'en': 0.6, 'hi': 0.2, 'te': 0.1, 'ml': 0.1}, 0.2),
+    (20, {'en': 0.5, 'hi': 0.3, 'ta': 0.2}, 0.3),
+    (60, {'en': 0.8, 'bn': 0.1, 'kn': 0.1}, 0.5),
+    (150, {'en': 0.6, 'hi': 0.2, 'te': 0.1, 'ml': 0.1}, 0.2),
+)
+
+# Inputs that take the error and edge-case branches
+EDGE_CASES = (
+    "",
+    "   ",
+    "!!! ... ???",
+    "Customer: 😀 😡 great :) terrible :(",
+    "Customer: I am NOT happy!!! This is VERY bad\nAgent: kind of sorry about that",
+    "Customer: मेरा order abhi tak deliver नहीं हुआ\nAgent: sorry, let me check",
+)
+
+def make_analyzer():
+    """An analyzer on the deterministic stub translator, with no persistent caches"""
+    analyzer = MultilingualSentimentAnalyzer(translation_stage=TranslationStage(StubBackend()))
+    analyzer.translation_cache = None
+    analyzer.result_cache = None
+    return analyzer
+
+def generate_corpus(count, seed=0):
+    """count deterministic texts: the edge cases, then generated transcripts"""
+    rng = random.Random(seed)
+    texts = list(EDGE_CASES[:count])
+    while len(texts) < count:
+        lines, mix, repetition = CORPUS_SHAPES[len(texts) % len(CORPUS_SHAPES)]
+        texts.append(generate_transcript(
+            rng.randint(1, lines), mix=mix, repetition=repetition, seed=rng.randrange(2 ** 32)
+        ))
+    return texts
+
+# run(analyzer, texts) -> results; setup(analyzer, texts) prepares a fresh
+# analyzer before the clock starts; exact engines are expected to reproduce
+# the golden results and run by default
+Engine = namedtuple('Engine', ['run', 'exact', 'setup'])
+
+def _reference(analyzer, texts):
+    return [json.loads(analyzer.analyze_sentiment(text)) for text in texts]
+
+def _per_text(analyzer, texts):
+    return [analyzer.analyze(text) for text in texts]
+
+def _library_lexicons(analyzer, texts):
+    analyzer.lexicons = None
+    analyzer.analyzer = SentimentIntensityAnalyzer()
+    analyzer.scorer = FusedScorer(analyzer.analyzer, cache=analyzer.sentence_cache)
+
+def _tier(tier):
+    return lambda analyzer, texts: [analyzer.analyze(text, tier=tier) for text in texts]
+
+ENGINES = {
+    'reference': Engine(_reference, True, None),
+    'batch': Engine(lambda analyzer, texts: analyzer.analyze_batch(texts), True, None),
+    'stream': Engine(
+        lambda analyzer, texts: [analyzer.analyze_stream(io.StringIO(text), chunk_lines=16) for text in texts], True, None
+    ),
+    'sentence_cache_warm': Engine(_per_text, True, _per_text),
+    'library_lexicons': Engine(_per_text, True, _library_lexicons),
+    'fast_tier': Engine(_tier('fast'), False, None),
+    'summary_tier': Engine(_tier('summary'), False, None),
+}
+
+def run_engine(name, texts):
+    """(results, seconds) for one engine over texts, on a fresh analyzer"""
+    engine = ENGINES[name]
+    analyzer = make_analyzer()
+    engine.run(analyzer, texts[-1:])  # Warm up lazy imports and lexicons
+    if analyzer.sentence_cache is not None:
+        analyzer.sentence_cache.clear()
+    if engine.setup is not None:
+        engine.setup(analyzer, texts)
+
+    started = time.perf_counter()
+    results = engine.run(analyzer, texts)
+    seconds = time.perf_counter() - started
+    # Compare what callers see on the wire
+    return json.loads(json.dumps(results)), seconds
+
+def record(count=500, seed=0):
+    """Golden results of the reference engine over the generated corpus"""
+    texts = generate_corpus(count, seed)
+    results, seconds = run_engine('reference', texts)
+    return {
+        "meta": {
+            "count": count,
+            "seed": seed,
+            "fingerprint": make_analyzer().fingerprint,
+            "seconds": round(seconds, 4)
+        },
+        "texts": texts,
+        "results": results
+    }
+
+def flatten(value, prefix=''):
+    """{dotted.path: leaf} for a nested result"""
+    if isinstance(value, dict):
+        fields = {}
+        for key, item in value.items():
+            fields.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+        return fields
+    if isinstance(value, list):
+        fields = {}
+        for i, item in enumerate(value):
+            fields.update(flatten(item, f"{prefix}[{i}]"))
+        return fields
+    return {prefix: value}
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _tolerance(field, tolerance, field_tolerances):
+    for pattern, allowed in (field_tolerances or {}).items():
+        if fnmatch.fnmatchcase(field, pattern):
+            return allowed
+    return tolerance
+
+def compare_results(expected, actual, tolerance=0.0, field_tolerances=None):
+    """
+    Field-by-field divergence of actual from expected results. Numbers may
+    differ by their tolerance (field_tolerances maps glob patterns such as
+    "emotional_journey.*" to one); anything else must be equal, and a field
+    missing on either side is a violation. Returns per-field worst cases.
+    """
+    fields = {}
+    mismatched = set()
+    for case, (want, got) in enumerate(zip(expected, actual)):
+        want, got = flatten(want), flatten(got)
+        for field in want.keys() | got.keys():
+            a, b = want.get(field), got.get(field)
+            if _is_number(a) and _is_number(b):
+                diff = abs(a - b)
+                violation = diff > _tolerance(field, tolerance, field_tolerances)
+            else:
+                diff = None
+                violation = a != b or (field in want) != (field in got)
+            if diff == 0 or (diff is None and not violation):
+                continue
+
+            stats = fields.setdefault(field, {
+                "max_diff": 0.0, "worst_case": None, "expected": None, "actual": None, "violations": 0
+            })
+            if violation:
+                stats["violations"] += 1
+                mismatched.add(case)
+            if stats["worst_case"] is None or (diff is not None and diff > stats["max_diff"]):
+                stats.update(worst_case=case, expected=a, actual=b)
+                if diff is not None:
+                    stats["max_diff"] = diff
+
+    return {
+        "cases": min(len(expected), len(actual)),
+        "missing_cases": abs(len(expected) - len(actual)),
+        "mismatched_cases": len(mismatched),
+        "violations": sum(stats["violations"] for stats in fields.values()),
+        "max_drift": max((stats["max_diff"] for stats in fields.values()), default=0.0),
+        "fields": dict(sorted(fields.items(), key=lambda item: (-item[1]["violations"], -item[1]["max_diff"])))
+    }
+
+def check(golden, engines=None, tolerance=0.0, field_tolerances=None):
+    """
+    Run engines over the golden corpus and compare each with the golden
+    results. The reference engine is re-timed alongside, so speedups are
+    measured on this machine. Returns one report per engine.
+    """
+    engines = engines or [name for name, engine in ENGINES.items() if engine.exact]
+    texts = golden["texts"]
+    _, reference_seconds = run_engine('reference', texts)
+
+    reports = []
+    for name in engines:
+        results, seconds = run_engine(name, texts)
+        report = compare_results(golden["results"], results, tolerance, field_tolerances)
+        report.update(
+            engine=name,
+            seconds=round(seconds, 4),
+            speedup=round(reference_seconds / seconds, 2) if seconds else None,
+            passed=report["violations"] == 0 and report["missing_cases"] == 0
+        )
+        reports.append(report)
+    return reports
+
+def render_table(reports, worst=3):
+    """Speedup-versus-drift table, then each engine's worst-diverging fields"""
+    lines = [f"{'engine':<22}{'seconds':>10}{'speedup':>9}{'max drift':>12}{'violations':>12}{'cases':>8}  status"]
+    for report in reports:
+        lines.append(
+            f"{report['engine']:<22}{report['seconds']:>10.4f}{report['speedup'] or 0:>8.2f}x"
+            f"{report['max_drift']:>12.6f}{report['violations']:>12}"
+            f"{report['mismatched_cases']:>8}  {'ok' if report['passed'] else 'DRIFT'}"
+        )
+    for report in reports:
+        for field, stats in list(report["fields"].items())[:worst]:
+            lines.append(
+                f"  {report['engine']}: {field} max diff {stats['max_diff']:.6f}, "
+                f"{stats['violations']} violations, case {stats['worst_case']}: "
+                f"{stats['expected']!r} -> {stats['actual']!r}"
+            )
+    return '\n'.join(lines)
+
+def _parse_field_tolerance(value):
+    pattern, _, allowed = value.partition('=')
+    try:
+        return pattern.strip(), float(allowed)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected FIELD=TOLERANCE, got {value}")
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Record golden analyzer results and check engines against them')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    recorder = commands.add_parser('record', help='record golden results from the reference engine')
+    recorder.add_argument('--out', required=True, help='golden JSON file to write')
+    recorder.add_argument('--count', type=int, default=500, help='texts in the corpus')
+    recorder.add_argument('--seed', type=int, default=0)
+
+    checker = commands.add_parser('check', help='compare engines against golden results')
+    checker.add_argument('--golden', required=True, help='golden JSON file to read')
+    checker.add_argument('--engines', help=f"comma-separated, from {', '.join(ENGINES)} (default: the exact ones)")
+    checker.add_argument('--tolerance', type=float, default=0.0, help='allowed absolute difference for numbers')
+    checker.add_argument('--field-tolerance', type=_parse_field_tolerance, action='append', default=[],
+                         metavar='FIELD=TOL', help='per-field tolerance; FIELD may be a glob')
+    checker.add_argument('--json', action='store_true', help='print the reports as JSON instead of a table')
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        golden = record(args.count, args.seed)
+        with open(args.out, 'w', encoding='utf-8') as target:
+            json.dump(golden, target, ensure_ascii=False)
+        print(json.dumps({"recorded": args.out, **golden["meta"]}))
+        return 0
+
+    with open(args.golden, encoding='utf-8') as source:
+        golden = json.load(source)
+    engines = [name.strip() for name in args.engines.split(',')] if args.engines else None
+    unknown = [name for name in engines or [] if name not in ENGINES]
+    if unknown:
+        parser.error(f"Unknown engine: {', '.join(unknown)}")
+
+    if golden["meta"]["fingerprint"] != make_analyzer().fingerprint:
+        print("Note: analyzer fingerprint differs from the one the golden results were recorded with",
+              file=sys.stderr)
+    reports = check(golden, engines, args.tolerance, dict(args.field_tolerance))
+    print(json.dumps(reports, indent=2) if args.json else render_table(reports))
+    return 0 if all(report["passed"] for report in reports) else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,216 @@
+import math
+from collections import deque
+
+from changepoints import EscalationMonitor, OnlinePelt
+
+class IncrementalJourney:
+    """
+    Emotional journey built one utterance at a time, for live calls.
+
+    Each sentence is scored once as it arrives and folded into running
+    aggregates (Welford mean/variance, online least-squares slope, running
+    absolute-difference sum, per-state counts), so memory and the cost of
+    snapshot() don't grow with the call. The one exception is the change
+    points: an online PELT detector, bounded in memory, keeps them up to
+    date, and listing them costs O(segments).
+
+    With escalation (True, or a configured EscalationMonitor), every
+    sentence also feeds a live CUSUM alarm; pop_alerts() returns the
+    alerts raised since it was last called.
+
+    Contextual scores depend on each sentence's position within the whole
+    transcript. When total_sentences is known up front the snapshot after
+    the last sentence matches analyze_emotional_journey() on the full text.
+    Otherwise positions are provisional (relative to the sentences seen so
+    far) and finalize() rescores the call once with the real length.
+    """
+    WINDOW_SIZE = 3
+
+    def __init__(self, analyzer, total_sentences=None, escalation=None):
+        self.analyzer = analyzer
+        self.total_sentences = total_sentences
+        if escalation is True:
+            escalation = EscalationMonitor()
+        self.escalation = escalation or None
+        self._alerts = []
+        self.speaker = 'Customer'  # Default speaker, as in the batch path
+        self.count = 0
+        self._context = deque(maxlen=self.WINDOW_SIZE)
+        # Raw sentence scores are only kept when positions are provisional
+        self._history = [] if total_sentences is None else None
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self._head = []
+        self._tail = deque(maxlen=3)
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._mean_x = 0.0
+        self._m2_x = 0.0
+        self._c_xy = 0.0
+        self._abs_diff = 0.0
+        self._previous = None
+        self._low = None
+        self._high = None
+        self._state_counts = {}
+        self._state_intensity = {}
+        self._total_intensity = 0
+        self._detector = OnlinePelt()
+
+    def update(self, speaker, text):
+        """
+        Add one utterance and return the journey snapshot. speaker is
+        'Customer' or 'Agent'; None detects "Agent:"/"Customer:" labels in
+        the text like the batch path does.
+        """
+        for sentence in self.analyzer.split_sentences(text):
+            self.add_sentence(sentence, speaker)
+        return self.snapshot()
+
+    def add_sentence(self, sentence, speaker=None):
+        if speaker is None:
+            self.speaker, sentence = self.analyzer._detect_speaker(sentence, self.speaker)
+        else:
+            self.speaker = speaker
+        record = self.analyzer.scorer.score_sentence(sentence)
+        self._add_scored(record.compound, record.polarity, record.neu, self.speaker)
+
+    def _add_scored(self, compound, polarity, neu, speaker):
+        position = self.count
+        if self.total_sentences is None:
+            total = position + 1
+        elif position < self.total_sentences:
+            total = self.total_sentences
+        else:
+            raise ValueError(f"More than the declared {self.total_sentences} sentences")
+
+        score = self.analyzer._calculate_contextual_score(
+            compound, polarity, self._context, speaker, position, total
+        )
+        self._context.append({'score': score, 'speaker': speaker, 'position': position / total})
+        if self._history is not None:
+            self._history.append((compound, polarity, neu, speaker))
+        if self.escalation is not None:
+            alert = self.escalation.add(position, speaker, score)
+            if alert is not None:
+                self._alerts.append(alert)
+        self._add_score(score, neu, speaker)
+
+    def pop_alerts(self):
+        """Escalation alerts raised since the last call, oldest first"""
+        alerts, self._alerts = self._alerts, []
+        return alerts
+
+    def _add_score(self, score, neu, speaker=None):
+        self.count += 1
+        n = self.count
+        if n <= 3:
+            self._head.append(score)
+        self._tail.append(score)
+
+        # Welford updates over (x = sentence index, y = score)
+        x = n - 1
+        dx = x - self._mean_x
+        self._mean_x += dx / n
+        dy = score - self._mean
+        self._mean += dy / n
+        self._m2 += dy * (score - self._mean)
+        self._m2_x += dx * (x - self._mean_x)
+        self._c_xy += dx * (score - self._mean)
+
+        if self._previous is not None:
+            self._abs_diff += abs(score - self._previous)
+        self._previous = score
+        self._low = score if self._low is None else min(self._low, score)
+        self._high = score if self._high is None else max(self._high, score)
+
+        self._detector.add(score, speaker)
+
+        state = self.analyzer._get_detailed_emotional_state(score, {'neu': neu})
+        self._state_counts[state] = self._state_counts.get(state, 0) + 1
+        self._state_intensity[state] = self._state_intensity.get(state, 0.0) + abs(score)
+        self._total_intensity += abs(score)
+
+    def snapshot(self):
+        """The journey for everything seen so far, in O(segments)"""
+        analyzer = self.analyzer
+        if not self.count:
+            return analyzer._get_default_journey()
+
+        n = self.count
+        start_score = analyzer._calculate_initial_sentiment(self._head)
+        end_score = analyzer._calculate_final_sentiment(list(self._tail))
+        std = math.sqrt(self._m2 / n)
+
+        if n < 2:
+            fluctuation, stability, strength, direction = 0, 1.0, 0, 'stable'
+        else:
+            fluctuation = std * 0.7 + (self._high - self._low) * 0.3
+            rate_of_change = self._abs_diff / (n - 1)
+            stability = max(0.0, min(1.0, 1.0 - (self._m2 / n * 0.5 + rate_of_change * 0.5)))
+            strength = abs(math.tanh(self._c_xy / self._m2_x * 3))
+            window = min(3, n)
+            diff = sum(list(self._tail)[-window:]) / window - sum(self._head[:window]) / window
+            if abs(diff) < 0.1 * std + 0.05:
+                direction = 'stable'
+            else:
+                direction = 'improving' if diff > 0 else 'declining'
+
+        return {
+            'start': {
+                'score': round(start_score, 3),
+                'state': analyzer._get_detailed_emotional_state(start_score, None)
+            },
+            'end': {
+                'score': round(end_score, 3),
+                'state': analyzer._get_detailed_emotional_state(end_score, None)
+            },
+            'fluctuation': round(fluctuation, 3),
+            'stability': round(stability * 100, 3),
+            'trend': {
+                'direction': direction,
+                'strength': round(strength * 100, 3)
+            },
+            'dominant_emotion': self._dominant_emotion(),
+            'emotional_range': {
+                'min': round(self._low, 3),
+                'max': round(self._high, 3)
+            },
+            'change_points': self._detector.change_points()
+        }
+
+    def _dominant_emotion(self):
+        """Same weighting as _calculate_dominant_emotion, from running counts"""
+        n = self.count
+        final_weights = {}
+        for emotion, count in self._state_counts.items():
+            intensity_weight = (
+                self._state_intensity[emotion] / self._total_intensity if self._total_intensity else 0.0
+            )
+            final_weights[emotion] = count / n * 0.6 + intensity_weight * 0.4
+        dominant_emotion = max(final_weights.items(), key=lambda x: x[1])[0]
+
+        # Special case for mixed emotions
+        if len(self._state_counts) > 2 and max(self._state_counts.values()) < n * 0.4:
+            return "mixed"
+        return dominant_emotion
+
+    def finalize(self):
+        """
+        Rescore with the real sentence count if positions were provisional
+        and return the final journey. No sentences can be added afterwards.
+        """
+        if self._history is not None:
+            history = self._history
+            self._history = None
+            self.total_sentences = len(history)
+            self.count = 0
+            self._context.clear()
+            self._reset_metrics()
+            # The live alarm has already seen these sentences
+            escalation, self.escalation = self.escalation, None
+            for item in history:
+                self._add_scored(*item)
+            self.escalation = escalation
+        self.total_sentences = self.count
+        return self.snapshot()
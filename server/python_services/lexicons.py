@@ -0,0 +1,390 @@
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import tempfile
+from collections.abc import Mapping
+from zlib import crc32
+
+import textblob.en
+import vaderSentiment.vaderSentiment
+from textblob.en import Sentiment, sentiment as pattern_sentiment
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from disk_cache import DEFAULT_CACHE_DIR
+
+# File layout: MAGIC, format version (u32) and header length (u64), then a
+# JSON header naming each section's [offset, length], then the sections,
+# each 8-byte aligned. Arrays are in native byte order, recorded in the
+# header so a file from another machine is rejected rather than misread.
+MAGIC = b'SLEX'
+VERSION = 1
+_PREAMBLE = struct.Struct('<4sIQ')
+
+# Valences are kept as float64: float32 would round values such as 0.9
+# and the scores would no longer match the library lookups exactly.
+_FLOAT = 'd'
+
+def lexicon_sources():
+    """{name: path} of the lexicon files the compiled tables are built from"""
+    vader_dir = os.path.dirname(os.path.abspath(vaderSentiment.vaderSentiment.__file__))
+    return {
+        'vader': os.path.join(vader_dir, 'vader_lexicon.txt'),
+        'emoji': os.path.join(vader_dir, 'emoji_utf8_lexicon.txt'),
+        'pattern': os.path.join(os.path.dirname(textblob.en.__file__), 'en-sentiment.xml')
+    }
+
+def source_digests():
+    """SHA-256 of each lexicon source file, read from disk"""
+    digests = {}
+    for name, path in lexicon_sources().items():
+        with open(path, 'rb') as source:
+            digests[name] = hashlib.sha256(source.read()).hexdigest()
+    return digests
+
+class MappedTable(Mapping):
+    """
+    Read-only dict over one table of a LexiconStore. Keys live in an
+    open-addressing hash table (CRC-32, linear probing) so a lookup costs one
+    hash and usually one key comparison; values are decoded on access.
+    Resolved lookups, hits and misses alike, are remembered per process up
+    to MEMO_SIZE keys, since text keeps asking about the same few words.
+    """
+    MEMO_SIZE = 16384
+
+    def __init__(self, buffer, spec):
+        self.kind = spec['kind']
+        self.count = spec['count']
+        sections = {name: buffer[start:start + length] for name, (start, length) in spec['sections'].items()}
+        self._slots = sections['slots'].cast('i')
+        self._mask = len(self._slots) - 1
+        self._key_offsets = sections['key_offsets'].cast('I')
+        self._keys = sections['keys']
+        self._memo = {}
+        if self.kind == 'float':
+            self._values = sections['values'].cast(_FLOAT)
+        elif self.kind == 'text':
+            self._value_offsets = sections['value_offsets'].cast('I')
+            self._values = sections['values']
+        elif self.kind == 'senses':
+            self._sense_offsets = sections['sense_offsets'].cast('I')
+            self._sense_tags = sections['sense_tags'].cast('b')
+            self._values = sections['values'].cast(_FLOAT)
+            self._tags = spec['tags']
+        else:
+            raise ValueError(f"Unknown lexicon table kind: {self.kind}")
+
+    def _find(self, key):
+        index = self._memo.get(key)
+        if index is None:
+            index = self._probe(key)
+            if len(self._memo) >= self.MEMO_SIZE:
+                self._memo.clear()
+            self._memo[key] = index
+        return index
+
+    def _probe(self, key):
+        try:
+            data = key.encode('utf-8')
+        except (AttributeError, UnicodeEncodeError):
+            return -1
+        slots, offsets, keys = self._slots, self._key_offsets, self._keys
+        slot = crc32(data) & self._mask
+        while True:
+            index = slots[slot]
+            if index < 0 or keys[offsets[index]:offsets[index + 1]] == data:
+                return index
+            slot = (slot + 1) & self._mask
+
+    def _value(self, index):
+        if self.kind == 'float':
+            return self._values[index]
+        if self.kind == 'text':
+            return str(self._values[self._value_offsets[index]:self._value_offsets[index + 1]], 'utf-8')
+        senses = {}
+        for sense in range(self._sense_offsets[index], self._sense_offsets[index + 1]):
+            senses[self._tags[self._sense_tags[sense]]] = list(self._values[3 * sense:3 * sense + 3])
+        return senses
+
+    def __contains__(self, key):
+        return self._find(key) >= 0
+
+    def __getitem__(self, key):
+        index = self._find(key)
+        if index < 0:
+            raise KeyError(key)
+        return self._value(index)
+
+    def get(self, key, default=None):
+        index = self._find(key)
+        return self._value(index) if index >= 0 else default
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        offsets = self._key_offsets
+        for index in range(self.count):
+            yield str(self._keys[offsets[index]:offsets[index + 1]], 'utf-8')
+
+class LexiconStore:
+    """
+    The VADER lexicon, VADER emoji descriptions and TextBlob's pattern
+    lexicon, compiled by compile_lexicons() into one file and memory-mapped
+    read-only. Every worker mapping the same file shares one copy of it in
+    the page cache, and opening it parses nothing but a small header.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as source:
+            self._mmap = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, header_length = _PREAMBLE.unpack_from(self._mmap)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} lexicon file")
+            self.header = json.loads(self._mmap[_PREAMBLE.size:_PREAMBLE.size + header_length])
+            if self.header['byteorder'] != sys.byteorder:
+                raise ValueError(f"{path} was compiled on a {self.header['byteorder']}-endian machine")
+            buffer = memoryview(self._mmap)
+            self.tables = {name: MappedTable(buffer, spec) for name, spec in self.header['tables'].items()}
+        except Exception:
+            self._mmap.close()
+            raise
+
+    @property
+    def digests(self):
+        return {name: source['sha256'] for name, source in self.header['sources'].items()}
+
+    def is_current(self):
+        """True if the source files still look the way they did at compile time"""
+        try:
+            sources = lexicon_sources()
+            for name, recorded in self.header['sources'].items():
+                stat = os.stat(sources[name])
+                if (stat.st_size, stat.st_mtime_ns) != (recorded['size'], recorded['mtime_ns']):
+                    return False
+        except (OSError, KeyError):
+            return False
+        return True
+
+    def vader_analyzer(self):
+        return MappedSentimentIntensityAnalyzer(self)
+
+    def pattern_sentiment(self):
+        return _mapped_sentiment(self)
+
+def _build_table(kind, items, tags=None):
+    """Sections for one table from (key, value) pairs, as {name: bytes}"""
+    keys = [key.encode('utf-8') for key, _ in items]
+    size = 8
+    while size < 2 * len(keys):
+        size *= 2
+    slots = [-1] * size
+    for index, data in enumerate(keys):
+        slot = crc32(data) & (size - 1)
+        while slots[slot] >= 0:
+            slot = (slot + 1) & (size - 1)
+        slots[slot] = index
+
+    offsets = [0]
+    for data in keys:
+        offsets.append(offsets[-1] + len(data))
+    sections = {
+        'slots': struct.pack(f'={size}i', *slots),
+        'key_offsets': struct.pack(f'={len(offsets)}I', *offsets),
+        'keys': b''.join(keys)
+    }
+
+    if kind == 'float':
+        sections['values'] = struct.pack(f'={len(items)}{_FLOAT}', *(value for _, value in items))
+    elif kind == 'text':
+        encoded = [value.encode('utf-8') for _, value in items]
+        value_offsets = [0]
+        for data in encoded:
+            value_offsets.append(value_offsets[-1] + len(data))
+        sections['value_offsets'] = struct.pack(f'={len(value_offsets)}I', *value_offsets)
+        sections['values'] = b''.join(encoded)
+    else:
+        sense_offsets, sense_tags, values = [0], [], []
+        for _, senses in items:
+            for tag, psi in senses.items():
+                sense_tags.append(tags.index(tag))
+                values.extend(psi)
+            sense_offsets.append(len(sense_tags))
+        sections['sense_offsets'] = struct.pack(f'={len(sense_offsets)}I', *sense_offsets)
+        sections['sense_tags'] = struct.pack(f'={len(sense_tags)}b', *sense_tags)
+        sections['values'] = struct.pack(f'={len(values)}{_FLOAT}', *values)
+    return sections
+
+def compile_lexicons(path=None):
+    """
+    Load the lexicons through the libraries themselves and write their
+    final in-memory form to path, so lookups match the libraries exactly.
+    The file is replaced atomically; returns its path.
+    """
+    path = path or default_path()
+    sources = {}
+    for name, source in lexicon_sources().items():
+        stat = os.stat(source)
+        sources[name] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    for name, digest in source_digests().items():
+        sources[name]['sha256'] = digest
+
+    vader = SentimentIntensityAnalyzer()
+    pattern = pattern_sentiment
+    len(pattern)  # Loads the lazy pattern lexicon
+    words = list(dict.items(pattern))
+    tags = sorted({tag for _, senses in words for tag in senses}, key=lambda tag: (tag is not None, tag or ''))
+    tables = {
+        'vader': _build_table('float', list(vader.lexicon.items())),
+        'emoji': _build_table('text', list(vader.emojis.items())),
+        'pattern': _build_table('senses', words, tags)
+    }
+    header = {
+        'byteorder': sys.byteorder,
+        'sources': sources,
+        'pattern': {'labeler': dict(pattern.labeler), 'language': pattern.language},
+        'tables': {
+            'vader': {'kind': 'float', 'count': len(vader.lexicon)},
+            'emoji': {'kind': 'text', 'count': len(vader.emojis)},
+            'pattern': {'kind': 'senses', 'count': len(words), 'tags': tags}
+        }
+    }
+
+    # Section offsets depend on the header length, which depends on the
+    # offsets; lay out twice with the header padded to a fixed size
+    def layout(header_size):
+        offset = _PREAMBLE.size + header_size
+        for name, sections in tables.items():
+            spec = header['tables'][name]['sections'] = {}
+            for section, data in sections.items():
+                offset += -offset % 8
+                spec[section] = [offset, len(data)]
+                offset += len(data)
+        return json.dumps(header).encode('utf-8')
+
+    encoded = layout(0)
+    header_size = len(encoded) + 256
+    encoded = layout(header_size)
+    assert len(encoded) <= header_size
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=directory or '.', prefix='.lexicons-')
+    try:
+        with os.fdopen(handle, 'wb') as out:
+            out.write(_PREAMBLE.pack(MAGIC, VERSION, header_size))
+            out.write(encoded.ljust(header_size))
+            position = _PREAMBLE.size + header_size
+            for name, sections in tables.items():
+                for section, data in sections.items():
+                    start = header['tables'][name]['sections'][section][0]
+                    out.write(b'\0' * (start - position))
+                    out.write(data)
+                    position = start + len(data)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return path
+
+def default_path():
+    return os.path.join(DEFAULT_CACHE_DIR, 'lexicons.bin')
+
+def load_lexicons(path=None):
+    """
+    Open the compiled lexicons, compiling them first when the file is
+    missing or older than the library lexicons. Returns None when the
+    store can't be used, so callers fall back to the library lookups.
+    """
+    path = path or default_path()
+    try:
+        try:
+            store = LexiconStore(path)
+            if store.is_current():
+                return store
+        except (OSError, ValueError, struct.error):
+            pass  # Missing, truncated or from another version: rebuild it
+        compile_lexicons(path)
+        return LexiconStore(path)
+    except (OSError, ValueError) as e:
+        print(f"Compiled lexicons unavailable, using library lookups: {e}", file=sys.stderr)
+        return None
+
+def lexicons_from_env():
+    """
+    The store configured by SENTIMENT_LEXICONS (a file path, or "off" to
+    use the library lookups). Returns None when disabled or unusable.
+    """
+    setting = os.environ.get('SENTIMENT_LEXICONS', '')
+    if setting.lower() in ('off', '0', 'false', 'none'):
+        return None
+    return load_lexicons(setting or None)
+
+class MappedSentimentIntensityAnalyzer(SentimentIntensityAnalyzer):
+    """SentimentIntensityAnalyzer whose lexicon and emoji tables come from a LexiconStore"""
+
+    def __init__(self, store):
+        # Nothing to parse, so the base initializer is skipped
+        self.lexicon = store.tables['vader']
+        self.emojis = store.tables['emoji']
+
+class MappedSentiment(Sentiment):
+    """TextBlob's pattern Sentiment reading its words from a LexiconStore"""
+
+    def __init__(self, table, like, labeler, language):
+        super().__init__(
+            path=like.path,
+            synset=like._synset,
+            confidence=like.confidence,
+            tokenizer=like.tokenizer,
+            negations=like.negations,
+            modifiers=like.modifiers,
+            modifier=like.modifier
+        )
+        self._table = table
+        self._language = language
+        self.labeler = dict(labeler)
+
+    def load(self, path=None):
+        pass  # The words are already in the mapped table
+
+    def __contains__(self, word):
+        return word in self._table
+
+    def __getitem__(self, word):
+        return self._table[word]
+
+    def get(self, word, default=None):
+        return self._table.get(word, default)
+
+    def __len__(self):
+        return len(self._table)
+
+    def __iter__(self):
+        return iter(self._table)
+
+    def keys(self):
+        return self._table.keys()
+
+    def items(self):
+        return self._table.items()
+
+    def values(self):
+        return self._table.values()
+
+def _mapped_sentiment(store):
+    pattern = store.header['pattern']
+    return MappedSentiment(store.tables['pattern'], pattern_sentiment, pattern['labeler'], pattern['language'])
+
+def main(argv):
+    path = argv[0] if argv else None
+    print(json.dumps({"compiled": compile_lexicons(path)}))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
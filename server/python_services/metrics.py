@@ -0,0 +1,139 @@
+import os
+import threading
+from bisect import bisect_left
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return '{' + ','.join(parts) + '}'
+
+class Metrics:
+    """
+    Process-wide counters, gauges and per-stage latency histograms. The
+    analysis server updates them from its translation and scoring threads,
+    so every update and read holds a lock.
+    """
+    enabled = True
+
+    def __init__(self, prefix='sentiment'):
+        self.prefix = prefix
+        self.counters = {}
+        self.gauges = {}
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def record(self, stage_times):
+        for stage, seconds in stage_times.items():
+            self.observe(stage, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "stages": {
+                    stage: {"count": h.count, "sum_seconds": round(h.sum, 6)}
+                    for stage, h in self.stages.items()
+                }
+            }
+
+    def render(self, labels=None, extra_counters=None):
+        """
+        Prometheus text exposition (format 0.0.4). labels are added to every
+        sample; extra_counters are cumulative values kept elsewhere, such as
+        cache statistics.
+        """
+        with self._lock:
+            return self._render(dict(labels or {}), extra_counters)
+
+    def _render(self, labels, extra_counters):
+        prefix = self.prefix
+        lines = []
+
+        counters = dict(self.counters)
+        counters.update(extra_counters or {})
+        for name in sorted(counters):
+            metric = f'{prefix}_{name}_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{_format_labels(labels)} {counters[name]}')
+
+        for name in sorted(self.gauges):
+            metric = f'{prefix}_{name}'
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric}{_format_labels(labels)} {self.gauges[name]}')
+
+        if self.stages:
+            metric = f'{prefix}_stage_seconds'
+            lines.append(f'# HELP {metric} Time spent in each analysis stage')
+            lines.append(f'# TYPE {metric} histogram')
+            for stage in sorted(self.stages):
+                histogram = self.stages[stage]
+                stage_labels = dict(labels, stage=stage)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{metric}_bucket{_format_labels(dict(stage_labels, le=le))} {cumulative}')
+                lines.append(f'{metric}_sum{_format_labels(stage_labels)} {histogram.sum}')
+                lines.append(f'{metric}_count{_format_labels(stage_labels)} {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
+
+class NullMetrics(Metrics):
+    """Drop-in for Metrics when instrumentation is turned off"""
+    enabled = False
+
+    def inc(self, name, amount=1):
+        pass
+
+    def set_gauge(self, name, value):
+        pass
+
+    def observe(self, stage, seconds):
+        pass
+
+    def record(self, stage_times):
+        pass
+
+def metrics_from_env():
+    """Metrics, or NullMetrics when SENTIMENT_METRICS is off"""
+    if os.environ.get('SENTIMENT_METRICS', '').lower() in ('off', '0', 'false', 'none'):
+        return NullMetrics()
+    return Metrics()
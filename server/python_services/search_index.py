@@ -0,0 +1,945 @@
+import os
+import re
+import sys
+import json
+import mmap
+import time
+import struct
+import argparse
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+
+from disk_cache import DEFAULT_CACHE_DIR
+
+# Segment file layout, as in lexicons.py: MAGIC, format version (u32) and
+# header length (u64), a JSON header naming each section's [offset, length],
+# then the sections, each 8-byte aligned. Arrays are in native byte order.
+MAGIC = b'SIDX'
+VERSION = 1
+_PREAMBLE = struct.Struct('<4sIQ')
+
+# Document sets are stored as delta-encoded varints, or as a bitmap over
+# the segment when that is smaller (more than about one document in eight)
+SPARSE, DENSE = 0, 1
+
+# The facets the Node routes index analyses by
+FACETS = ('sentiment', 'trend', 'emotion', 'agent')
+
+# Most terms a prefix query (refund*) may expand to
+MAX_PREFIX_TERMS = 1000
+
+# Words in any script: letters and digits plus the combining vowel signs
+# of the Indian scripts, which \w alone would split words on
+_WORD = re.compile(r'[^\W_][\w\u0900-\u0dff]*')
+
+def tokenize(text):
+    """Distinct lowercase words of text, in first-seen order"""
+    return list(dict.fromkeys(_WORD.findall((text or '').lower())))
+
+def encode_varints(values):
+    """LEB128 bytes for an array of non-negative integers"""
+    values = np.asarray(values, dtype=np.uint64)
+    if not len(values):
+        return b''
+    lengths = np.ones(len(values), dtype=np.int64)
+    for shift in (7, 14, 21, 28, 35):
+        lengths += values >= (1 << shift)
+    starts = np.cumsum(lengths) - lengths
+    out = np.zeros(int(lengths.sum()), dtype=np.uint8)
+    for k in range(int(lengths.max())):
+        has = lengths > k
+        more = (lengths[has] - 1 > k).astype(np.uint8) << 7
+        out[starts[has] + k] = ((values[has] >> np.uint64(7 * k)) & np.uint64(0x7f)).astype(np.uint8) | more
+    return out.tobytes()
+
+def decode_varints(data):
+    """Array of the integers in LEB128 bytes, decoded without a Python loop"""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if not len(raw):
+        return np.zeros(0, dtype=np.uint64)
+    ends = np.flatnonzero(raw < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    shifts = (np.arange(len(raw)) - np.repeat(starts, ends - starts + 1)) * 7
+    parts = (raw & 0x7f).astype(np.uint64) << shifts.astype(np.uint64)
+    return np.add.reduceat(parts, starts)
+
+def encode_set(indices, count):
+    """(kind, bytes) for sorted document indices in a segment of count documents"""
+    indices = np.asarray(indices, dtype=np.int64)
+    deltas = np.diff(indices, prepend=-1) - 1
+    sparse = encode_varints(deltas)
+    if len(sparse) <= (count + 7) // 8:
+        return SPARSE, sparse
+    mask = np.zeros(count, dtype=bool)
+    mask[indices] = True
+    return DENSE, np.packbits(mask, bitorder='little').tobytes()
+
+def decode_set(kind, data, count):
+    """Boolean mask over the segment's documents for an encode_set() result"""
+    if kind == DENSE:
+        return np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=count, bitorder='little').astype(bool)
+    mask = np.zeros(count, dtype=bool)
+    if len(data):
+        mask[np.cumsum(decode_varints(data).astype(np.int64) + 1) - 1] = True
+    return mask
+
+def _oid(value):
+    if isinstance(value, dict):
+        return value.get('$oid') or str(value)
+    return None if value is None else str(value)
+
+def _millis(value):
+    """Epoch milliseconds for an ISO string, epoch number or extended-JSON $date"""
+    if isinstance(value, dict):
+        value = value.get('$date', value.get('$numberLong'))
+        if isinstance(value, dict):
+            value = value.get('$numberLong')
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() * 1000)
+    if isinstance(value, datetime):
+        moment = value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+        return int(moment.timestamp() * 1000)
+    return int(value)
+
+def document_entry(document):
+    """
+    The indexed form of a stored SentimentAnalysis document, from either
+    the API (plain JSON) or mongoexport (extended JSON): its id, text,
+    creation time in epoch milliseconds, and facet values.
+    """
+    journey = document.get('emotionalJourney') or {}
+    trend = journey.get('trend') or {}
+    facets = {
+        'sentiment': document.get('sentiment'),
+        'trend': trend.get('direction'),
+        'emotion': journey.get('dominantEmotion'),
+        'agent': _oid(document.get('agent'))
+    }
+    return {
+        'id': _oid(document.get('_id', document.get('id'))),
+        'text': document.get('text') or '',
+        'created': _millis(document.get('createdAt')) or 0,
+        'facets': {field: str(value) for field, value in facets.items() if value is not None}
+    }
+
+def _bisect(count, key_at, target):
+    """First index in [0, count) whose key is >= target"""
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        if key_at(middle) < target:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+class Segment:
+    """
+    One immutable segment file, memory-mapped read-only: the documents'
+    ids (in arrival order, plus a sorted permutation for lookups), creation
+    times, a sorted term dictionary with a posting set per term, and a set
+    per facet value. Deletions are kept beside it, since the file never
+    changes once written.
+    """
+
+    def __init__(self, path, deleted=()):
+        self.path = path
+        with open(path, 'rb') as source:
+            self._mmap = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, header_length = _PREAMBLE.unpack_from(self._mmap)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} index segment")
+            self.header = json.loads(self._mmap[_PREAMBLE.size:_PREAMBLE.size + header_length])
+            if self.header['byteorder'] != sys.byteorder:
+                raise ValueError(f"{path} was written on a {self.header['byteorder']}-endian machine")
+        except Exception:
+            self._mmap.close()
+            raise
+        self.count = self.header['count']
+        sections = self.header['sections']
+        self._keys = self._section('keys')
+        self._key_offsets = self._array('key_offsets', np.uint64)
+        self._key_order = self._array('key_order', np.uint32)
+        self.created = self._array('created', np.int64)
+        self._terms = self._section('terms')
+        self._term_offsets = self._array('term_offsets', np.uint64)
+        self._posting_offsets = self._array('posting_offsets', np.uint64)
+        self._posting_kinds = self._array('posting_kinds', np.uint8)
+        self._postings = self._section('postings')
+        self._facets = self._section('facets')
+        self.terms = len(self._term_offsets) - 1
+        self.size = sum(length for _, length in sections.values())
+        self.deleted = set(deleted)
+        self._live = None
+
+    def _section(self, name):
+        start, length = self.header['sections'][name]
+        return memoryview(self._mmap)[start:start + length]
+
+    def _array(self, name, dtype):
+        start, length = self.header['sections'][name]
+        return np.frombuffer(self._mmap, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=start)
+
+    def key(self, index):
+        return bytes(self._keys[int(self._key_offsets[index]):int(self._key_offsets[index + 1])]).decode('utf-8')
+
+    def find(self, key):
+        """Index of the document with this id, or None"""
+        position = _bisect(self.count, lambda i: self.key(int(self._key_order[i])), key)
+        if position < self.count:
+            index = int(self._key_order[position])
+            if self.key(index) == key:
+                return index
+        return None
+
+    def _term(self, position):
+        return bytes(self._terms[int(self._term_offsets[position]):int(self._term_offsets[position + 1])])
+
+    def _posting(self, position):
+        start, end = int(self._posting_offsets[position]), int(self._posting_offsets[position + 1])
+        return decode_set(int(self._posting_kinds[position]), self._postings[start:end], self.count)
+
+    def term_set(self, term):
+        target = term.encode('utf-8')
+        position = _bisect(self.terms, self._term, target)
+        if position < self.terms and self._term(position) == target:
+            return self._posting(position)
+        return np.zeros(self.count, dtype=bool)
+
+    def prefix_set(self, prefix):
+        target = prefix.encode('utf-8')
+        mask = np.zeros(self.count, dtype=bool)
+        position = _bisect(self.terms, self._term, target)
+        for position in range(position, min(position + MAX_PREFIX_TERMS, self.terms)):
+            if not self._term(position).startswith(target):
+                break
+            mask |= self._posting(position)
+        return mask
+
+    def facet_set(self, field, value):
+        spec = self.header['facets'].get(field, {}).get(value)
+        if spec is None:
+            return np.zeros(self.count, dtype=bool)
+        start, length, kind = spec
+        return decode_set(kind, self._facets[start:start + length], self.count)
+
+    def facet_values(self, field):
+        return list(self.header['facets'].get(field, {}))
+
+    def live(self):
+        """Mask of the documents not deleted"""
+        if self._live is None:
+            self._live = np.ones(self.count, dtype=bool)
+            if self.deleted:
+                self._live[np.fromiter(self.deleted, dtype=np.int64)] = False
+        return self._live
+
+    def delete(self, index):
+        self.deleted.add(index)
+        self._live = None
+
+    def postings(self):
+        """(term, sorted document indices) for every term, in term order"""
+        for position in range(self.terms):
+            yield self._term(position).decode('utf-8'), np.flatnonzero(self._posting(position))
+
+    def facet_sets(self):
+        for field, values in self.header['facets'].items():
+            for value in values:
+                yield field, value, np.flatnonzero(self.facet_set(field, value))
+
+    def close(self):
+        self._keys = self._terms = self._postings = self._facets = None
+        self._key_offsets = self._key_order = self.created = None
+        self._term_offsets = self._posting_offsets = self._posting_kinds = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # A query still holds a view; the mapping goes with it
+
+class MemorySegment:
+    """The documents added since the last flush, with the same query interface as Segment"""
+
+    def __init__(self):
+        self.keys = []
+        self.index = {}
+        self.created_list = []
+        self.postings_by_term = {}
+        self.facets = {}
+        self.deleted = set()
+        self._live = None
+
+    @property
+    def count(self):
+        return len(self.keys)
+
+    @property
+    def created(self):
+        return np.asarray(self.created_list, dtype=np.int64)
+
+    def add(self, entry):
+        index = len(self.keys)
+        self.keys.append(entry['id'])
+        self.index[entry['id']] = index
+        self.created_list.append(int(entry['created']))
+        for term in tokenize(entry['text']):
+            self.postings_by_term.setdefault(term, []).append(index)
+        for field, value in entry['facets'].items():
+            self.facets.setdefault(field, {}).setdefault(value, []).append(index)
+        self._live = None
+
+    def key(self, index):
+        return self.keys[index]
+
+    def find(self, key):
+        return self.index.get(key)
+
+    def _mask(self, indices):
+        mask = np.zeros(self.count, dtype=bool)
+        if indices:
+            mask[indices] = True
+        return mask
+
+    def term_set(self, term):
+        return self._mask(self.postings_by_term.get(term))
+
+    def prefix_set(self, prefix):
+        mask = np.zeros(self.count, dtype=bool)
+        for term in sorted(term for term in self.postings_by_term if term.startswith(prefix))[:MAX_PREFIX_TERMS]:
+            mask[self.postings_by_term[term]] = True
+        return mask
+
+    def facet_set(self, field, value):
+        return self._mask(self.facets.get(field, {}).get(value))
+
+    def facet_values(self, field):
+        return list(self.facets.get(field, {}))
+
+    def live(self):
+        if self._live is None:
+            self._live = np.ones(self.count, dtype=bool)
+            if self.deleted:
+                self._live[list(self.deleted)] = False
+        return self._live
+
+    def delete(self, index):
+        self.deleted.add(index)
+        self._live = None
+
+    def postings(self):
+        for term in sorted(self.postings_by_term, key=lambda term: term.encode('utf-8')):
+            yield term, np.asarray(self.postings_by_term[term], dtype=np.int64)
+
+    def facet_sets(self):
+        for field, values in self.facets.items():
+            for value, indices in values.items():
+                yield field, value, np.asarray(indices, dtype=np.int64)
+
+def write_segment(path, segments):
+    """
+    Write the live documents of segments, oldest first, into one segment
+    file at path, replaced atomically. Returns the number of documents.
+    """
+    keys, created, remaps = [], [], []
+    for segment in segments:
+        live = segment.live()
+        remap = np.full(segment.count, -1, dtype=np.int64)
+        remap[live] = np.arange(len(keys), len(keys) + int(live.sum()))
+        remaps.append(remap)
+        keys.extend(segment.key(int(index)) for index in np.flatnonzero(live))
+        created.append(np.asarray(segment.created, dtype=np.int64)[live])
+    count = len(keys)
+
+    def merged(sets_by_segment):
+        """{name: sorted new indices} from per-segment (name, indices) iterables"""
+        combined = {}
+        for remap, sets in zip(remaps, sets_by_segment):
+            for name, indices in sets:
+                indices = remap[indices]
+                indices = indices[indices >= 0]
+                if len(indices):
+                    combined.setdefault(name, []).append(indices)
+        return {name: np.concatenate(parts) for name, parts in combined.items()}
+
+    terms = merged(segment.postings() for segment in segments)
+    term_names = sorted(terms, key=lambda term: term.encode('utf-8'))
+    encoded_terms = [term.encode('utf-8') for term in term_names]
+    postings = [encode_set(terms[term], count) for term in term_names]
+
+    facets = merged(
+        (((field, value), indices) for field, value, indices in segment.facet_sets()) for segment in segments
+    )
+    facet_blob = bytearray()
+    facet_specs = {}
+    for (field, value), indices in sorted(facets.items()):
+        kind, data = encode_set(indices, count)
+        facet_specs.setdefault(field, {})[value] = [len(facet_blob), len(data), kind]
+        facet_blob += data
+
+    encoded_keys = [key.encode('utf-8') for key in keys]
+    sections = {
+        'keys': b''.join(encoded_keys),
+        'key_offsets': np.cumsum([0] + [len(key) for key in encoded_keys], dtype=np.uint64).tobytes(),
+        'key_order': np.asarray(sorted(range(count), key=keys.__getitem__), dtype=np.uint32).tobytes(),
+        'created': (np.concatenate(created) if created else np.zeros(0, dtype=np.int64)).tobytes(),
+        'terms': b''.join(encoded_terms),
+        'term_offsets': np.cumsum([0] + [len(term) for term in encoded_terms], dtype=np.uint64).tobytes(),
+        'posting_offsets': np.cumsum([0] + [len(data) for _, data in postings], dtype=np.uint64).tobytes(),
+        'posting_kinds': np.asarray([kind for kind, _ in postings], dtype=np.uint8).tobytes(),
+        'postings': b''.join(data for _, data in postings),
+        'facets': bytes(facet_blob)
+    }
+    header = {'byteorder': sys.byteorder, 'count': count, 'facets': facet_specs}
+
+    # The header holds the section offsets, so lay out twice with it padded
+    def layout(header_size):
+        offset = _PREAMBLE.size + header_size
+        header['sections'] = {}
+        for name, data in sections.items():
+            offset += -offset % 8
+            header['sections'][name] = [offset, len(data)]
+            offset += len(data)
+        return json.dumps(header).encode('utf-8')
+
+    encoded = layout(0)
+    header_size = len(encoded) + 256
+    encoded = layout(header_size)
+
+    directory = os.path.dirname(path) or '.'
+    handle, temporary = tempfile.mkstemp(dir=directory, prefix='.segment-')
+    try:
+        with os.fdopen(handle, 'wb') as out:
+            out.write(_PREAMBLE.pack(MAGIC, VERSION, header_size))
+            out.write(encoded.ljust(header_size))
+            position = _PREAMBLE.size + header_size
+            for name, data in sections.items():
+                start = header['sections'][name][0]
+                out.write(b'\0' * (start - position))
+                out.write(data)
+                position = start + len(data)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return count
+
+class QueryError(ValueError):
+    pass
+
+_QUERY_TOKEN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|(-)(?=\S)|([^\s()"]+))')
+
+def parse_query(query):
+    """
+    Parse a boolean query into a tree of ('term', word), ('prefix', word),
+    ('and', [...]), ('or', [...]), ('not', node) and ('all',) nodes.
+
+        refund AND (late OR delay) NOT cancel*
+        refund -cancelled "still waiting"
+
+    Adjacent terms are ANDed, and so are the words of a quoted phrase
+    (positions aren't indexed). AND, OR and NOT must be upper case.
+    """
+    tokens = []
+    position = 0
+    query = query or ''
+    while position < len(query):
+        match = _QUERY_TOKEN.match(query, position)
+        if not match or match.end() == position:
+            break
+        position = match.end()
+        opening, closing, phrase, minus, word = match.groups()
+        if opening:
+            tokens.append('(')
+        elif closing:
+            tokens.append(')')
+        elif phrase is not None:
+            tokens.append(('phrase', phrase))
+        elif minus:
+            tokens.append('NOT')
+        elif word in ('AND', 'OR', 'NOT'):
+            tokens.append(word)
+        elif word is not None:
+            tokens.append(('word', word))
+
+    def words(text, prefix=False):
+        parts = tokenize(text)
+        if not parts:
+            return ('all',)
+        nodes = [('term', part) for part in parts]
+        if prefix:
+            nodes[-1] = ('prefix', parts[-1])
+        return nodes[0] if len(nodes) == 1 else ('and', nodes)
+
+    def parse_or(at):
+        node, at = parse_and(at)
+        options = [node]
+        while at < len(tokens) and tokens[at] == 'OR':
+            node, at = parse_and(at + 1)
+            options.append(node)
+        return (options[0] if len(options) == 1 else ('or', options)), at
+
+    def parse_and(at):
+        node, at = parse_unary(at)
+        parts = [node]
+        while at < len(tokens) and tokens[at] not in ('OR', ')'):
+            if tokens[at] == 'AND':
+                at += 1
+            node, at = parse_unary(at)
+            parts.append(node)
+        return (parts[0] if len(parts) == 1 else ('and', parts)), at
+
+    def parse_unary(at):
+        if at >= len(tokens):
+            raise QueryError('Query ends where a term was expected')
+        token = tokens[at]
+        if token == 'NOT':
+            node, at = parse_unary(at + 1)
+            return ('not', node), at
+        if token == '(':
+            node, at = parse_or(at + 1)
+            if at >= len(tokens) or tokens[at] != ')':
+                raise QueryError('Missing closing parenthesis')
+            return node, at + 1
+        if isinstance(token, tuple):
+            kind, text = token
+            return words(text, prefix=kind == 'word' and text.endswith('*')), at + 1
+        raise QueryError(f"Unexpected {token!r} in query")
+
+    if not tokens:
+        return ('all',)
+    node, at = parse_or(0)
+    if at != len(tokens):
+        raise QueryError(f"Unexpected {tokens[at]!r} in query")
+    return node
+
+def evaluate(node, segment):
+    """Boolean mask of the segment's documents matching a parse_query() tree"""
+    kind = node[0]
+    if kind == 'all':
+        return np.ones(segment.count, dtype=bool)
+    if kind == 'term':
+        return segment.term_set(node[1])
+    if kind == 'prefix':
+        return segment.prefix_set(node[1])
+    if kind == 'not':
+        return ~evaluate(node[1], segment)
+    if kind == 'and':
+        # Positive terms first, so an empty intersection stops early
+        parts = sorted(node[1], key=lambda part: part[0] == 'not')
+        mask = evaluate(parts[0], segment)
+        for part in parts[1:]:
+            if not mask.any():
+                break
+            mask &= evaluate(part, segment)
+        return mask
+    if kind == 'or':
+        mask = np.zeros(segment.count, dtype=bool)
+        for part in node[1]:
+            mask |= evaluate(part, segment)
+        return mask
+    raise QueryError(f"Unknown query node {kind}")
+
+class SearchIndex:
+    """
+    Inverted index and facet sets over analyzed transcripts, built
+    incrementally as analyses arrive. Additions go to an in-memory segment
+    and an append-only journal (replayed on open, so nothing acknowledged
+    is lost); every flush_docs documents the memory segment is written out
+    as an immutable segment file. Segments of similar size are merged
+    merge_factor at a time, keeping their number logarithmic in the
+    document count and dropping deleted documents. One process writes an
+    index at a time.
+    """
+
+    def __init__(self, directory, flush_docs=20000, merge_factor=8):
+        self.directory = directory
+        self.flush_docs = flush_docs
+        self.merge_factor = merge_factor
+        os.makedirs(directory, exist_ok=True)
+        self._manifest_path = os.path.join(directory, 'manifest.json')
+        self._journal_path = os.path.join(directory, 'journal.jsonl')
+
+        manifest = {'next_segment': 0, 'segments': []}
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path, encoding='utf-8') as source:
+                manifest = json.load(source)
+        self._next_segment = manifest['next_segment']
+        self.segments = [
+            Segment(os.path.join(directory, spec['name']), spec.get('deleted', ()))
+            for spec in manifest['segments']
+        ]
+        self.memory = MemorySegment()
+        self.stats_counters = {'added': 0, 'removed': 0, 'flushes': 0, 'merges': 0, 'queries': 0}
+        self._replay()
+        self._journal = open(self._journal_path, 'a', encoding='utf-8')
+
+    @classmethod
+    def from_env(cls):
+        """
+        The index configured by SENTIMENT_SEARCH_INDEX (a directory, or
+        "off"). Returns None when disabled.
+        """
+        setting = os.environ.get('SENTIMENT_SEARCH_INDEX', '')
+        if setting.lower() in ('off', '0', 'false', 'none'):
+            return None
+        return cls(setting or os.path.join(DEFAULT_CACHE_DIR, 'search-index'))
+
+    def _replay(self):
+        if not os.path.exists(self._journal_path):
+            return
+        with open(self._journal_path, encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # A write torn by a crash; nothing after it was acknowledged
+                if record['op'] == 'add':
+                    self._add(record['entry'])
+                else:
+                    self._remove(record['id'])
+
+    def _log(self, record):
+        self._journal.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._journal.flush()
+
+    def _locate(self, key):
+        """(segment, index) of the live document with this id, or None"""
+        for segment in [self.memory] + self.segments[::-1]:
+            index = segment.find(key)
+            if index is not None and index not in segment.deleted:
+                return segment, index
+        return None
+
+    def _add(self, entry):
+        self._remove(entry['id'])
+        self.memory.add(entry)
+
+    def _remove(self, key):
+        found = self._locate(key)
+        if found is None:
+            return False
+        segment, index = found
+        segment.delete(index)
+        return True
+
+    def add(self, entry):
+        """Index one document_entry(); a document with the same id is replaced"""
+        if not entry.get('id'):
+            raise ValueError('Indexed documents need an id')
+        self._log({'op': 'add', 'entry': entry})
+        self._add(entry)
+        self.stats_counters['added'] += 1
+        if self.memory.count >= self.flush_docs:
+            self.flush()
+
+    def remove(self, key):
+        """Delete the document with this id; False if it isn't indexed"""
+        if self._locate(key) is None:
+            return False
+        self._log({'op': 'remove', 'id': key})
+        self.stats_counters['removed'] += 1
+        return self._remove(key)
+
+    def _write_manifest(self):
+        manifest = {
+            'next_segment': self._next_segment,
+            'segments': [
+                {'name': os.path.basename(segment.path), 'deleted': sorted(segment.deleted)}
+                for segment in self.segments
+            ]
+        }
+        temporary = f"{self._manifest_path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as target:
+            json.dump(manifest, target)
+            target.flush()
+            os.fsync(target.fileno())
+        os.replace(temporary, self._manifest_path)
+
+    def _new_segment_path(self):
+        path = os.path.join(self.directory, f"segment-{self._next_segment:06d}.idx")
+        self._next_segment += 1
+        return path
+
+    def flush(self):
+        """Write the memory segment out, record deletions, and merge if due"""
+        if self.memory.count and self.memory.live().any():
+            path = self._new_segment_path()
+            write_segment(path, [self.memory])
+            self.segments.append(Segment(path))
+            self.stats_counters['flushes'] += 1
+        self.memory = MemorySegment()
+        self._write_manifest()
+        # Everything in the journal is now in the manifest and segments
+        self._journal.close()
+        self._journal = open(self._journal_path, 'w', encoding='utf-8')
+        self._merge_due()
+
+    def _level(self, segment):
+        live = max(1, segment.count - len(segment.deleted))
+        level = 0
+        while live > self.flush_docs * self.merge_factor ** level:
+            level += 1
+        return level
+
+    def _merge_due(self):
+        while len(self.segments) >= self.merge_factor:
+            level = self._level(self.segments[-1])
+            run = 1
+            while run < len(self.segments) and self._level(self.segments[-run - 1]) <= level:
+                run += 1
+            if run < self.merge_factor:
+                return
+            self._merge(len(self.segments) - run, len(self.segments))
+
+    def _merge(self, start, end):
+        merging = self.segments[start:end]
+        path = self._new_segment_path()
+        if write_segment(path, merging):
+            replacement = [Segment(path)]
+        else:
+            os.unlink(path)
+            replacement = []
+        self.segments[start:end] = replacement
+        self._write_manifest()
+        for segment in merging:
+            segment.close()
+            os.unlink(segment.path)
+        self.stats_counters['merges'] += 1
+
+    def optimize(self):
+        """Flush, then merge every segment into one"""
+        self.flush()
+        if len(self.segments) > 1 or any(segment.deleted for segment in self.segments):
+            self._merge(0, len(self.segments))
+
+    def search(self, query='', facets=None, created_from=None, created_to=None, offset=0, limit=20,
+               facet_counts=False):
+        """
+        Ids of the documents matching a boolean query (see parse_query())
+        and facet filters, newest first. facets maps a field to a value or
+        a list of values (any of which may match); fields combine with AND.
+        created_from and created_to bound the creation time, in epoch
+        milliseconds. With facet_counts, also counts every facet value
+        over the whole match.
+        """
+        started = time.perf_counter()
+        tree = parse_query(query)
+        filters = {
+            field: [values] if isinstance(values, str) else list(values)
+            for field, values in (facets or {}).items() if values not in (None, '', [])
+        }
+
+        total = 0
+        ids = []
+        counts = {} if facet_counts else None
+        for segment in [self.memory] + self.segments[::-1]:
+            if not segment.count:
+                continue
+            mask = segment.live().copy()
+            for field, values in filters.items():
+                if not mask.any():
+                    break
+                allowed = np.zeros(segment.count, dtype=bool)
+                for value in values:
+                    allowed |= segment.facet_set(field, str(value))
+                mask &= allowed
+            if created_from is not None or created_to is not None:
+                created = segment.created
+                if created_from is not None:
+                    mask &= created >= created_from
+                if created_to is not None:
+                    mask &= created <= created_to
+            if mask.any():
+                mask &= evaluate(tree, segment)
+
+            # Segments are newest first, so the page is a window over
+            # the matches of each in turn
+            matches = np.flatnonzero(mask)
+            start, stop = max(0, offset - total), min(len(matches), offset + limit - total)
+            if stop > start:
+                ids.extend(segment.key(int(index)) for index in matches[::-1][start:stop])
+            total += len(matches)
+
+            if counts is not None and len(matches):
+                for field in FACETS:
+                    for value in segment.facet_values(field):
+                        hits = int(np.count_nonzero(segment.facet_set(field, value)[matches]))
+                        if hits:
+                            counts.setdefault(field, {})
+                            counts[field][value] = counts[field].get(value, 0) + hits
+
+        self.stats_counters['queries'] += 1
+        result = {'total': total, 'ids': ids, 'took_ms': round((time.perf_counter() - started) * 1000, 3)}
+        if counts is not None:
+            result['facets'] = counts
+        return result
+
+    def stats(self):
+        return {
+            'documents': sum(segment.count - len(segment.deleted) for segment in [self.memory] + self.segments),
+            'deleted': sum(len(segment.deleted) for segment in [self.memory] + self.segments),
+            'buffered': self.memory.count,
+            'segments': [
+                {'name': os.path.basename(segment.path), 'documents': segment.count,
+                 'deleted': len(segment.deleted), 'terms': segment.terms, 'bytes': segment.size}
+                for segment in self.segments
+            ],
+            **self.stats_counters
+        }
+
+    def close(self):
+        self.flush()
+        self._journal.close()
+        for segment in self.segments:
+            segment.close()
+
+def serve(index, stdin=sys.stdin, stdout=sys.stdout):
+    """
+    Index worker loop, speaking the same newline-delimited JSON as the
+    analysis workers (see sentiment_service.serve):
+
+        {"id": 1, "op": "add", "document": {...}}  -> {"id": 1, "result": {"indexed": "<id>"}}
+        {"id": 2, "op": "remove", "key": "<id>"}    -> {"id": 2, "result": {"removed": true}}
+        {"id": 3, "op": "search", "query": "refund -cancel*", "facets": {"agent": "..."},
+         "created_from": ms, "created_to": ms, "offset": 0, "limit": 20}
+                                                   -> {"id": 3, "result": {"total": n, "ids": [...]}}
+        {"id": 4, "op": "flush"} / "stats" / "ping" / "shutdown"
+
+    A document is a stored SentimentAnalysis (see document_entry). A bad
+    query is answered with an error whose "code" is "bad_query". The
+    buffered documents are flushed when stdin closes.
+    """
+    def send(message):
+        stdout.write(json.dumps(message, ensure_ascii=False) + "\n")
+        stdout.flush()
+
+    send({"event": "ready", "pid": os.getpid()})
+    try:
+        for line in stdin:
+            line = line.strip()
+            if not line:
+                continue
+
+            request_id = None
+            try:
+                request = json.loads(line)
+                request_id = request.get("id")
+                op = request.get("op")
+
+                if op == "add":
+                    entry = document_entry(request.get("document") or {})
+                    index.add(entry)
+                    send({"id": request_id, "result": {"indexed": entry['id']}})
+                elif op == "remove":
+                    send({"id": request_id, "result": {"removed": index.remove(str(request.get("key")))}})
+                elif op == "search":
+                    send({"id": request_id, "result": index.search(
+                        request.get("query") or '',
+                        facets=request.get("facets"),
+                        created_from=request.get("created_from"),
+                        created_to=request.get("created_to"),
+                        offset=max(0, int(request.get("offset") or 0)),
+                        limit=max(0, int(request.get("limit") or 20)),
+                        facet_counts=bool(request.get("facet_counts"))
+                    )})
+                elif op == "flush":
+                    index.flush()
+                    send({"id": request_id, "result": index.stats()})
+                elif op == "stats":
+                    send({"id": request_id, "result": index.stats()})
+                elif op == "ping":
+                    send({"id": request_id, "result": {"status": "ok", "pid": os.getpid()}})
+                elif op == "metrics":
+                    send({"id": request_id, "result": ""})
+                elif op == "shutdown":
+                    send({"id": request_id, "result": {"status": "bye"}})
+                    break
+                else:
+                    send({"id": request_id, "error": f"Unknown op: {op}"})
+            except QueryError as e:
+                send({"id": request_id, "error": str(e), "code": "bad_query"})
+            except Exception as e:
+                send({"id": request_id, "error": str(e)})
+    finally:
+        index.close()
+
+def build(index, source, page_size=1000):
+    """Index every document of a backfill source (see backfill.py); returns the count"""
+    indexed = 0
+    for page, _ in source.pages(page_size):
+        for document in page:
+            entry = document_entry(document)
+            if entry['id']:
+                index.add(entry)
+                indexed += 1
+    index.flush()
+    return indexed
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog='sentiment_service.py index',
+        description='Full-text and facet index over analyzed transcripts'
+    )
+    parser.add_argument('--index', help='index directory (default: SENTIMENT_SEARCH_INDEX or the cache directory)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('serve', help='answer index requests on stdin/stdout')
+    builder = commands.add_parser('build', help='index stored analyses')
+    builder.add_argument('source', help='mongoexport JSONL, mongodump .bson, or mongodb://host/db#collection')
+    query = commands.add_parser('query', help='run one search')
+    query.add_argument('query', nargs='?', default='')
+    query.add_argument('--facet', action='append', default=[], metavar='FIELD=VALUE')
+    query.add_argument('--limit', type=int, default=20)
+    commands.add_parser('optimize', help='merge every segment into one')
+    commands.add_parser('stats', help='print segment statistics')
+    args = parser.parse_args(argv)
+
+    if args.index:
+        index = SearchIndex(args.index)
+    else:
+        index = SearchIndex.from_env()
+        if index is None:
+            parser.error('The search index is disabled (SENTIMENT_SEARCH_INDEX=off)')
+
+    if args.command == 'serve':
+        serve(index)
+        return 0
+    try:
+        if args.command == 'build':
+            # Deferred: the backfill sources pull in the analyzer
+            from backfill import _open_source
+            print(json.dumps({"indexed": build(index, _open_source(args.source, SOURCE_PROJECTION))}))
+        elif args.command == 'query':
+            facets = {}
+            for facet in args.facet:
+                field, _, value = facet.partition('=')
+                facets.setdefault(field, []).append(value)
+            print(json.dumps(index.search(args.query, facets=facets, limit=args.limit, facet_counts=True)))
+        elif args.command == 'optimize':
+            index.optimize()
+            print(json.dumps(index.stats()))
+        else:
+            print(json.dumps(index.stats()))
+    finally:
+        index.close()
+    return 0
+
+# Fields build() reads from a live collection
+SOURCE_PROJECTION = {
+    "text": 1, "sentiment": 1, "agent": 1, "createdAt": 1,
+    "emotionalJourney.trend.direction": 1, "emotionalJourney.dominantEmotion": 1
+}
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,486 @@
+import math
+import os
+import re
+import sys
+from collections import OrderedDict, namedtuple
+
+from textblob.en import sentiment as pattern_sentiment
+from vaderSentiment.vaderSentiment import BOOSTER_DICT, SentiText, normalize
+
+# Per-sentence intermediate results. compound/neu/polarity are what the
+# journey needs; the rest lets the whole-text scores be rebuilt without
+# tokenizing or scoring the text a second time.
+SentenceScore = namedtuple('SentenceScore', [
+    'compound',           # VADER compound for the sentence
+    'neu',                # VADER neutral ratio for the sentence
+    'polarity',           # TextBlob (pattern) polarity for the sentence
+    'words',              # VADER tokens
+    'sentiments',         # VADER per-token valences before the "but" rule
+    'is_cap_diff',        # VADER ALL CAPS differential flag for the sentence
+    'assessments',        # pattern assessment polarities, in order
+    'resets_state',       # pattern negation/modifier state is clear at the end
+])
+
+# Text made only of word characters, whitespace and Indian script marks
+# tokenizes the same for pattern whether split into sentences or not.
+_PATTERN_UNSAFE = re.compile(
+    r'[^\w\sऀ-ॣ०-ॿঀ-৿਀-੿઀-૿'
+    r'଀-୿஀-௿ఀ-౿ಀ-೿ഀ-ൿ]'
+)
+
+class _TokenWindow:
+    """Stands in for SentiText over a sliding window of a longer token stream"""
+    __slots__ = ('words_and_emoticons', 'is_cap_diff')
+
+    def __init__(self, words, is_cap_diff):
+        self.words_and_emoticons = words
+        self.is_cap_diff = is_cap_diff
+
+class SentenceCache:
+    """
+    In-process LRU of SentenceScore records keyed by sentence text with runs
+    of whitespace collapsed (neither VADER nor pattern distinguishes them).
+    Case and punctuation are kept because both libraries score them.
+    Bounded by entry count and by an approximate byte budget.
+    """
+    def __init__(self, max_entries=50000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (record, size)
+
+    @staticmethod
+    def normalize(sentence):
+        return ' '.join(sentence.split())
+
+    @staticmethod
+    def _sizeof(key, record):
+        size = sys.getsizeof(key) + sys.getsizeof(record)
+        if record.words is not None:
+            size += sys.getsizeof(record.words) + sum(sys.getsizeof(w) for w in record.words)
+            size += sys.getsizeof(record.sentiments) + 24 * len(record.sentiments)
+        size += sys.getsizeof(record.assessments) + 24 * len(record.assessments)
+        return size
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key, record):
+        size = self._sizeof(key, record)
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous[1]
+        self._entries[key] = (record, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes
+        }
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build the cache sized by SENTIMENT_SENTENCE_CACHE_SIZE (entries, 0 to
+        disable) and SENTIMENT_SENTENCE_CACHE_BYTES. Returns None when disabled.
+        """
+        max_entries = int(os.environ.get('SENTIMENT_SENTENCE_CACHE_SIZE', 50000))
+        max_bytes = int(os.environ.get('SENTIMENT_SENTENCE_CACHE_BYTES', 64 * 1024 * 1024))
+        if max_entries <= 0 or max_bytes <= 0:
+            return None
+        return cls(max_entries=max_entries, max_bytes=max_bytes)
+
+class FusedScorer:
+    """
+    Scores each sentence once with VADER and TextBlob's pattern analyzer and
+    derives the whole-text VADER and TextBlob figures from those
+    intermediates. The derivation reproduces the libraries' own arithmetic
+    (same token order, same summation order), so the overall numbers are
+    identical to calling polarity_scores()/TextBlob() on the full text.
+    Where the full text would tokenize differently from its sentences, the
+    scorer falls back to the library call.
+    Sentence records are memoized in an optional SentenceCache. pattern
+    defaults to TextBlob's own English Sentiment.
+    """
+    def __init__(self, vader, cache=None, pattern=None):
+        self.vader = vader
+        self.cache = cache
+        self.pattern = pattern if pattern is not None else pattern_sentiment
+        self._emoji_chars = {key for key in vader.emojis if len(key) == 1}
+        self.derived = 0
+        self.fallbacks = 0
+
+    def _vader_valences(self, sentitext, positions=None):
+        """
+        The token loop of SentimentIntensityAnalyzer.polarity_scores. A
+        valence depends on at most three words before and two after, so each
+        word is scored against that window; sentiment_valence lowercases the
+        whole word list it is given, which makes long texts quadratic.
+        """
+        words = sentitext.words_and_emoticons
+        lexicon = self.vader.lexicon
+        sentiments = []
+        for i in (range(len(words)) if positions is None else positions):
+            item = words[i]
+            valence = 0
+            if item.lower() in BOOSTER_DICT:
+                sentiments.append(valence)
+                continue
+            if (i < len(words) - 1 and item.lower() == "kind" and
+                    words[i + 1].lower() == "of"):
+                sentiments.append(valence)
+                continue
+            if item.lower() not in lexicon:
+                sentiments.append(valence)
+                continue
+            start = max(0, i - 3)
+            window = _TokenWindow(words[start:i + 3], sentitext.is_cap_diff)
+            sentiments.append(self.vader.sentiment_valence(valence, window, item, i - start, [])[0])
+        return sentiments
+
+    def score_sentence(self, sentence, vader_only=False):
+        """
+        SentenceScore for one sentence. vader_only skips TextBlob and leaves
+        polarity and assessments None; such partial records are not cached,
+        but a cached full record still serves.
+        """
+        if self.cache is None:
+            return self._score_sentence(sentence, vader_only)
+        key = self.cache.normalize(sentence)
+        record = self.cache.get(key)
+        if record is None:
+            record = self._score_sentence(key, vader_only)
+            if not vader_only:
+                self.cache.set(key, record)
+        return record
+
+    def _score_sentence(self, sentence, vader_only=False):
+        if self._emoji_chars.isdisjoint(sentence):
+            sentitext = SentiText(sentence.strip())
+            sentiments = self._vader_valences(sentitext)
+            vader_scores = self.vader.score_valence(
+                self.vader._but_check(sentitext.words_and_emoticons, list(sentiments)), sentitext.text
+            )
+        else:
+            # Emoji descriptions change the token stream; keep the library path
+            vader_scores = self.vader.polarity_scores(sentence)
+            sentitext, sentiments = None, None
+
+        if vader_only:
+            return SentenceScore(
+                compound=vader_scores['compound'],
+                neu=vader_scores['neu'],
+                polarity=None,
+                words=sentitext.words_and_emoticons if sentitext else None,
+                sentiments=sentiments,
+                is_cap_diff=sentitext.is_cap_diff if sentitext else None,
+                assessments=None,
+                resets_state=False,
+            )
+
+        tokens = self._pattern_tokens(sentence)
+        assessments = self.pattern.assessments(((w, None) for w in tokens), True)
+        total, count = 0, 0
+        for _, p, _, _ in assessments:
+            total += 1 * p
+            count += 1
+        polarity = total / float(count or 1)
+
+        return SentenceScore(
+            compound=vader_scores['compound'],
+            neu=vader_scores['neu'],
+            polarity=polarity,
+            words=sentitext.words_and_emoticons if sentitext else None,
+            sentiments=sentiments,
+            is_cap_diff=sentitext.is_cap_diff if sentitext else None,
+            assessments=tuple(p for _, p, _, _ in assessments),
+            resets_state=self._resets_pattern_state(tokens),
+        )
+
+    def _pattern_tokens(self, text):
+        return [w.lower() for w in " ".join(self.pattern.tokenizer(text)).split()]
+
+    def _demojize(self, text):
+        """The emoji-to-description rewrite polarity_scores applies first"""
+        if self._emoji_chars.isdisjoint(text):
+            return text
+        parts = []
+        prev_space = True
+        for char in text:
+            if char in self.vader.emojis:
+                if not prev_space:
+                    parts.append(' ')
+                parts.append(self.vader.emojis[char])
+                prev_space = False
+            else:
+                parts.append(char)
+                prev_space = char == ' '
+        return ''.join(parts)
+
+    def _resets_pattern_state(self, tokens):
+        """
+        True if pattern's assessment state machine carries no pending
+        modifier or negation past the last token, so the next sentence
+        starts exactly as it would on its own.
+        """
+        if not tokens:
+            return True
+        last = tokens[-1]
+        if last in self.pattern.negations:
+            return False
+        if last in self.pattern and None in self.pattern[last]:
+            # A known word clears both, then may become a modifier itself
+            return not any(map(self.pattern[last].__contains__, self.pattern.modifiers))
+        return len(last.strip("'")) > 2
+
+    def score_overall(self, text, sentence_scores, vader_only=False):
+        """
+        Return (VADER scores dict, TextBlob polarity) for the whole text.
+        With vader_only the polarity is None.
+        """
+        vader_scores = self._overall_vader(text, sentence_scores)
+        if vader_only:
+            return (vader_scores if vader_scores is not None else self.vader.polarity_scores(text)), None
+        polarity = self._overall_polarity(text, sentence_scores)
+        if vader_scores is None or polarity is None:
+            self.fallbacks += 1
+        else:
+            self.derived += 1
+        if vader_scores is None:
+            vader_scores = self.vader.polarity_scores(text)
+        if polarity is None:
+            polarity = self.pattern(text)[0]
+        return vader_scores, polarity
+
+    def _overall_vader(self, text, sentence_scores):
+        if not sentence_scores or any(s.words is None for s in sentence_scores):
+            return None
+        if not self._emoji_chars.isdisjoint(text):
+            return None
+
+        sentitext = SentiText(text.strip())
+        words = sentitext.words_and_emoticons
+        if len(words) != sum(len(s.words) for s in sentence_scores):
+            return None
+        offset = 0
+        for s in sentence_scores:
+            if words[offset:offset + len(s.words)] != s.words:
+                return None
+            offset += len(s.words)
+
+        # Token valences only look three words back and two ahead, so only
+        # lexicon words next to a sentence boundary can change in context.
+        # The ALL CAPS flag is per text; where a sentence's flag differs it
+        # only matters for lexicon words with a capitalized word among
+        # themselves and the three before.
+        sentiments = []
+        offset = 0
+        last = len(sentence_scores) - 1
+        lexicon = self.vader.lexicon
+        for k, s in enumerate(sentence_scores):
+            valences = list(s.sentiments)
+            n = len(valences)
+            recompute = set(range(min(3, n))) if k > 0 else set()
+            if k < last:
+                recompute.update(range(max(0, n - 2), n))
+            if s.is_cap_diff != sentitext.is_cap_diff:
+                recompute.update(
+                    j for j in range(n)
+                    if any(w.isupper() for w in s.words[max(0, j - 3):j + 1])
+                )
+            for j in sorted(recompute):
+                if s.words[j].lower() in lexicon or s.words[j].lower() == "kind":
+                    valences[j] = self._vader_valences(sentitext, [offset + j])[0]
+            sentiments.extend(valences)
+            offset += n
+
+        sentiments = self.vader._but_check(words, sentiments)
+        return self.vader.score_valence(sentiments, sentitext.text)
+
+    def _overall_polarity(self, text, sentence_scores):
+        if not sentence_scores or '।' in text or _PATTERN_UNSAFE.search(text):
+            return None
+        if not all(s.resets_state for s in sentence_scores[:-1]):
+            return None
+
+        total, count = 0, 0
+        for s in sentence_scores:
+            for p in s.assessments:
+                total += 1 * p
+                count += 1
+        return total / float(count or 1)
+
+class StreamProfile:
+    """
+    First pass over a streamed text: the whole-text facts VADER needs before
+    any token can be scored (ALL CAPS differential, position of the first
+    "but", "!" and "?" counts).
+    """
+    def __init__(self, scorer):
+        self.scorer = scorer
+        self.tokens = 0
+        self.capitalized = 0
+        self.first_but = None
+        self.exclamations = 0
+        self.questions = 0
+
+    def feed(self, line):
+        text = self.scorer._demojize(line)
+        words = SentiText(text).words_and_emoticons
+        if self.first_but is None:
+            for j, word in enumerate(words):
+                if word.lower() == 'but':
+                    self.first_but = self.tokens + j
+                    break
+        self.tokens += len(words)
+        self.capitalized += sum(1 for word in words if word.isupper())
+        self.exclamations += text.count('!')
+        self.questions += text.count('?')
+
+    @property
+    def is_cap_diff(self):
+        return 0 < self.tokens - self.capitalized < self.tokens
+
+class StreamingOverall:
+    """
+    Second pass: whole-text VADER and pattern scores accumulated line by line.
+
+    VADER valences are scored over a sliding window (three tokens back, two
+    ahead, which is all sentiment_valence looks at) and folded into running
+    sums. The "but" rule is applied as documented, halving valences before
+    the first "but" and boosting those after; VADER's own _but_check locates
+    valences by value and can hit a different element when values repeat,
+    so that one case may differ slightly from polarity_scores().
+
+    Pattern tokens are buffered only until the assessment state resets
+    (see FusedScorer._resets_pattern_state), then assessed and summed.
+    """
+    def __init__(self, scorer, profile):
+        self.scorer = scorer
+        self.first_but = profile.first_but
+        self.is_cap_diff = profile.is_cap_diff
+        self.exclamations = profile.exclamations
+        self.questions = profile.questions
+
+        self._words = []  # up to three scored tokens, then pending ones
+        self._scored = 0
+        self._offset = 0  # stream index of self._words[0]
+        self._count = 0
+        self._sum = 0
+        self._pos_sum = 0.0
+        self._neg_sum = 0.0
+        self._neu_count = 0
+
+        self._tokens = []
+        self._flushable = False
+        self._polarity_total = 0
+        self._polarity_count = 0
+
+    def feed(self, line):
+        self._words.extend(SentiText(self.scorer._demojize(line)).words_and_emoticons)
+        self._score_words(len(self._words) - 2)
+
+        tokens = self.scorer._pattern_tokens(line)
+        if not tokens:
+            return
+        # "!" boosts the previous assessment even after a reset
+        if self._flushable and tokens[0] != '!':
+            self._assess()
+        self._tokens.extend(tokens)
+        self._flushable = self.scorer._resets_pattern_state(tokens)
+
+    def _score_words(self, limit):
+        if limit <= self._scored:
+            return
+        window = _TokenWindow(self._words, self.is_cap_diff)
+        valences = self.scorer._vader_valences(window, range(self._scored, limit))
+        for j, valence in enumerate(valences):
+            index = self._offset + self._scored + j
+            if self.first_but is not None:
+                if index < self.first_but:
+                    valence = valence * 0.5
+                elif index > self.first_but:
+                    valence = valence * 1.5
+            self._count += 1
+            self._sum += valence
+            if valence > 0:
+                self._pos_sum += (float(valence) + 1)
+            if valence < 0:
+                self._neg_sum += (float(valence) - 1)
+            if valence == 0:
+                self._neu_count += 1
+        self._scored = limit
+        drop = max(0, self._scored - 3)
+        del self._words[:drop]
+        self._offset += drop
+        self._scored -= drop
+
+    def _assess(self):
+        for _, p, _, _ in self.scorer.pattern.assessments(((w, None) for w in self._tokens), True):
+            self._polarity_total += 1 * p
+            self._polarity_count += 1
+        self._tokens = []
+
+    def result(self):
+        """Return (VADER scores dict, TextBlob polarity) for everything fed"""
+        self._score_words(len(self._words))
+        self._assess()
+        polarity = self._polarity_total / float(self._polarity_count or 1)
+
+        if not self._count:
+            return {"neg": 0.0, "neu": 0.0, "pos": 0.0, "compound": 0.0}, polarity
+
+        # Same arithmetic as SentimentIntensityAnalyzer.score_valence
+        vader = self.scorer.vader
+        sum_s = float(self._sum)
+        punct_emph_amplifier = vader._punctuation_emphasis(
+            "!" * min(self.exclamations, 4) + "?" * min(self.questions, 4)
+        )
+        if sum_s > 0:
+            sum_s += punct_emph_amplifier
+        elif sum_s < 0:
+            sum_s -= punct_emph_amplifier
+        compound = normalize(sum_s)
+
+        pos_sum, neg_sum, neu_count = self._pos_sum, self._neg_sum, self._neu_count
+        if pos_sum > math.fabs(neg_sum):
+            pos_sum += punct_emph_amplifier
+        elif pos_sum < math.fabs(neg_sum):
+            neg_sum -= punct_emph_amplifier
+        total = pos_sum + math.fabs(neg_sum) + neu_count
+        return {
+            "neg": round(math.fabs(neg_sum / total), 3),
+            "neu": round(math.fabs(neu_count / total), 3),
+            "pos": round(math.fabs(pos_sum / total), 3),
+            "compound": round(compound, 4)
+        }, polarity
@@ -1,11 +1,15 @@
+import os
 import sys
 import json
+import time
+import hashlib
+from importlib import metadata
 import numpy as np
 import re
 from collections import Counter, defaultdict
 import statistics
 import random
-import torch
+import tempfile
 
 try:
     from textblob import TextBlob
@@ -31,43 +35,329 @@ except ImportError:
     }))
     sys.exit(1)
 
-try:
-    from translate import Translator
-except ImportError:
-    print(json.dumps({
-        "error": "Translate not installed",
-        "sentiment": "neutral",
-        "score": 0,
-        "emotional_journey": {"start": 0, "end": 0, "fluctuation": 0, "trend": "neutral"},
-        "confidence": 0
-    }))
-    sys.exit(1)
+from disk_cache import TranslationCache, ResultCache
+from translation import TranslationStage
+from sentence_scoring import FusedScorer, SentenceCache, StreamProfile, StreamingOverall
+from journey import IncrementalJourney
+from changepoints import detect_change_points
+from metrics import metrics_from_env
+from timeline import build_timeline, timeline_options
+from tiers import TIERS, TierPlanner
+from lexicons import lexicons_from_env, source_digests
 
-# Set global seeds at the start of the analysis
+_HERE = os.path.dirname(os.path.abspath(__file__))
+# Files whose contents decide a result for a given cleaned text; the weights
+# and thresholds are literals in the first two
+_FINGERPRINT_FILES = (
+    os.path.join(_HERE, 'sentiment_service.py'),
+    os.path.join(_HERE, 'sentence_scoring.py'),
+    os.path.join(_HERE, 'translation.py'),
+    os.path.join(_HERE, 'journey.py'),
+    os.path.join(_HERE, 'changepoints.py'),
+    os.path.join(_HERE, 'timeline.py'),
+    os.path.join(_HERE, 'tiers.py'),
+    os.path.join(_HERE, 'data', 'phrase_table.json'),
+)
+
+# Reference point for the worker's startup_seconds gauge
+_MODULE_STARTED = time.perf_counter()
+
+_seeded = False
+
+# Seed the random generators once per process. The analysis itself never
+# draws random numbers; torch is only seeded if something else loaded it.
 def set_seeds():
+    global _seeded
+    if _seeded:
+        return
     SEED = 42
     random.seed(SEED)
     np.random.seed(SEED)
-    torch.manual_seed(SEED)
-    if torch.cuda.is_available():
-        torch.cuda.manual_seed_all(SEED)
-    torch.backends.cudnn.deterministic = True
-    torch.backends.cudnn.benchmark = False
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.manual_seed(SEED)
+        if torch.cuda.is_available():
+            torch.cuda.manual_seed_all(SEED)
+        torch.backends.cudnn.deterministic = True
+        torch.backends.cudnn.benchmark = False
+    _seeded = True
+
+def profile_imports(top=15):
+    """
+    Import this module in a fresh interpreter with -X importtime and report
+    the cost of each module it imports directly, slowest first.
+    """
+    import subprocess
+    
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import sentiment_service"],
+        cwd=script_dir,
+        capture_output=True,
+        text=True
+    )
+    
+    # -X importtime prints nested imports before their parent, so the depth-1
+    # entries since the previous top-level entry are this module's imports.
+    children = []
+    modules = []
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # Header row
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        if depth == 1:
+            children.append({
+                "module": name.strip(),
+                "self_ms": round(int(self_us) / 1000, 3),
+                "cumulative_ms": round(int(cumulative_us) / 1000, 3)
+            })
+        elif depth == 0:
+            if name.strip() == "sentiment_service":
+                modules = children
+                total_us = int(cumulative_us)
+            children = []
+    
+    modules.sort(key=lambda m: m["cumulative_ms"], reverse=True)
+    
+    return {
+        "total_ms": round(total_us / 1000, 3),
+        "modules": modules[:top],
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None
+    }
+
+# Indian scripts kept by clean_text and routed to translation, in priority
+# order for ties. Every block is 128 code points starting on a multiple of 0x80.
+INDIC_SCRIPTS = (
+    (0x0900, 'hi'),  # Devanagari
+    (0x0980, 'bn'),  # Bengali
+    (0x0A00, 'pa'),  # Gurmukhi
+    (0x0A80, 'gu'),  # Gujarati
+    (0x0B00, 'or'),  # Oriya
+    (0x0B80, 'ta'),  # Tamil
+    (0x0C00, 'te'),  # Telugu
+    (0x0C80, 'kn'),  # Kannada
+    (0x0D00, 'ml'),  # Malayalam
+)
+
+# str.translate table mapping each script's code points to one marker
+# character (Unicode noncharacters, which never occur in real text), so a
+# line's script histogram comes from a single translate + count.
+_SCRIPT_MARKERS = {}
+_MARKER_LANGUAGES = {}
+for _i, (_start, _lang) in enumerate(INDIC_SCRIPTS):
+    _marker = chr(0xFDD0 + _i)
+    _MARKER_LANGUAGES[_marker] = _lang
+    _SCRIPT_MARKERS.update(dict.fromkeys(range(_start, _start + 0x80), _marker))
+del _i, _start, _lang, _marker
+
+# Characters cleaning removes, except the colon of a speaker label at the
+# start of a line, which speaker detection needs
+_CLEAN_PATTERN = re.compile(
+    r'(?im)(^[ \t]*(?:agent|customer|representative|client)[ \t]*:)|[^\w\s'
+    + ''.join(f'\\u{start:04X}-\\u{start + 0x7F:04X}' for start, _ in INDIC_SCRIPTS) + ']'
+)
+
+_SPEAKER_LABEL = re.compile(r'(?im)^[ \t]*(?:agent|customer|representative|client)[ \t]*:')
+
+def _clean(text):
+    return _CLEAN_PATTERN.sub(lambda match: match.group(1) or '', text)
+
+def _without_labels(text):
+    """Text as the whole-text scores see it: the words of its sentences, without speaker labels"""
+    return _SPEAKER_LABEL.sub('', text)
+
+_SENTENCE_SPLIT = re.compile(r'[।.!?\n]+')
+
+def count_scripts(text):
+    """Return {language code: character count} for the Indian scripts in text"""
+    counts = Counter(text.translate(_SCRIPT_MARKERS))
+    return {lang: counts[marker] for marker, lang in _MARKER_LANGUAGES.items() if marker in counts}
+
+def detect_script(text):
+    """Language code of the majority Indian script in text, or None if there is none"""
+    counts = count_scripts(text)
+    if not counts:
+        return None
+    # max() keeps the first of equal counts, i.e. INDIC_SCRIPTS order
+    return max(counts, key=counts.get)
+
+_TOKENS = re.compile(r'\S+|\s+')
+
+def script_spans(text):
+    """
+    Split code-mixed text into script-homogeneous spans, in order, as
+    [(language code or None, span)]. None marks Latin and other text that
+    is kept as is. Whitespace, digits and punctuation join the spans on
+    both sides when those agree, so "धन्यवाद 2 बार" stays one span.
+    """
+    tokens = _TOKENS.findall(text)
+    langs = []
+    for token in tokens:
+        lang = detect_script(token)
+        if lang is None and not any(char.isalpha() for char in token):
+            lang = ''  # No letters: decided by its neighbours
+        langs.append(lang)
+    
+    i = 0
+    while i < len(langs):
+        if langs[i] != '':
+            i += 1
+            continue
+        end = i
+        while end < len(langs) and langs[end] == '':
+            end += 1
+        before = langs[i - 1] if i > 0 else None
+        after = langs[end] if end < len(langs) else None
+        langs[i:end] = [before if before == after else None] * (end - i)
+        i = end
+    
+    spans = []
+    for token, lang in zip(tokens, langs):
+        if spans and spans[-1][0] == lang:
+            spans[-1][1].append(token)
+        else:
+            spans.append((lang, [token]))
+    return [(lang, ''.join(parts)) for lang, parts in spans]
+
+# Emotional state labels indexed by the codes from classify_emotional_states()
+EMOTIONAL_STATES = (
+    'extremely negative', 'very negative', 'moderately negative', 'slightly negative',
+    'neutral',
+    'slightly positive', 'moderately positive', 'very positive', 'extremely positive',
+    'factual'
+)
+NEUTRAL_STATE = 4
+FACTUAL_STATE = 9
+STATE_THRESHOLDS = np.array([0.1, 0.25, 0.5, 0.75])
+
+def classify_emotional_states(scores, neutral_ratios=None):
+    """
+    Vectorized _get_detailed_emotional_state: map an array of scores to
+    indices into EMOTIONAL_STATES. Positive bands are closed below
+    (score >= t) and negative bands closed above (score <= -t).
+    """
+    scores = np.asarray(scores, dtype=float)
+    positive = np.digitize(scores, STATE_THRESHOLDS)
+    negative = np.digitize(-scores, STATE_THRESHOLDS)
+    codes = np.where(positive > 0, NEUTRAL_STATE + positive, NEUTRAL_STATE - negative)
+    if neutral_ratios is not None:
+        codes = np.where((codes == NEUTRAL_STATE) & (np.asarray(neutral_ratios) > 0.8), FACTUAL_STATE, codes)
+    return codes
 
 class MultilingualSentimentAnalyzer:
-    def __init__(self):
-        self.analyzer = SentimentIntensityAnalyzer()
+    def __init__(self, translation_cache=None, translation_stage=None, sentence_cache=None, metrics=None, debug=None,
+                 result_cache=None, lexicons=None):
+        set_seeds()
+        self.metrics = metrics if metrics is not None else metrics_from_env()
+        # Debug strings are only built on request; they are costly on long calls
+        self.debug = debug if debug is not None else os.environ.get('SENTIMENT_DEBUG', '').lower() in ('1', 'on', 'true')
+        self.last_debug_info = ''
+        # Compiled, memory-mapped lexicons when available; same scores either way
+        self.lexicons = lexicons if lexicons is not None else lexicons_from_env()
+        if self.lexicons is not None:
+            self.analyzer = self.lexicons.vader_analyzer()
+            pattern = self.lexicons.pattern_sentiment()
+        else:
+            self.analyzer = SentimentIntensityAnalyzer()
+            pattern = None
+        self.sentence_cache = sentence_cache if sentence_cache is not None else SentenceCache.from_env()
+        self.scorer = FusedScorer(self.analyzer, cache=self.sentence_cache, pattern=pattern)
+        self.translation_cache = translation_cache if translation_cache is not None else TranslationCache.from_env()
+        self.translation_stage = translation_stage if translation_stage is not None else TranslationStage.from_env()
+        self.result_cache = result_cache if result_cache is not None else ResultCache.from_env()
+        # Translate only the Indian-script spans of a line, not the whole line
+        self.span_translation = os.environ.get('SENTIMENT_SPAN_TRANSLATION', '').lower() not in ('off', '0', 'false')
+        self.fingerprint = self._fingerprint()
+        self.planner = TierPlanner.from_env()
+        # Sentences kept at each end by the summary tier; the journey's start
+        # and end use three, the rest warm up the context window
+        self.summary_sentences = 6
+    
+    def _fingerprint(self):
+        """
+        Digest of the analyzer configuration: scoring code, VADER and TextBlob
+        lexicons and versions, and the translation backend. Results cached
+        under one fingerprint are never served under another.
+        """
+        digest = hashlib.sha256()
+        for path in _FINGERPRINT_FILES:
+            try:
+                with open(path, 'rb') as source:
+                    digest.update(source.read())
+            except OSError:
+                digest.update(b'-')
+        lexicon_digests = self.lexicons.digests if self.lexicons is not None else source_digests()
+        for name, lexicon_digest in sorted(lexicon_digests.items()):
+            digest.update(f"{name}={lexicon_digest}".encode('utf-8'))
+        for package in ('vaderSentiment', 'textblob'):
+            try:
+                digest.update(f"{package}={metadata.version(package)}".encode('utf-8'))
+            except metadata.PackageNotFoundError:
+                pass
+        backend = getattr(self.translation_stage, 'backend', None)
+        digest.update(f"translator={getattr(backend, 'name', None) or type(self.translation_stage).__name__}".encode('utf-8'))
+        digest.update(f"spans={self.span_translation}".encode('utf-8'))
+        return digest.hexdigest()[:32]
+    
+    def _translate_contents(self, items, debug_info, deadline=None):
+        """
+        Translate (lang, content) pairs to English. Cached lines are served
+        from the persistent cache; the rest go to the translation stage in one
+        coalesced, concurrent round. Failed lines come back as None.
+        """
+        results = [None] * len(items)
+        misses = []
+        for i, (lang, content) in enumerate(items):
+            cached = None
+            if self.translation_cache is not None:
+                cached = self.translation_cache.get_translation(lang, content)
+            if cached is not None:
+                results[i] = cached
+            else:
+                misses.append(i)
+        
+        # Cache hits and misses are counted by the cache itself
+        self.metrics.inc('lines_translated', len(items))
+        
+        if misses:
+            started = time.perf_counter()
+            if deadline is None:
+                translated = self.translation_stage.translate([items[i] for i in misses])
+            else:
+                translated = self.translation_stage.translate([items[i] for i in misses], deadline=max(0.0, deadline))
+            self.metrics.observe('translation_backend', time.perf_counter() - started)
+            if debug_info is not None:
+                debug_info.extend(f"DEBUG: {error}" for error in self.translation_stage.last_errors)
+            for i, value in zip(misses, translated):
+                if value:
+                    results[i] = value
+                    if self.translation_cache is not None:
+                        self.translation_cache.set_translation(*items[i], value)
+        
+        return results
         
-    def detect_and_translate(self, text):
+    def detect_and_translate(self, text, deadline=None):
+        return self.translate_text(text, deadline)[0]
+    
+    def translate_text(self, text, deadline=None):
+        """
+        detect_and_translate, also returning whether every Indian-script span
+        was translated: (english text, complete). Results of partly
+        untranslated text must not be cached.
+        """
         try:
             # Split text into lines
             lines = text.split('\n')
-            translated_lines = []
-            debug_info = []
+            translated_lines = list(lines)
+            debug_info = [] if self.debug else None
+            pending = []  # (line index, prefix, lang, content)
             
-            for line in lines:
+            for index, line in enumerate(lines):
                 if not line.strip():
-                    translated_lines.append(line)
                     continue
                 
                 try:
@@ -79,104 +369,77 @@ class MultilingualSentimentAnalyzer:
                     else:
                         content = line.strip()
                     
-                    # Try to detect script and translate accordingly
-                    if any('\u0900' <= c <= '\u097F' for c in content):  # Devanagari (Hindi)
-                        lang = 'hi'
-                    elif any('\u0C00' <= c <= '\u0C7F' for c in content):  # Telugu
-                        lang = 'te'
-                    elif any('\u0D00' <= c <= '\u0D7F' for c in content):  # Malayalam
-                        lang = 'ml'
-                    else:
-                        translated_lines.append(line)
+                    # Route the line by its majority script
+                    lang = detect_script(content)
+                    if lang is None:
                         continue
                     
-                    try:
-                        translator = Translator(to_lang="en", from_lang=lang)
-                        translated = translator.translate(content)
-                        if translated and not translated.startswith("MYMEMORY WARNING"):
-                            translated_lines.append(prefix + translated)
-                            debug_info.append(f"DEBUG: Translated from {lang}: {content} -> {translated}")
-                        else:
-                            translated_lines.append(line)
-                    except Exception as e:
-                        debug_info.append(f"DEBUG: Translation error for language {lang}: {str(e)}")
-                        translated_lines.append(line)
+                    if self.span_translation:
+                        spans = script_spans(content)
+                    else:
+                        spans = [(lang, content)]
+                    pending.append((index, prefix, spans))
                         
                 except Exception as e:
-                    debug_info.append(f"DEBUG: Line processing error: {line}, Error: {str(e)}")
-                    translated_lines.append(line)
+                    if debug_info is not None:
+                        debug_info.append(f"DEBUG: Line processing error: {line}, Error: {str(e)}")
+            
+            # Only Indian-script spans are sent, each distinct one once
+            items = list(dict.fromkeys(
+                span for _, _, spans in pending for span in spans if span[0] is not None
+            ))
+            self.metrics.inc('chars_translated', sum(len(content) for _, content in items))
+            translations = dict(zip(items, self._translate_contents(items, debug_info, deadline)))
+            complete = all(translations.values())
+            for index, prefix, spans in pending:
+                parts = []
+                for lang, content in spans:
+                    translated = translations.get((lang, content)) if lang is not None else None
+                    parts.append(translated or content)
+                    if translated and debug_info is not None:
+                        debug_info.append(f"DEBUG: Translated from {lang}: {content} -> {translated}")
+                translated_lines[index] = prefix + ''.join(parts)
             
             result = '\n'.join(translated_lines)
-            debug_info.append(f"DEBUG: Final translated text: {result}")
             
             # Store debug info in instance variable for testing
-            self.last_debug_info = '\n'.join(debug_info)
-            return result
+            if debug_info is not None:
+                debug_info.append(f"DEBUG: Final translated text: {result}")
+                self.last_debug_info = '\n'.join(debug_info)
+            return result, complete
         except Exception as e:
-            self.last_debug_info = f"DEBUG: Overall translation error: {str(e)}"
-            return text
+            if self.debug:
+                self.last_debug_info = f"DEBUG: Overall translation error: {str(e)}"
+            return text, False
     
     def clean_text(self, text):
         if not text or not isinstance(text, str):
             return ""
         # Remove special characters but keep Devanagari and other Indian script characters
-        text = re.sub(r'[^\w\s\u0900-\u097F\u0980-\u09FF\u0A00-\u0A7F\u0A80-\u0AFF\u0B00-\u0B7F\u0B80-\u0BFF\u0C00-\u0C7F\u0C80-\u0CFF\u0D00-\u0D7F]', '', text)
+        text = _clean(text)
         return text.strip()
     
     def analyze_emotional_journey(self, text):
         if not text:
             return self._get_default_journey()
             
-        # Enhanced sentence splitting with support for multiple languages and punctuation
-        sentences = [s.strip() for s in re.split(r'[।.!?\n]+', text) if s.strip()]
-        if not sentences:
+        speakers = []
+        emotional_scores, neutral_ratios, _ = self._score_sentences(text, speakers)
+        return self._journey_from_scores(emotional_scores, neutral_ratios, speakers)
+    
+    def _journey_from_scores(self, emotional_scores, neutral_ratios, speakers=None, positions=None):
+        """
+        Journey metrics for a call's contextual sentence scores. speakers
+        and positions (transcript positions, when only some sentences were
+        scored) label the change points.
+        """
+        if not emotional_scores:
             return self._get_default_journey()
-            
-        emotional_scores = []
-        emotional_states = []
-        speaker_emotions = {'Customer': [], 'Agent': []}
-        current_speaker = 'Customer'  # Default speaker
-        
-        # Enhanced contextual analysis
-        context_window = []
-        window_size = 3  # Context window size
         
-        for i, sentence in enumerate(sentences):
-            # Speaker detection with improved accuracy
-            if any(marker in sentence.lower() for marker in ['agent:', 'customer:', 'representative:', 'client:']):
-                current_speaker = next(
-                    speaker for speaker in ['Agent', 'Customer'] 
-                    if any(marker in sentence.lower() for marker in [f'{speaker.lower()}:', f'{speaker.lower()} :'])
-                )
-                sentence = ':'.join(sentence.split(':')[1:])
-            
-            # Multi-component sentiment analysis
-            vader_scores = self.analyzer.polarity_scores(sentence)
-            blob_analysis = TextBlob(sentence)
-            
-            # Calculate weighted compound score with contextual adjustment
-            compound_score = self._calculate_contextual_score(
-                vader_scores['compound'],
-                blob_analysis.sentiment.polarity,
-                context_window,
-                current_speaker,
-                i,
-                len(sentences)
-            )
-            
-            # Update context window
-            context_window.append({
-                'score': compound_score,
-                'speaker': current_speaker,
-                'position': i / len(sentences)
-            })
-            if len(context_window) > window_size:
-                context_window.pop(0)
-            
-            emotional_scores.append(compound_score)
-            state = self._get_detailed_emotional_state(compound_score, vader_scores)
-            emotional_states.append(state)
-            speaker_emotions[current_speaker].append(compound_score)
+        emotional_states = [
+            self._get_detailed_emotional_state(score, {'neu': neu})
+            for score, neu in zip(emotional_scores, neutral_ratios)
+        ]
 
         # Calculate advanced metrics
         start_score = self._calculate_initial_sentiment(emotional_scores[:3])
@@ -203,9 +466,96 @@ class MultilingualSentimentAnalyzer:
             'emotional_range': {
                 'min': round(min(emotional_scores), 3),
                 'max': round(max(emotional_scores), 3)
-            }
+            },
+            'change_points': detect_change_points(emotional_scores, speakers, positions)
         }
     
+    def split_sentences(self, text):
+        """Enhanced sentence splitting with support for multiple languages and punctuation"""
+        return [s.strip() for s in _SENTENCE_SPLIT.split(text) if s.strip()]
+    
+    def _detect_speaker(self, sentence, current_speaker):
+        """Return (speaker, sentence without its speaker label)"""
+        # Speaker detection with improved accuracy
+        if any(marker in sentence.lower() for marker in ['agent:', 'customer:', 'representative:', 'client:']):
+            current_speaker = next(
+                (speaker for speaker in ['Agent', 'Customer']
+                 if any(marker in sentence.lower() for marker in [f'{speaker.lower()}:', f'{speaker.lower()} :'])),
+                'Agent' if 'representative:' in sentence.lower() else 'Customer'
+            )
+            sentence = ':'.join(sentence.split(':')[1:])
+        return current_speaker, sentence
+    
+    def incremental_journey(self, total_sentences=None, escalation=None):
+        """
+        Start an IncrementalJourney that scores sentences with this analyzer.
+        escalation (True, or an EscalationMonitor) raises live alerts.
+        """
+        return IncrementalJourney(self, total_sentences=total_sentences, escalation=escalation)
+    
+    def _score_sentences(self, text, speakers=None, vader_only=False):
+        """
+        Split text into sentences and return their contextual scores, VADER
+        neutral ratios and the per-sentence SentenceScore records. If a
+        speakers list is given, each sentence's speaker is appended to it.
+        """
+        sentences = self.split_sentences(text)
+        return self._score_sentence_list(sentences, range(len(sentences)), len(sentences), speakers, vader_only)
+    
+    def _score_sentence_list(self, sentences, positions, total, speakers=None, vader_only=False):
+        """
+        Score sentences found at the given positions of a transcript of total
+        sentences. The context window restarts wherever positions skip
+        ahead. With vader_only, TextBlob is skipped and the VADER compound
+        stands in for its polarity.
+        """
+        emotional_scores = []
+        neutral_ratios = []
+        sentence_scores = []
+        current_speaker = 'Customer'  # Default speaker
+        
+        # Enhanced contextual analysis
+        context_window = []
+        window_size = 3  # Context window size
+        
+        previous = None
+        for sentence, i in zip(sentences, positions):
+            if previous is not None and i != previous + 1:
+                context_window = []
+            previous = i
+            current_speaker, sentence = self._detect_speaker(sentence, current_speaker)
+            
+            # Multi-component sentiment analysis (VADER and TextBlob in one pass)
+            sentence_score = self.scorer.score_sentence(sentence, vader_only)
+            sentence_scores.append(sentence_score)
+            
+            # Calculate weighted compound score with contextual adjustment
+            compound_score = self._calculate_contextual_score(
+                sentence_score.compound,
+                sentence_score.compound if vader_only else sentence_score.polarity,
+                context_window,
+                current_speaker,
+                i,
+                total
+            )
+            
+            # Update context window
+            context_window.append({
+                'score': compound_score,
+                'speaker': current_speaker,
+                'position': i / total
+            })
+            if len(context_window) > window_size:
+                context_window.pop(0)
+            
+            emotional_scores.append(compound_score)
+            neutral_ratios.append(sentence_score.neu)
+            if speakers is not None:
+                speakers.append(current_speaker)
+        
+        self.metrics.inc('sentences_scored', len(sentences))
+        return emotional_scores, neutral_ratios, sentence_scores
+    
     def _calculate_contextual_score(self, vader_compound, textblob_polarity, context_window, speaker, position, total_length):
         """Enhanced contextual score calculation"""
         # Base score calculation with enhanced weighting
@@ -389,7 +739,8 @@ class MultilingualSentimentAnalyzer:
             'emotional_range': {
                 'min': 0,
                 'max': 0
-            }
+            },
+            'change_points': []
         }
     
     def _get_emotional_state(self, compound_score, detailed_scores=None):
@@ -423,69 +774,554 @@ class MultilingualSentimentAnalyzer:
             return "mixed"
     
     def analyze_sentiment(self, text):
-        set_seeds()  # Add this line first
+        return json.dumps(self.analyze(text))
+    
+    def analyze(self, text, timings=False, timeline=None, tier='full', deadline=None, backlog=0):
+        """
+        Analyze a single text and return the result as a dict. With timings,
+        the result also carries a "timings" block of per-stage milliseconds.
+        timeline (True, a point budget or {"points", "method"}) adds a packed,
+        downsampled per-sentence "timeline"; see build_timeline().
         
+        tier is the requested quality tier (see tiers.py). deadline is the
+        time budget in seconds and backlog the number of requests waiting
+        behind this one; either can make the planner downgrade the tier.
+        The result's "tier" reports the tier actually applied.
+        """
+        return self.score_analysis(self.prepare_analysis(text, timeline, tier, deadline, backlog), timings)
+    
+    def prepare_analysis(self, text, timeline=None, tier='full', deadline=None, backlog=0):
+        """
+        I/O half of analyze(): clean the text, consult the result cache, pick
+        the tier and translate. Returns the state score_analysis() finishes;
+        its "result" is already set for errors and cache hits.
+        """
+        state = {"started": time.perf_counter(), "stage_times": {}}
         try:
-            if not text or not isinstance(text, str):
-                return json.dumps({
-                    "error": "No text provided or invalid input type",
+            self._prepare(state, text, timeline, tier or 'full', deadline, backlog)
+        except Exception as e:
+            state["result"] = {
+                "error": str(e),
+                "sentiment": "neutral",
+                "score": 0.000,
+                "emotional_journey": self._get_default_journey(),
+                "confidence": 0.000
+            }
+        return state
+    
+    def score_analysis(self, state, timings=False):
+        """CPU half of analyze(): score the output of prepare_analysis()"""
+        stage_times = state["stage_times"]
+        result = state.get("result")
+        if result is None:
+            try:
+                result = self._score(state)
+            except Exception as e:
+                result = {
+                    "error": str(e),
                     "sentiment": "neutral",
                     "score": 0.000,
                     "emotional_journey": self._get_default_journey(),
                     "confidence": 0.000
-                })
+                }
+        stage_times['total'] = time.perf_counter() - state["started"]
+        
+        metrics = self.metrics
+        metrics.inc('analyses')
+        if "error" in result:
+            metrics.inc('errors')
+        metrics.record(stage_times)
+        
+        if timings:
+            result["timings"] = {stage: round(seconds * 1000, 3) for stage, seconds in stage_times.items()}
+        return result
+    
+    def _prepare(self, state, text, timeline, tier, deadline, backlog):
+        clock = time.perf_counter
+        stage_times = state["stage_times"]
+        # Bad options come back as an error result, like bad text
+        timeline = timeline_options(timeline)
+        if tier not in TIERS:
+            raise ValueError(f"Unknown tier: {tier}")
+        if not text or not isinstance(text, str):
+            state["result"] = {
+                "error": "No text provided or invalid input type",
+                "sentiment": "neutral",
+                "score": 0.000,
+                "emotional_journey": self._get_default_journey(),
+                "confidence": 0.000
+            }
+            return
+        
+        mark = clock()
+        cleaned_text = self.clean_text(text)
+        stage_times['clean'] = clock() - mark
+        if not cleaned_text:
+            state["result"] = {
+                "error": "Text is empty after cleaning",
+                "sentiment": "neutral",
+                "score": 0.000,
+                "emotional_journey": self._get_default_journey(),
+                "confidence": 0.000
+            }
+            return
+        
+        # A result with a timeline is cached under its timeline options
+        fingerprint = self._result_key(timeline)
+        if self.result_cache is not None:
+            mark = clock()
+            cached = self.result_cache.get_result(fingerprint, cleaned_text)
+            stage_times['cache'] = clock() - mark
+            if cached is not None:
+                state["result"] = cached
+                return
+        
+        lines = cleaned_text.count('\n') + 1
+        remaining = None if deadline is None else deadline - (clock() - state["started"])
+        requested = tier
+        tier, reason = self.planner.choose(requested, lines, remaining, backlog)
+        english_sentences = positions = total = None
+        complete = True
+        
+        mark = clock()
+        if tier == 'summary':
+            english_sentences, positions, total, complete = self._summary_sentences(cleaned_text, remaining)
+            english_text = '\n'.join(english_sentences)
+            stage_times['translate'] = clock() - mark
+        elif tier == 'full':
+            english_text, complete = self._translate(cleaned_text, remaining)
+            stage_times['translate'] = clock() - mark
+        else:
+            # The fast tier scores the text as is, without translation
+            english_text = cleaned_text
+        
+        state.update(
+            cleaned_text=cleaned_text, fingerprint=fingerprint, timeline=timeline,
+            tier=tier, requested=requested, reason=reason, lines=lines,
+            english_text=english_text, english_sentences=english_sentences,
+            positions=positions, total=total, complete=complete,
+            # The planner's cost covers translation and scoring, not waiting between them
+            cost=clock() - mark
+        )
+    
+    def _score(self, state):
+        clock = time.perf_counter
+        stage_times = state["stage_times"]
+        tier = state["tier"]
+        english_text = state["english_text"]
+        scoring_started = clock()
+        speakers = []
+        
+        # Get emotional journey first
+        mark = clock()
+        if tier == 'summary':
+            emotional_scores, neutral_ratios, sentence_scores = self._score_sentence_list(
+                state["english_sentences"], state["positions"], state["total"], speakers
+            )
+        else:
+            emotional_scores, neutral_ratios, sentence_scores = self._score_sentences(
+                english_text, speakers, vader_only=tier == 'fast'
+            )
+        stage_times['sentences'] = clock() - mark
+        
+        mark = clock()
+        emotional_journey = self._journey_from_scores(emotional_scores, neutral_ratios, speakers, state["positions"])
+        stage_times['journey'] = clock() - mark
+        
+        # Overall VADER and TextBlob sentiment, reusing the sentence pass
+        mark = clock()
+        overall_vader, overall_polarity = self.scorer.score_overall(
+            _without_labels(english_text), sentence_scores, vader_only=tier == 'fast'
+        )
+        if overall_polarity is None:
+            overall_polarity = overall_vader['compound']
+        result = self._build_result(overall_vader, overall_polarity, emotional_journey, tier)
+        stage_times['overall'] = clock() - mark
+        
+        self.planner.observe(tier, state["lines"], state["cost"] + clock() - scoring_started)
+        self.metrics.inc(f'tier_{tier}')
+        reason = state["reason"]
+        if reason is not None:
+            result["tier_requested"] = state["requested"]
+            result["tier_reason"] = reason
+            self.metrics.inc(f'downgrades_{reason}')
+        
+        timeline = state["timeline"]
+        if timeline is not None:
+            mark = clock()
+            states = classify_emotional_states(emotional_scores, neutral_ratios)
+            result["timeline"] = build_timeline(emotional_scores, speakers, states, **timeline)
+            stage_times['timeline'] = clock() - mark
+        
+        if self.result_cache is not None and tier == 'full' and state["complete"]:
+            self.result_cache.set_result(state["fingerprint"], state["cleaned_text"], result)
+        
+        return result
+    
+    def _result_key(self, timeline=None):
+        """The result cache fingerprint for results with these timeline options"""
+        if timeline is None:
+            return self.fingerprint
+        return f"{self.fingerprint}\x1ftimeline={json.dumps(timeline, sort_keys=True)}"
+    
+    def analyze_stream(self, lines, chunk_lines=200):
+        """
+        Analyze a transcript given as an iterable of lines (an open file,
+        sys.stdin) without holding it in memory. The first pass cleans and
+        translates chunk_lines lines at a time into a temporary spool file
+        while counting sentences; the second pass scores the spool into an
+        IncrementalJourney and running whole-text sums.
+        """
+        try:
+            with tempfile.TemporaryFile('w+', encoding='utf-8') as spool:
+                profile = StreamProfile(self.scorer)
+                total_sentences = 0
+                received = False
+                has_content = False
+                
+                for chunk in self._translated_chunks(lines, chunk_lines):
+                    received = True
+                    for line in chunk:
+                        has_content = has_content or bool(line.strip())
+                        total_sentences += len(self.split_sentences(line))
+                        profile.feed(_without_labels(line))
+                        spool.write(line + '\n')
+                
+                if not received:
+                    return self.analyze("")
+                if not has_content:
+                    return {
+                        "error": "Text is empty after cleaning",
+                        "sentiment": "neutral",
+                        "score": 0.000,
+                        "emotional_journey": self._get_default_journey(),
+                        "confidence": 0.000
+                    }
+                
+                spool.seek(0)
+                journey = IncrementalJourney(self, total_sentences=total_sentences)
+                overall = StreamingOverall(self.scorer, profile)
+                for line in spool:
+                    line = line.rstrip('\n')
+                    for sentence in self.split_sentences(line):
+                        journey.add_sentence(sentence)
+                    overall.feed(_without_labels(line))
+                
+                overall_vader, overall_polarity = overall.result()
+                return self._build_result(overall_vader, overall_polarity, journey.snapshot())
+        
+        except Exception as e:
+            return {
+                "error": str(e),
+                "sentiment": "neutral",
+                "score": 0.000,
+                "emotional_journey": self._get_default_journey(),
+                "confidence": 0.000
+            }
+    
+    def _translated_chunks(self, lines, chunk_lines):
+        """Yield lists of cleaned, translated lines"""
+        chunk = []
+        for line in lines:
+            chunk.append(_clean(line.rstrip('\n')))
+            if len(chunk) >= chunk_lines:
+                yield self.translate_text('\n'.join(chunk))[0].split('\n')
+                chunk = []
+        if chunk:
+            yield self.translate_text('\n'.join(chunk))[0].split('\n')
+    
+    def _translate(self, text, deadline=None):
+        # Only pass a deadline when there is one, so translate_text can be
+        # swapped for a plain one-argument callable
+        if deadline is None:
+            return self.translate_text(text)
+        return self.translate_text(text, deadline)
+    
+    def _summary_sentences(self, cleaned_text, deadline=None):
+        """
+        The first and last summary_sentences sentences of a cleaned text,
+        translated. Returns (english sentences, their positions, total
+        sentence count, whether translation was complete). This approximates the full pass: sentences are
+        split before translation, and contextual scores only see the kept
+        neighbours, so start and end scores are close but not exact.
+        deadline is the budget in seconds for all of the translation.
+        """
+        sentences = self.split_sentences(cleaned_text)
+        total = len(sentences)
+        n = self.summary_sentences
+        if total > 2 * n:
+            positions = list(range(n)) + list(range(total - n, total))
+            sentences = sentences[:n] + sentences[-n:]
+        else:
+            positions = list(range(total))
+        
+        started = time.perf_counter()
+        english, complete = self._translate('\n'.join(sentences), deadline)
+        english = english.split('\n')
+        if len(english) != len(sentences):
+            # Per sentence, each call getting what is left of the budget
+            english = []
+            complete = True
+            for sentence in sentences:
+                remaining = None if deadline is None else max(0.0, deadline - (time.perf_counter() - started))
+                translated, translated_complete = self._translate(sentence, remaining)
+                english.append(translated)
+                complete = complete and translated_complete
+        return english, positions, total, complete
+    
+    def _build_result(self, overall_vader, textblob_polarity, emotional_journey, tier='full'):
+        # Enhanced weighted combination
+        vader_weight = 0.7
+        textblob_weight = 0.3
+        
+        # Calculate final score with context awareness
+        final_score = (
+            overall_vader['compound'] * vader_weight + 
+            textblob_polarity * textblob_weight
+        ) * 100
+        
+        # Enhanced confidence calculation
+        agreement = 1 - abs(overall_vader['compound'] - textblob_polarity)
+        emotional_coherence = 1 - abs(emotional_journey['start']['score'] - emotional_journey['end']['score']) / 2
+        confidence = (agreement * 0.6 + emotional_coherence * 0.4) * 100
+        
+        return {
+            "sentiment": self._get_emotional_state(overall_vader['compound'], overall_vader),
+            "score": round(final_score, 3),
+            "emotional_journey": emotional_journey,
+            "confidence": round(confidence, 3),
+            "tier": tier
+        }
+    
+    def analyze_batch(self, texts, timelines=None):
+        """
+        Analyze many texts and return a list of result dicts, in input order.
+        Sentences are still scored one by one, but the journey metrics for the
+        whole batch are computed together over padded NumPy arrays.
+        timelines optionally holds each text's timeline option, as for
+        analyze().
+        """
+        return self.score_batch(self.prepare_batch(texts, timelines))
+    
+    def prepare_batch(self, texts, timelines=None):
+        """
+        I/O half of analyze_batch: clean each text, consult the result cache
+        and translate whatever is left in one coalesced round. Returns
+        (results, pending): results holds the finished dicts (errors, cache
+        hits) and None elsewhere; pending is a list of
+        (index, cleaned_text, english_text, cacheable, timeline) for
+        score_batch().
+        """
+        if timelines is None:
+            timelines = [None] * len(texts)
+        results = [None] * len(texts)
+        todo = []  # (index, cleaned_text, timeline options)
+        
+        for i, (text, timeline) in enumerate(zip(texts, timelines)):
+            try:
+                options = timeline_options(timeline)
+            except ValueError:
+                results[i] = self.analyze(text, timeline=timeline)
+                continue
+            if not text or not isinstance(text, str):
+                results[i] = self.analyze(text)
+                continue
             
             cleaned_text = self.clean_text(text)
             if not cleaned_text:
-                return json.dumps({
-                    "error": "Text is empty after cleaning",
+                results[i] = self.analyze(text)
+                continue
+            
+            if self.result_cache is not None:
+                cached = self.result_cache.get_result(self._result_key(options), cleaned_text)
+                if cached is not None:
+                    results[i] = cached
+                    continue
+            
+            todo.append((i, cleaned_text, options))
+        
+        if not todo:
+            return results, []
+        
+        # One translate_text call for the whole batch, so every line that
+        # needs translating goes out in the same round
+        english, complete = self.translate_text('\n'.join(cleaned for _, cleaned, _ in todo))
+        english_lines = english.split('\n')
+        cacheable = self.result_cache is not None and complete
+        line_counts = [cleaned.count('\n') + 1 for _, cleaned, _ in todo]
+        
+        pending = []
+        if len(english_lines) == sum(line_counts):
+            offset = 0
+            for (i, cleaned_text, options), count in zip(todo, line_counts):
+                english_text = '\n'.join(english_lines[offset:offset + count])
+                pending.append((i, cleaned_text, english_text, cacheable, options))
+                offset += count
+        else:
+            # A translation spanned lines; fall back to one text at a time
+            for i, cleaned_text, options in todo:
+                english_text, complete = self.translate_text(cleaned_text)
+                cacheable = self.result_cache is not None and complete
+                pending.append((i, cleaned_text, english_text, cacheable, options))
+        
+        return results, pending
+    
+    def score_batch(self, prepared):
+        """CPU half of analyze_batch: score the output of prepare_batch()"""
+        results, pending = prepared
+        results = list(results)
+        scored = []  # (index, cleaned_text, cacheable, timeline, overall_vader, textblob_polarity)
+        score_rows = []
+        neutral_rows = []
+        speaker_rows = []
+        
+        for i, cleaned_text, english_text, cacheable, timeline in pending:
+            try:
+                speakers = []
+                scores, neutral_ratios, sentence_scores = self._score_sentences(english_text, speakers)
+                overall_vader, overall_polarity = self.scorer.score_overall(_without_labels(english_text), sentence_scores)
+            except Exception as e:
+                results[i] = {
+                    "error": str(e),
                     "sentiment": "neutral",
                     "score": 0.000,
                     "emotional_journey": self._get_default_journey(),
                     "confidence": 0.000
-                })
-            
-            english_text = self.detect_and_translate(cleaned_text)
-            
-            # Get emotional journey first
-            emotional_journey = self.analyze_emotional_journey(english_text)
-            
-            # Calculate overall sentiment using VADER and TextBlob
-            overall_vader = self.analyzer.polarity_scores(english_text)
-            overall_textblob = TextBlob(english_text).sentiment
-            
-            # Enhanced weighted combination
-            vader_weight = 0.7
-            textblob_weight = 0.3
-            
-            # Calculate final score with context awareness
-            final_score = (
-                overall_vader['compound'] * vader_weight + 
-                overall_textblob.polarity * textblob_weight
-            ) * 100
-            
-            # Enhanced confidence calculation
-            agreement = 1 - abs(overall_vader['compound'] - overall_textblob.polarity)
-            emotional_coherence = 1 - abs(emotional_journey['start']['score'] - emotional_journey['end']['score']) / 2
-            confidence = (agreement * 0.6 + emotional_coherence * 0.4) * 100
+                }
+                continue
             
-            result = {
-                "sentiment": self._get_emotional_state(overall_vader['compound'], overall_vader),
-                "score": round(final_score, 3),
-                "emotional_journey": emotional_journey,
-                "confidence": round(confidence, 3)
+            scored.append((i, cleaned_text, cacheable, timeline, overall_vader, overall_polarity))
+            score_rows.append(scores)
+            neutral_rows.append(neutral_ratios)
+            speaker_rows.append(speakers)
+        
+        journeys = self._summarize_journeys(score_rows, neutral_rows, speaker_rows)
+        for row, (i, cleaned_text, cacheable, timeline, overall_vader, overall_polarity) in enumerate(scored):
+            results[i] = self._build_result(overall_vader, overall_polarity, journeys[row])
+            if timeline is not None:
+                states = classify_emotional_states(score_rows[row], neutral_rows[row])
+                results[i]["timeline"] = build_timeline(score_rows[row], speaker_rows[row], states, **timeline)
+            if cacheable:
+                self.result_cache.set_result(self._result_key(timeline), cleaned_text, results[i])
+        
+        self.metrics.inc('batch_texts', len(results))
+        return results
+    
+    def _summarize_journeys(self, score_rows, neutral_rows, speaker_rows=None):
+        """
+        Batch equivalent of the metric half of analyze_emotional_journey.
+        Rows are right-padded with NaN into a (conversations x sentences) array.
+        Change points are found per row, each in linear time.
+        """
+        journeys = [self._get_default_journey() for _ in score_rows]
+        active = [k for k, row in enumerate(score_rows) if row]
+        if not active:
+            return journeys
+        
+        lengths = np.array([len(score_rows[k]) for k in active])
+        width = max(lengths.max(), 3)
+        valid = np.arange(width) < lengths[:, None]
+        scores = np.zeros((len(active), width))
+        neutral = np.zeros((len(active), width))
+        scores[valid] = np.concatenate([score_rows[k] for k in active])
+        neutral[valid] = np.concatenate([neutral_rows[k] for k in active])
+        padded = np.where(valid, scores, np.nan)
+        rows = np.arange(len(active))
+        n = lengths.astype(float)
+        
+        # Initial/final sentiment: intensity-weighted first and last three scores
+        head_idx = np.arange(3)
+        head_ok = head_idx < lengths[:, None]
+        head = np.where(head_ok, scores[:, :3], 0.0)
+        head_w = np.array([0.6, 0.3, 0.1]) * (1 + np.abs(head) * 0.5) * head_ok
+        start = (head * (head_w / head_w.sum(axis=1, keepdims=True))).sum(axis=1)
+        
+        tail_idx = lengths[:, None] - 3 + np.arange(3)
+        tail_ok = tail_idx >= 0
+        tail = np.where(tail_ok, scores[rows[:, None], np.maximum(tail_idx, 0)], 0.0)
+        tail_w = np.array([0.1, 0.3, 0.6]) * (1 + np.abs(tail) * 0.5) * tail_ok
+        end = (tail * (tail_w / tail_w.sum(axis=1, keepdims=True))).sum(axis=1)
+        
+        # Closed-form least-squares slope over x = 0..n-1
+        x = np.arange(width)
+        x_centered = np.where(valid, x - (n[:, None] - 1) / 2, 0.0)
+        mean = np.nanmean(padded, axis=1)
+        y_centered = np.where(valid, scores - mean[:, None], 0.0)
+        sxx = (x_centered ** 2).sum(axis=1)
+        slope = np.divide((x_centered * y_centered).sum(axis=1), sxx, out=np.zeros_like(sxx), where=sxx > 0)
+        trend_strength = np.where(lengths >= 2, np.abs(np.tanh(slope * 3)), 0.0)
+        
+        variance = np.nanvar(padded, axis=1)
+        std = np.sqrt(variance)
+        diff_valid = valid[:, 1:]
+        abs_diff = np.where(diff_valid, np.abs(np.diff(scores, axis=1)), 0.0)
+        rate_of_change = abs_diff.sum(axis=1) / np.maximum(lengths - 1, 1)
+        stability = np.where(lengths >= 2, np.clip(1.0 - (variance * 0.5 + rate_of_change * 0.5), 0.0, 1.0), 1.0)
+        
+        low = np.nanmin(padded, axis=1)
+        high = np.nanmax(padded, axis=1)
+        fluctuation = np.where(lengths >= 2, std * 0.7 + (high - low) * 0.3, 0.0)
+        
+        # Trend direction: mean of the last vs first min(3, n) scores
+        window = np.minimum(3, lengths)
+        start_avg = np.where(np.arange(width) < window[:, None], scores, 0.0).sum(axis=1) / window
+        end_window = (np.arange(width) >= (lengths - window)[:, None]) & valid
+        end_avg = np.where(end_window, scores, 0.0).sum(axis=1) / window
+        threshold = 0.1 * std + 0.05
+        delta = end_avg - start_avg
+        direction = np.where(np.abs(delta) < threshold, 'stable', np.where(delta > 0, 'improving', 'declining'))
+        direction = np.where(lengths >= 2, direction, 'stable')
+        
+        # Dominant emotion: 0.6 * frequency + 0.4 * share of absolute intensity
+        codes = np.where(valid, classify_emotional_states(scores, neutral), -1)
+        n_states = len(EMOTIONAL_STATES)
+        counts = np.zeros((len(active), n_states))
+        intensity = np.zeros((len(active), n_states))
+        row_idx = np.broadcast_to(rows[:, None], codes.shape)[valid]
+        np.add.at(counts, (row_idx, codes[valid]), 1)
+        np.add.at(intensity, (row_idx, codes[valid]), np.abs(scores[valid]))
+        total_intensity = intensity.sum(axis=1, keepdims=True)
+        weights = counts / n[:, None] * 0.6 + np.divide(
+            intensity, total_intensity, out=np.zeros_like(intensity), where=total_intensity > 0
+        ) * 0.4
+        # Ties go to the state that appeared first, like max() over a Counter
+        first_seen = np.full((len(active), n_states), width)
+        np.minimum.at(first_seen, (row_idx, codes[valid]), np.broadcast_to(x, codes.shape)[valid])
+        weights = np.where(counts > 0, weights, -np.inf)
+        best = weights.max(axis=1, keepdims=True)
+        dominant = np.where(weights == best, first_seen, width).argmin(axis=1)
+        mixed = ((counts > 0).sum(axis=1) > 2) & (counts.max(axis=1) < n * 0.4)
+        
+        start_states = classify_emotional_states(start)
+        end_states = classify_emotional_states(end)
+        
+        for j, k in enumerate(active):
+            journeys[k] = {
+                'start': {
+                    'score': round(float(start[j]), 3),
+                    'state': EMOTIONAL_STATES[start_states[j]]
+                },
+                'end': {
+                    'score': round(float(end[j]), 3),
+                    'state': EMOTIONAL_STATES[end_states[j]]
+                },
+                'fluctuation': round(float(fluctuation[j]), 3),
+                'stability': round(float(stability[j]) * 100, 3),
+                'trend': {
+                    'direction': str(direction[j]),
+                    'strength': round(float(trend_strength[j]) * 100, 3)
+                },
+                'dominant_emotion': 'mixed' if mixed[j] else EMOTIONAL_STATES[dominant[j]],
+                'emotional_range': {
+                    'min': round(float(low[j]), 3),
+                    'max': round(float(high[j]), 3)
+                },
+                'change_points': detect_change_points(
+                    score_rows[k], speaker_rows[k] if speaker_rows is not None else None
+                )
             }
-            
-            return json.dumps(result)
-            
-        except Exception as e:
-            return json.dumps({
-                "error": str(e),
-                "sentiment": "neutral",
-                "score": 0.000,
-                "emotional_journey": self._get_default_journey(),
-                "confidence": 0.000
-            })
+        
+        return journeys
     
     def _get_dominant_emotion(self, scores):
         if not scores:
@@ -540,9 +1376,10 @@ class MultilingualSentimentAnalyzer:
         
         # Combine frequency and intensity
         final_weights = {}
+        total_intensity = sum(abs(s) for s in emotional_scores)
         for emotion in emotion_counts:
             frequency_weight = emotion_counts[emotion] / len(emotional_states)
-            intensity_weight = weighted_emotions[emotion] / sum(abs(s) for s in emotional_scores)
+            intensity_weight = weighted_emotions[emotion] / total_intensity if total_intensity else 0.0
             final_weights[emotion] = frequency_weight * 0.6 + intensity_weight * 0.4
         
         # Get the emotion with highest combined weight
@@ -557,11 +1394,150 @@ class MultilingualSentimentAnalyzer:
         
         return dominant_emotion
 
+def request_deadline(request):
+    """A request's "deadline_ms" budget in seconds, or None"""
+    deadline_ms = request.get("deadline_ms")
+    return None if deadline_ms is None else float(deadline_ms) / 1000
+
+def render_metrics(analyzer):
+    """The analyzer's metrics plus cache statistics, as Prometheus text"""
+    extra = {}
+    caches = (
+        ('translation_cache', analyzer.translation_cache),
+        ('sentence_cache', analyzer.sentence_cache),
+        ('result_cache', analyzer.result_cache)
+    )
+    for name, cache in caches:
+        if cache is None:
+            continue
+        stats = cache.stats()
+        for key in ('hits', 'misses', 'evictions'):
+            if key in stats:
+                extra[f'{name}_{key}'] = stats[key]
+    return analyzer.metrics.render(labels={'pid': os.getpid()}, extra_counters=extra)
+
+def serve(analyzer, stdin=sys.stdin, stdout=sys.stdout):
+    """
+    Long-lived worker loop. Reads newline-delimited JSON requests from stdin
+    and writes one JSON response per line, echoing the request id:
+
+        {"id": 1, "text": "..."}     -> {"id": 1, "result": {...}}
+        {"id": 2, "op": "batch", "texts": [...]} -> {"id": 2, "result": [{...}, ...]}
+        {"id": 3, "op": "ping"}      -> {"id": 3, "result": {"status": "ok", ...}}
+        {"id": 4, "op": "stats"}     -> {"id": 4, "result": {"translation_cache": {...}}}
+        {"id": 5, "op": "metrics"}   -> {"id": 5, "result": "<Prometheus text>"}
+
+    An analyze request may set "timings": true to get per-stage timings
+    back in the result, and "timeline" (see MultilingualSentimentAnalyzer.analyze)
+    to get the packed per-sentence timeline. "tier", "deadline_ms" and
+    "backlog" (requests queued behind it) feed the tier planner; a request
+    whose deadline has already passed is answered with an error whose
+    "code" is "deadline_exceeded".
+    """
+    def send(message):
+        stdout.write(json.dumps(message) + "\n")
+        stdout.flush()
+
+    served = 0
+    analyzer.metrics.set_gauge('startup_seconds', round(time.perf_counter() - _MODULE_STARTED, 6))
+    send({"event": "ready", "pid": os.getpid()})
+
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            op = request.get("op", "analyze")
+
+            if op == "ping":
+                send({"id": request_id, "result": {"status": "ok", "pid": os.getpid(), "served": served}})
+            elif op == "stats":
+                cache = analyzer.translation_cache
+                sentence_cache = analyzer.sentence_cache
+                send({"id": request_id, "result": {
+                    "translation_cache": cache.stats() if cache is not None else None,
+                    "sentence_cache": sentence_cache.stats() if sentence_cache is not None else None,
+                    "result_cache": analyzer.result_cache.stats() if analyzer.result_cache is not None else None,
+                    "translation": analyzer.translation_stage.stats(),
+                    "metrics": analyzer.metrics.snapshot()
+                }})
+            elif op == "metrics":
+                send({"id": request_id, "result": render_metrics(analyzer)})
+            elif op == "analyze":
+                deadline = request_deadline(request)
+                if deadline is not None and deadline <= 0:
+                    send({"id": request_id, "error": "Deadline exceeded before analysis", "code": "deadline_exceeded"})
+                    continue
+                result = analyzer.analyze(
+                    request.get("text"),
+                    timings=bool(request.get("timings")),
+                    timeline=request.get("timeline"),
+                    tier=request.get("tier") or 'full',
+                    deadline=deadline,
+                    backlog=int(request.get("backlog") or 0)
+                )
+                served += 1
+                send({"id": request_id, "result": result})
+            elif op == "batch":
+                results = analyzer.analyze_batch(request.get("texts") or [])
+                served += len(results)
+                send({"id": request_id, "result": results})
+            elif op == "shutdown":
+                send({"id": request_id, "result": {"status": "bye"}})
+                break
+            else:
+                send({"id": request_id, "error": f"Unknown op: {op}"})
+        except Exception as e:
+            send({"id": request_id, "error": str(e)})
+
 if __name__ == "__main__":
     try:
+        if "--import-profile" in sys.argv[1:]:
+            print(json.dumps(profile_imports()))
+            sys.exit(0)
+
+        if sys.argv[1:2] == ["batch"]:
+            from bulk import main as bulk_main
+            sys.exit(bulk_main(sys.argv[2:]))
+
+        if sys.argv[1:2] == ["backfill"]:
+            from backfill import main as backfill_main
+            sys.exit(backfill_main(sys.argv[2:]))
+
+        if sys.argv[1:2] == ["lexicons"]:
+            from lexicons import main as lexicons_main
+            sys.exit(lexicons_main(sys.argv[2:]))
+
+        if sys.argv[1:2] == ["index"]:
+            from search_index import main as index_main
+            sys.exit(index_main(sys.argv[2:]))
+
+        if sys.argv[1:2] == ["server"]:
+            from analysis_server import main as server_main
+            sys.exit(server_main(sys.argv[2:]))
+
+        if "--serve" in sys.argv[1:]:
+            serve(MultilingualSentimentAnalyzer())
+            sys.exit(0)
+
+        # Streaming mode for transcripts too long for a command-line argument
+        if "--stdin" in sys.argv[1:]:
+            print(json.dumps(MultilingualSentimentAnalyzer().analyze_stream(sys.stdin)))
+            sys.exit(0)
+
+        if "--input" in sys.argv[1:]:
+            input_path = sys.argv[sys.argv.index("--input") + 1]
+            with open(input_path, encoding='utf-8', errors='replace') as transcript:
+                print(json.dumps(MultilingualSentimentAnalyzer().analyze_stream(transcript)))
+            sys.exit(0)
+
         if len(sys.argv) < 2:
             result = {
-                "error": "No input text provided. Usage: python sentiment_service.py \"your text here\"",
+                "error": "No input text provided. Usage: python sentiment_service.py \"your text here\" | --input PATH | --stdin | batch IN.jsonl OUT.jsonl | server --socket PATH | backfill SOURCE | index serve|build SOURCE|query Q | lexicons [PATH]",
                 "sentiment": "neutral",
                 "score": 0.000,
                 "emotional_journey": MultilingualSentimentAnalyzer()._get_default_journey(),
@@ -570,13 +1546,9 @@ if __name__ == "__main__":
         else:
             input_text = sys.argv[1]
             analyzer = MultilingualSentimentAnalyzer()
-            result = analyzer.analyze_sentiment(input_text)
+            result = analyzer.analyze(input_text)
             
-        # Ensure the result is JSON serializable
-        if isinstance(result, str):
-            print(result)  # Already JSON string
-        else:
-            print(json.dumps(result))
+        print(json.dumps(result))
             
     except Exception as e:
         print(json.dumps({
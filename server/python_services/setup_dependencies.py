@@ -2,22 +2,24 @@ import subprocess
 import sys
 import json
 import os
+import importlib.util
+
+# pip package name -> importable module name
+REQUIRED_PACKAGES = {
+    'textblob': 'textblob',
+    'vaderSentiment': 'vaderSentiment',
+    'requests': 'requests',
+    'numpy': 'numpy'
+}
 
 def install_dependencies():
-    required_packages = [
-        'textblob',
-        'vaderSentiment',
-        'googletrans==4.0.0-rc1',
-        'numpy'
-    ]
-    
     results = {
         "success": True,
         "installed": [],
         "errors": []
     }
     
-    for package in required_packages:
+    for package in REQUIRED_PACKAGES:
         try:
             subprocess.check_call([sys.executable, "-m", "pip", "install", "-q", package])
             results["installed"].append(package)
@@ -34,6 +36,38 @@ def install_dependencies():
         results["success"] = False
         results["errors"].append(f"Error downloading NLTK data: {str(e)}")
     
+    # Precompile the lexicons so the first workers don't each build them
+    try:
+        from lexicons import compile_lexicons
+        compile_lexicons()
+        results["installed"].append("lexicons")
+    except Exception as e:
+        results["success"] = False
+        results["errors"].append(f"Error compiling lexicons: {str(e)}")
+    
+    print(json.dumps(results))
+
+def check_dependencies():
+    """
+    Cheap readiness check for server boot: locate every required module
+    without importing it and report what is missing. Nothing is installed.
+    """
+    missing = []
+    for package, module in REQUIRED_PACKAGES.items():
+        try:
+            if importlib.util.find_spec(module) is None:
+                missing.append(package)
+        except (ImportError, ValueError):
+            missing.append(package)
+    
+    results = {
+        "ready": not missing,
+        "missing": missing,
+        "python": sys.executable
+    }
+    if missing:
+        results["hint"] = "Run: python3 setup_dependencies.py"
+    
     print(json.dumps(results))
 
 # Add these environment variables
@@ -41,4 +75,7 @@ os.environ['CUBLAS_WORKSPACE_CONFIG'] = ':4096:8'
 os.environ['PYTHONHASHSEED'] = '42'
 
 if __name__ == "__main__":
-    install_dependencies() 
\ No newline at end of file
+    if "--check" in sys.argv[1:]:
+        check_dependencies()
+    else:
+        install_dependencies()
@@ -0,0 +1,74 @@
+import json
+import asyncio
+
+from analysis_server import AnalysisServer
+
+TEXTS = [
+    "I have been waiting for two weeks and nobody helps me",
+    "Thank you so much, that is great",
+    "Please wait while I check the details",
+    "This is terrible service\nI want my money back",
+] * 5
+
+async def exchange(path, requests):
+    reader, writer = await asyncio.open_unix_connection(path)
+    for request in requests:
+        writer.write((json.dumps(request) + "\n").encode('utf-8'))
+    await writer.drain()
+    responses = {}
+    while len(responses) < len(requests):
+        message = json.loads(await reader.readline())
+        responses[message["id"]] = message
+    writer.close()
+    return responses
+
+def test_concurrent_requests_share_batches(tmp_path, make_analyzer):
+    analyzer = make_analyzer()
+    expected = [analyzer.analyze(text) for text in TEXTS]
+    path = str(tmp_path / "analysis.sock")
+
+    async def scenario():
+        server = AnalysisServer(analyzer, max_batch=8, max_wait=0.05)
+        listener = await server.start(path=path)
+        try:
+            requests = [{"id": i, "text": text} for i, text in enumerate(TEXTS)]
+            requests.append({"id": "batch", "op": "batch", "texts": TEXTS[:3]})
+            requests.append({"id": "timed", "text": TEXTS[0], "timings": True})
+            requests.append({"id": "timeline", "text": TEXTS[3], "timeline": True})
+            responses = await exchange(path, requests)
+            stats = server.stats()["batching"]
+        finally:
+            listener.close()
+            await server.close()
+        return responses, stats
+
+    responses, stats = asyncio.run(scenario())
+    assert [responses[i]["result"] for i in range(len(TEXTS))] == expected
+    assert responses["batch"]["result"] == expected[:3]
+    assert "timings" in responses["timed"]["result"]
+    # Timelines are built in the micro-batch too
+    assert responses["timeline"]["result"] == analyzer.analyze(TEXTS[3], timeline=True)
+    assert stats["texts"] == len(TEXTS) + 4
+    assert stats["batches"] < len(TEXTS)
+    assert stats["mean_batch"] > 1
+
+def test_errors_are_answered_per_request(tmp_path, make_analyzer):
+    path = str(tmp_path / "analysis.sock")
+
+    async def scenario():
+        server = AnalysisServer(make_analyzer())
+        listener = await server.start(path=path)
+        try:
+            return await exchange(path, [
+                {"id": 1, "op": "nope"},
+                {"id": 2, "text": ""},
+                {"id": 3, "op": "ping"},
+            ])
+        finally:
+            listener.close()
+            await server.close()
+
+    responses = asyncio.run(scenario())
+    assert responses[1]["error"] == "Unknown op: nope"
+    assert responses[2]["result"]["error"] == "No text provided or invalid input type"
+    assert responses[3]["result"]["status"] == "ok"
@@ -0,0 +1,137 @@
+import json
+
+import pytest
+
+import backfill
+from backfill import JsonlSink, JsonlSource, Throttle, journey_document, update_fields
+
+TEXTS = [
+    "I have been waiting for two weeks\nThis is terrible service",
+    "thank you so much\nthat is great",
+    "",
+    "okay\nplease wait\nthe refund is done",
+    "Customer: why is this so slow\nAgent: sorry, it is fixed now",
+] * 3
+
+def write_export(path, fingerprint=None):
+    with open(path, 'w') as export:
+        for i, text in enumerate(TEXTS):
+            document = {"_id": {"$oid": f"{i:024x}"}, "text": text, "score": 0}
+            if i == 1 and fingerprint:
+                document["analyzerFingerprint"] = fingerprint
+            if i == 3:
+                document["timeline"] = {"points": 2, "method": "minmax"}
+            export.write(json.dumps(document) + "\n")
+        export.write("{not json\n")
+
+def read_updates(path):
+    with open(path) as output:
+        updates = [json.loads(line) for line in output]
+    for update in updates:
+        update.pop("rescoredAt")
+    return {update["_id"]["$oid"]: update for update in updates}
+
+def test_rescored_fields_match_the_analyzer(tmp_path, make_analyzer):
+    analyzer = make_analyzer()
+    write_export(tmp_path / "export.jsonl", fingerprint=analyzer.fingerprint)
+    summary = backfill.run(
+        JsonlSource(str(tmp_path / "export.jsonl")), JsonlSink(str(tmp_path / "updates.jsonl")),
+        checkpoint_path=str(tmp_path / "checkpoint"), workers=1, page_size=4, analyzer=analyzer
+    )
+    assert summary["read"] == len(TEXTS)
+    assert summary["invalid"] == 1
+    # Empty texts and the document already scored by this analyzer are skipped
+    assert summary["rescored"] == len(TEXTS) - 3 - 1 and summary["skipped"] == 4
+
+    updates = read_updates(tmp_path / "updates.jsonl")
+    expected = analyzer.analyze(TEXTS[0])
+    assert updates[f"{0:024x}"] == {
+        "_id": {"$oid": f"{0:024x}"},
+        "sentiment": expected["sentiment"],
+        "score": expected["score"],
+        "confidence": expected["confidence"],
+        "emotionalJourney": journey_document(expected["emotional_journey"]),
+        "analyzerFingerprint": analyzer.fingerprint
+    }
+    assert f"{1:024x}" not in updates
+    assert updates[f"{3:024x}"]["timeline"]["points"] <= 2
+
+def test_pool_matches_inline(tmp_path):
+    write_export(tmp_path / "export.jsonl")
+    for workers in (1, 2):
+        backfill.run(
+            JsonlSource(str(tmp_path / "export.jsonl")), JsonlSink(str(tmp_path / f"updates{workers}.jsonl")),
+            workers=workers, page_size=3, chunk_size=2
+        )
+    assert read_updates(tmp_path / "updates2.jsonl") == read_updates(tmp_path / "updates1.jsonl")
+
+def test_long_calls_get_the_full_tier(tmp_path, make_analyzer):
+    analyzer = make_analyzer()
+    text = "\n".join(f"Customer: this is line {i}, still waiting" for i in range(2500))
+    with open(tmp_path / "export.jsonl", 'w') as export:
+        export.write(json.dumps({"_id": {"$oid": f"{0:024x}"}, "text": text, "timeline": {"points": 50}}) + "\n")
+    summary = backfill.run(
+        JsonlSource(str(tmp_path / "export.jsonl")), JsonlSink(str(tmp_path / "updates.jsonl")),
+        workers=1, analyzer=analyzer
+    )
+    assert summary["rescored"] == 1
+    assert update_fields({**analyzer.analyze("okay"), "tier": 'fast'}, analyzer.fingerprint) is None
+
+def test_cli_names_the_follow_up_rebuilds(tmp_path, capsys):
+    write_export(tmp_path / "export.jsonl")
+    out = str(tmp_path / "updates.jsonl")
+    assert backfill.main([str(tmp_path / "export.jsonl"), "--out", out, "--workers", "1"]) == 0
+    captured = capsys.readouterr()
+    summary = json.loads(captured.out)
+    assert summary["rescored"] > 0 and summary["follow_up"] == list(backfill.FOLLOW_UP)
+    assert "npm run rebuild:rollups" in captured.err
+
+def test_interrupted_run_resumes_from_checkpoint(tmp_path, make_analyzer):
+    write_export(tmp_path / "export.jsonl")
+    checkpoint = str(tmp_path / "checkpoint")
+    backfill.run(
+        JsonlSource(str(tmp_path / "export.jsonl")), JsonlSink(str(tmp_path / "full.jsonl")),
+        workers=1, page_size=3, analyzer=make_analyzer()
+    )
+
+    class FailingSink(JsonlSink):
+        writes = 0
+
+        def write(self, updates, written_at):
+            FailingSink.writes += 1
+            if FailingSink.writes == 3:
+                # Half a batch reaches the file before the crash
+                self._output.write(b'{"_id": "torn')
+                raise KeyboardInterrupt
+            super().write(updates, written_at)
+
+    with pytest.raises(KeyboardInterrupt):
+        backfill.run(
+            JsonlSource(str(tmp_path / "export.jsonl")), FailingSink(str(tmp_path / "resumed.jsonl")),
+            checkpoint_path=checkpoint, workers=1, page_size=3, analyzer=make_analyzer()
+        )
+    with open(checkpoint) as state:
+        assert json.load(state)["totals"]["read"] == 6
+
+    summary = backfill.run(
+        JsonlSource(str(tmp_path / "export.jsonl")), JsonlSink(str(tmp_path / "resumed.jsonl")),
+        checkpoint_path=checkpoint, workers=1, page_size=3, analyzer=make_analyzer()
+    )
+    assert summary["read"] == len(TEXTS)
+    assert read_updates(tmp_path / "resumed.jsonl") == read_updates(tmp_path / "full.jsonl")
+
+def test_throttle_paces_writes():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    throttle = Throttle(rate=100, clock=lambda: now[0], sleep=sleep)
+    for _ in range(5):
+        throttle.wait(50)
+    # 250 documents at 100/s: the last batch may start at 2 s
+    assert now[0] == pytest.approx(2.0)
+    assert throttle.slept == pytest.approx(2.0)
+    Throttle().wait(10**6)  # No rate, no waiting
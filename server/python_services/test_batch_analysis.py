@@ -0,0 +1,40 @@
+from sentiment_service import EMOTIONAL_STATES, classify_emotional_states
+
+CONVERSATIONS = [
+    """Customer: I have been waiting for two weeks and nobody helps me
+Agent: I am very sorry for the delay, let me check your order
+Customer: This is terrible service
+Agent: I have processed a full refund for you
+Customer: Okay thank you, that is great""",
+    "hello there",
+    "good\ngood\ngood",
+    "The product broke after one day\nI want my money back\nThanks for the quick help",
+    "",
+    "!!!",
+]
+
+def test_batch_matches_single_analysis(make_analyzer):
+    analyzer = make_analyzer()
+    expected = [analyzer.analyze(text) for text in CONVERSATIONS]
+
+    # Every scorable text goes through the vectorized journey
+    summarize, rows = analyzer._summarize_journeys, []
+    analyzer._summarize_journeys = lambda score_rows, *args: rows.extend(score_rows) or summarize(score_rows, *args)
+    assert analyzer.analyze_batch(CONVERSATIONS) == expected
+    assert len(rows) == 4
+
+def test_batch_timelines_match_single_analysis(make_analyzer):
+    analyzer = make_analyzer()
+    timelines = [True, None, {"points": 2}, 5, True, "bogus"]
+    expected = [analyzer.analyze(text, timeline=timeline) for text, timeline in zip(CONVERSATIONS, timelines)]
+    assert analyzer.analyze_batch(CONVERSATIONS, timelines) == expected
+    assert expected[0]["timeline"]["count"] == 5 and "timeline" not in expected[1]
+    assert expected[5]["error"] == "Invalid timeline option: 'bogus'"
+
+def test_state_codes_match_detailed_state(make_analyzer):
+    analyzer = make_analyzer()
+    scores = [-1, -0.75, -0.6, -0.5, -0.25, -0.1, -0.05, 0, 0.05, 0.1, 0.25, 0.5, 0.75, 1]
+    codes = classify_emotional_states(scores)
+    for score, code in zip(scores, codes):
+        assert EMOTIONAL_STATES[code] == analyzer._get_detailed_emotional_state(score, None)
+    assert EMOTIONAL_STATES[classify_emotional_states([0.0], [0.9])[0]] == 'factual'
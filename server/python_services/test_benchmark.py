@@ -0,0 +1,33 @@
+from benchmark_pipeline import StubBackend, compare, generate_transcript, run_benchmark
+from sentiment_service import count_scripts
+
+def test_generator_is_deterministic_and_follows_mix():
+    text = generate_transcript(200, mix={'en': 1, 'hi': 1, 'ta': 1}, repetition=0.3, seed=4)
+    assert text == generate_transcript(200, mix={'en': 1, 'hi': 1, 'ta': 1}, repetition=0.3, seed=4)
+    lines = text.split('\n')
+    assert len(lines) == 200
+    assert set(count_scripts(text)) == {'hi', 'ta'}
+    assert len(set(lines)) < 200  # repeated lines
+    assert 'hi' not in count_scripts(generate_transcript(50, mix={'en': 1}))
+
+def test_stub_backend_is_stable():
+    first = StubBackend().translate_many('hi', ['नमस्ते', 'धन्यवाद'])
+    assert first == StubBackend().translate_many('hi', ['नमस्ते', 'धन्यवाद'])
+    assert all(result.text for result in first)
+
+def test_compare_flags_only_real_regressions():
+    report = run_benchmark(sizes=[5], repeat=2)
+    assert set(report["results"]["5"]) == {'clean_text', 'detect_and_translate', 'journey', 'overall', 'end_to_end'}
+    assert compare(report, report) == []
+
+    baseline = {"results": {"5": {
+        "journey": {"p50_ms": 1.0},
+        "overall": {"p50_ms": 0.01},
+    }}}
+    current = {"results": {"5": {
+        "journey": {"p50_ms": 1.5},
+        "overall": {"p50_ms": 0.03},  # Slower, but within timer noise
+        "clean_text": {"p50_ms": 9.0},  # Not in the baseline
+    }}}
+    regressions = compare(current, baseline, threshold=0.25)
+    assert [(r["stage"], r["size"]) for r in regressions] == [("journey", 5)]
@@ -0,0 +1,44 @@
+import json
+
+import bulk
+
+TEXTS = [
+    "I have been waiting for two weeks\nThis is terrible service",
+    "thank you so much\nthat is great",
+    "",
+    "okay\nplease wait\nthe refund is done",
+] * 5
+
+def write_input(path):
+    with open(path, 'w') as source:
+        for i, text in enumerate(TEXTS):
+            source.write(json.dumps({"id": f"c{i}", "text": text}) + "\n")
+        source.write("{not json\n")
+
+def read_output(path):
+    with open(path) as output:
+        return {record["index"]: record for record in map(json.loads, output)}
+
+def test_pool_matches_inline_and_keeps_order(tmp_path):
+    write_input(tmp_path / "in.jsonl")
+    inline = bulk.run(tmp_path / "in.jsonl", tmp_path / "inline.jsonl", workers=1, resume=False)
+    pooled = bulk.run(tmp_path / "in.jsonl", tmp_path / "pooled.jsonl", workers=2, chunk_size=3, ordered=True, resume=False)
+    assert inline["processed"] == pooled["processed"] == len(TEXTS) + 1
+    expected = read_output(tmp_path / "inline.jsonl")
+    assert read_output(tmp_path / "pooled.jsonl") == expected
+    with open(tmp_path / "pooled.jsonl") as output:
+        assert [json.loads(line)["index"] for line in output] == sorted(expected)
+    assert expected[0]["id"] == "c0"
+    assert "error" in expected[len(TEXTS)]["result"]
+
+def test_resume_skips_written_records_and_drops_torn_line(tmp_path):
+    write_input(tmp_path / "in.jsonl")
+    bulk.run(tmp_path / "in.jsonl", tmp_path / "full.jsonl", workers=1, resume=False)
+    with open(tmp_path / "full.jsonl") as full:
+        lines = full.readlines()
+    with open(tmp_path / "partial.jsonl", 'w') as partial:
+        partial.writelines(lines[:7])
+        partial.write(lines[7][:20])
+    summary = bulk.run(tmp_path / "in.jsonl", tmp_path / "partial.jsonl", workers=1)
+    assert summary["skipped"] == 7
+    assert read_output(tmp_path / "partial.jsonl") == read_output(tmp_path / "full.jsonl")
@@ -0,0 +1,87 @@
+import random
+
+from changepoints import EscalationMonitor, OnlinePelt, detect_change_points
+
+def steps(levels, length=10, noise=0.1, seed=0):
+    rng = random.Random(seed)
+    return [level + rng.gauss(0, noise) for level in levels for _ in range(length)]
+
+def test_finds_mean_shifts():
+    scores = steps([0.4, -0.6, 0.5])
+    speakers = ['Customer' if i % 3 else 'Agent' for i in range(len(scores))]
+    points = detect_change_points(scores, speakers)
+    assert [point['index'] for point in points] == [10, 20]
+    assert [point['kind'] for point in points] == ['escalation', 'de-escalation']
+    assert points[0]['speaker'] == speakers[10]
+    assert points[0]['before'] > 0.3 and points[0]['after'] < -0.5
+    assert detect_change_points(steps([0.2], length=40)) == []
+    assert detect_change_points([]) == [] and detect_change_points([0.5]) == []
+
+def test_online_matches_offline_at_every_prefix():
+    scores = steps([0.1, -0.5, 0.2, 0.8, -0.3], length=7, noise=0.2, seed=1)
+    detector = OnlinePelt()
+    for end, score in enumerate(scores, 1):
+        detector.add(score)
+        assert detector.change_points() == detect_change_points(scores[:end])
+
+def test_memory_is_bounded():
+    # Shifts prune on their own; a stable stretch hits the cap
+    shifting, stable = OnlinePelt(), OnlinePelt(max_candidates=32)
+    for score in steps([0.3, -0.3] * 50, length=20, noise=0.2, seed=2):
+        shifting.add(score)
+        assert len(shifting._candidates) < 60
+    for score in steps([0.1], length=3000, noise=0.05, seed=2):
+        stable.add(score)
+        assert len(stable._candidates) <= 33
+    assert stable.segments() == [(0, 3000)]
+
+def test_cap_leaves_results_unchanged():
+    scores = steps([0.2, -0.4, 0.6, 0.0], length=150, noise=0.2, seed=5)
+    capped, uncapped = OnlinePelt(max_candidates=16), OnlinePelt(max_candidates=None)
+    for score in scores:
+        capped.add(score)
+        uncapped.add(score)
+    assert capped.change_points() == uncapped.change_points()
+    assert [point['index'] for point in capped.change_points()] == [150, 300, 450]
+
+def test_escalation_monitor():
+    monitor = EscalationMonitor(speakers=('Customer',))
+    calm, angry = steps([0.3], length=6, seed=3), steps([-0.5], length=6, seed=4)
+    alerts = [monitor.add(i, 'Customer', score) for i, score in enumerate(calm + angry)]
+    # The drop is caught within two sentences, and only once
+    raised = [i for i, alert in enumerate(alerts) if alert]
+    assert len(raised) == 1 and 6 <= raised[0] <= 7
+    assert alerts[raised[0]]['kind'] == 'escalation' and alerts[raised[0]]['baseline'] > 0.2
+    # Other speakers are ignored
+    assert monitor.add(99, 'Agent', -1.0) is None
+
+def test_incremental_journey_alerts_live(make_analyzer):
+    analyzer = make_analyzer()
+    utterances = [
+        ("Customer", "Hi, I wanted to ask about my order"),
+        ("Agent", "Sure, happy to help"),
+        ("Customer", "It was supposed to arrive last week"),
+        ("Customer", "This is ridiculous, I have been waiting forever"),
+        ("Customer", "Your service is terrible and nobody ever answers"),
+        ("Customer", "I am extremely angry and I want a refund right now"),
+    ]
+    journey = analyzer.incremental_journey(escalation=True)
+    raised = []
+    for turn, (speaker, text) in enumerate(utterances):
+        journey.update(speaker, text)
+        raised += [(turn, alert) for alert in journey.pop_alerts()]
+    assert [(turn, alert['kind']) for turn, alert in raised] == [(4, 'escalation')]
+    assert journey.pop_alerts() == []
+
+    # finalize() rescores without raising the alerts again
+    text = "\n".join(f"{speaker}: {utterance}" for speaker, utterance in utterances)
+    assert journey.finalize() == analyzer.analyze_emotional_journey(text)
+    assert journey.pop_alerts() == []
+
+def test_analyze_labels_change_points_with_the_speaker(make_analyzer):
+    analyzer = make_analyzer()
+    lines = ["Customer: hello I need help with my order"]
+    lines += ["Agent: this is wonderful, great news, I am so happy to help"] * 4
+    lines += ["Agent: this is terrible, awful, I hate this horrible mess"] * 4
+    points = analyzer.analyze("\n".join(lines))["emotional_journey"]["change_points"]
+    assert [(point['index'], point['speaker'], point['kind']) for point in points] == [(5, 'Agent', 'escalation')]
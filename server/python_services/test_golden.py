@@ -0,0 +1,53 @@
+import json
+
+from golden import check, compare_results, generate_corpus, main, record, render_table
+
+def test_corpus_is_deterministic():
+    assert generate_corpus(30, seed=3) == generate_corpus(30, seed=3)
+    assert generate_corpus(30, seed=3) != generate_corpus(30, seed=4)
+    assert generate_corpus(2) == ["", "   "]
+
+def test_exact_engines_match_golden_results():
+    golden = record(count=24)
+    reports = check(golden)
+    assert {report["engine"] for report in reports} >= {'reference', 'batch', 'stream', 'library_lexicons'}
+    assert all(report["passed"] and report["max_drift"] == 0 for report in reports), render_table(reports)
+
+    fast, = check(golden, engines=['fast_tier'])
+    assert not fast["passed"]
+    assert fast["fields"]["tier"]["actual"] == 'fast'
+    assert 'DRIFT' in render_table([fast])
+
+def test_compare_reports_worst_divergence_per_field():
+    expected = [
+        {"score": 10.0, "sentiment": "positive", "emotional_journey": {"start": {"score": 0.5}}},
+        {"score": -5.0, "sentiment": "negative", "emotional_journey": {"start": {"score": -0.2}}},
+    ]
+    actual = [
+        {"score": 10.0004, "sentiment": "positive", "emotional_journey": {"start": {"score": 0.5}}},
+        {"score": -5.2, "sentiment": "mixed", "emotional_journey": {"start": {"score": -0.2}}, "extra": 1},
+    ]
+    report = compare_results(expected, actual, tolerance=0.001)
+    assert report["fields"]["score"]["max_diff"] == abs(-5.2 + 5.0)
+    assert report["fields"]["score"]["worst_case"] == 1
+    assert report["fields"]["score"]["violations"] == 1
+    assert report["fields"]["sentiment"] == {
+        "max_diff": 0.0, "worst_case": 1, "expected": "negative", "actual": "mixed", "violations": 1
+    }
+    assert report["fields"]["extra"]["violations"] == 1
+    assert report["mismatched_cases"] == 1
+
+    loose = compare_results(expected, actual, tolerance=0.001, field_tolerances={'sc*': 0.5})
+    assert loose["fields"]["score"]["violations"] == 0
+
+def test_cli_round_trip(tmp_path, capsys):
+    path = str(tmp_path / "golden.json")
+    assert main(['record', '--out', path, '--count', '8']) == 0
+    with open(path, encoding='utf-8') as source:
+        assert len(json.load(source)["results"]) == 8
+    capsys.readouterr()
+
+    assert main(['check', '--golden', path, '--engines', 'batch', '--json']) == 0
+    report, = json.loads(capsys.readouterr().out)
+    assert report["engine"] == 'batch' and report["passed"]
+    assert main(['check', '--golden', path, '--engines', 'fast_tier']) == 1
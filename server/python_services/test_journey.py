@@ -0,0 +1,34 @@
+UTTERANCES = [
+    ("Customer", "I have been waiting for two weeks and nobody helps me"),
+    ("Agent", "I am very sorry for the delay. Let me check your order"),
+    ("Customer", "This is terrible service!"),
+    ("Agent", "I have processed a full refund for you"),
+    ("Customer", "Okay thank you"),
+    ("Customer", "That is great"),
+]
+
+def transcript(utterances):
+    return "\n".join(f"{speaker}: {text}" for speaker, text in utterances)
+
+def test_known_length_matches_batch_after_every_prefix(make_analyzer):
+    analyzer = make_analyzer()
+    for end in range(1, len(UTTERANCES) + 1):
+        text = transcript(UTTERANCES[:end])
+        journey = analyzer.incremental_journey(total_sentences=len(analyzer.split_sentences(text)))
+        for speaker, utterance in UTTERANCES[:end]:
+            snapshot = journey.update(speaker, utterance)
+        assert snapshot == analyzer.analyze_emotional_journey(text)
+
+def test_finalize_rescores_provisional_positions(make_analyzer):
+    analyzer = make_analyzer()
+    journey = analyzer.incremental_journey()
+    assert journey.snapshot() == analyzer._get_default_journey()
+    for speaker, utterance in UTTERANCES:
+        journey.update(speaker, utterance)
+    assert journey.finalize() == analyzer.analyze_emotional_journey(transcript(UTTERANCES))
+
+def test_speaker_labels_detected_when_speaker_is_none(make_analyzer):
+    analyzer = make_analyzer()
+    text = transcript(UTTERANCES)
+    journey = analyzer.incremental_journey(total_sentences=len(analyzer.split_sentences(text)))
+    assert journey.update(None, text) == analyzer.analyze_emotional_journey(text)
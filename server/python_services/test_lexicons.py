@@ -0,0 +1,49 @@
+from textblob.en import sentiment as pattern_sentiment
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from lexicons import LexiconStore, compile_lexicons, load_lexicons
+from sentiment_service import MultilingualSentimentAnalyzer
+
+TEXTS = [
+    "Customer: This is not very good at all!\nAgent: I am really sorry, that is terrible",
+    "Thank you so much 😀 the refund was GREAT, kind of amazing",
+    "no problem, never mind the wait :)",
+]
+
+def test_tables_match_library_lexicons(tmp_path):
+    store = LexiconStore(compile_lexicons(str(tmp_path / "lexicons.bin")))
+    vader = SentimentIntensityAnalyzer()
+    assert dict(store.tables['vader']) == vader.lexicon
+    assert dict(store.tables['emoji']) == vader.emojis
+
+    pattern = store.pattern_sentiment()
+    len(pattern_sentiment)
+    assert len(pattern) == dict.__len__(pattern_sentiment)
+    for word, senses in dict.items(pattern_sentiment):
+        assert pattern[word] == {tag: list(psi) for tag, psi in senses.items()}
+    assert pattern.labeler == pattern_sentiment.labeler
+    assert "unknownword" not in pattern and None not in store.tables['vader']
+
+def test_scores_are_identical(tmp_path, monkeypatch):
+    store = load_lexicons(str(tmp_path / "lexicons.bin"))
+    mapped = MultilingualSentimentAnalyzer(lexicons=store)
+    monkeypatch.setenv('SENTIMENT_LEXICONS', 'off')
+    library = MultilingualSentimentAnalyzer()
+    assert library.lexicons is None
+
+    for analyzer in (mapped, library):
+        analyzer.translate_text = lambda text: (text, True)
+        analyzer.result_cache = None
+    assert mapped.fingerprint == library.fingerprint
+    for text in TEXTS:
+        assert mapped.analyze(text, timeline=True) == library.analyze(text, timeline=True)
+
+def test_stale_or_corrupt_file_is_rebuilt(tmp_path):
+    path = str(tmp_path / "lexicons.bin")
+    with open(path, 'wb') as out:
+        out.write(b'not a lexicon file')
+    store = load_lexicons(path)
+    assert store is not None and store.is_current()
+
+    store.header['sources']['vader']['size'] += 1
+    assert not store.is_current()
@@ -0,0 +1,81 @@
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Metrics, NullMetrics
+from sentiment_service import MultilingualSentimentAnalyzer, serve
+
+TEXT = "Customer: This is terrible service!\nAgent: I have processed a full refund for you"
+
+def test_timings_are_opt_in(make_analyzer):
+    analyzer = make_analyzer(metrics=Metrics())
+    plain = analyzer.analyze(TEXT)
+    timed = analyzer.analyze(TEXT, timings=True)
+
+    assert "timings" not in plain
+    assert set(timed.pop("timings")) == {'clean', 'translate', 'sentences', 'journey', 'overall', 'total'}
+    assert timed == plain
+
+def test_counters_and_histograms(make_analyzer):
+    metrics = Metrics()
+    analyzer = make_analyzer(metrics=metrics)
+    analyzer.analyze(TEXT)
+    analyzer.analyze("")
+
+    assert metrics.counters['analyses'] == 2
+    assert metrics.counters['errors'] == 1
+    assert metrics.counters['sentences_scored'] == 2
+    assert metrics.stages['total'].count == 2
+    assert metrics.stages['overall'].count == 1
+
+def test_updates_from_threads_are_not_lost():
+    metrics = Metrics()
+
+    def work(_):
+        for _ in range(5000):
+            metrics.inc('analyses')
+            metrics.observe('total', 0.001)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(work, range(4)))
+    assert metrics.counters['analyses'] == 20000
+    assert metrics.stages['total'].count == 20000
+
+def test_prometheus_text():
+    metrics = Metrics()
+    metrics.inc('analyses', 3)
+    metrics.set_gauge('startup_seconds', 0.5)
+    for seconds in (0.0005, 0.02, 20):
+        metrics.observe('total', seconds)
+
+    lines = metrics.render(labels={'pid': 7}).splitlines()
+    assert '# TYPE sentiment_analyses_total counter' in lines
+    assert 'sentiment_analyses_total{pid="7"} 3' in lines
+    assert 'sentiment_startup_seconds{pid="7"} 0.5' in lines
+    assert 'sentiment_stage_seconds_bucket{pid="7",stage="total",le="0.001"} 1' in lines
+    assert 'sentiment_stage_seconds_bucket{pid="7",stage="total",le="0.025"} 2' in lines
+    assert 'sentiment_stage_seconds_bucket{pid="7",stage="total",le="+Inf"} 3' in lines
+    assert 'sentiment_stage_seconds_count{pid="7",stage="total"} 3' in lines
+
+def test_serve_metrics_op(make_analyzer):
+    analyzer = make_analyzer(metrics=Metrics())
+    requests = [
+        {"id": 1, "text": TEXT, "timings": True},
+        {"id": 2, "op": "metrics"},
+    ]
+    stdout = io.StringIO()
+    serve(analyzer, stdin=io.StringIO("\n".join(json.dumps(r) for r in requests) + "\n"), stdout=stdout)
+    responses = [json.loads(line) for line in stdout.getvalue().splitlines()[1:]]
+
+    assert "timings" in responses[0]["result"]
+    assert "sentiment_analyses_total" in responses[1]["result"]
+    assert "sentiment_startup_seconds" in responses[1]["result"]
+
+def test_null_metrics_and_debug_off():
+    analyzer = MultilingualSentimentAnalyzer(metrics=NullMetrics(), debug=False)
+    analyzer.translation_cache = None
+    analyzer.detect_and_translate("Customer: no script to translate here")
+    analyzer.analyze("")
+
+    assert analyzer.last_debug_info == ''
+    assert analyzer.metrics.counters == {}
@@ -0,0 +1,84 @@
+import time
+
+from disk_cache import ResultCache
+from sentiment_service import MultilingualSentimentAnalyzer
+
+TEXT = "Customer: This is terrible service\nAgent: I have processed a full refund for you"
+
+class FakeStage:
+    last_errors = []
+
+    def __init__(self, translation):
+        self.translation = translation
+
+    def translate(self, items):
+        return [self.translation for _ in items]
+
+def make_analyzer(cache, translation="thank you"):
+    analyzer = MultilingualSentimentAnalyzer(result_cache=cache, translation_stage=FakeStage(translation))
+    analyzer.translation_cache = None
+    return analyzer
+
+def test_repeat_is_served_from_cache(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite3"))
+    analyzer = make_analyzer(cache)
+    first = analyzer.analyze(TEXT)
+
+    calls = []
+    analyzer.translate_text = lambda text: (calls.append(text) or text, True)
+    started = time.perf_counter()
+    second = analyzer.analyze(TEXT)
+    elapsed = time.perf_counter() - started
+
+    assert second == first and calls == []
+    assert cache.hits == 1 and cache.misses == 1
+    assert elapsed < 0.005
+    # Whitespace and punctuation that cleaning removes share the entry
+    assert analyzer.analyze(TEXT + "!!") == first
+
+def test_cache_is_shared_and_keyed_by_fingerprint(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    first = make_analyzer(ResultCache(path))
+    first.analyze(TEXT)
+
+    second = make_analyzer(ResultCache(path))
+    assert second.fingerprint == first.fingerprint
+    second.analyze(TEXT)
+    assert second.result_cache.hits == 1
+
+    second.fingerprint = "changed scoring"
+    second.analyze(TEXT)
+    assert second.result_cache.misses == 1
+
+def test_incomplete_translation_is_not_cached(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite3"))
+    analyzer = make_analyzer(cache, translation=None)
+    analyzer.analyze("धन्यवाद")
+    assert len(cache) == 0
+
+    analyzer.translation_stage = FakeStage("thank you")
+    analyzer.analyze("धन्यवाद")
+    assert len(cache) == 1
+
+def test_batch_shares_the_cache(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite3"))
+    analyzer = make_analyzer(cache)
+    expected = analyzer.analyze_batch([TEXT, "thank you"])
+    assert len(cache) == 2
+    assert [analyzer.analyze(TEXT), analyzer.analyze("thank you")] == expected
+    assert cache.hits == 2
+
+def test_timeline_requests_are_cached_per_option(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite3"))
+    analyzer = make_analyzer(cache)
+    first = analyzer.analyze(TEXT, timeline={"points": 120})
+    assert analyzer.analyze(TEXT, timeline={"points": 120}) == first
+    assert cache.hits == 1 and "timeline" in first
+
+    # Other options, or none, are separate entries
+    assert analyzer.analyze(TEXT, timeline={"points": 0})["timeline"]["count"] == 2
+    assert "timeline" not in analyzer.analyze(TEXT)
+    assert cache.hits == 1 and len(cache) == 3
+    # The batch path shares the entries
+    assert analyzer.analyze_batch([TEXT], [{"points": 120}]) == [first]
+    assert cache.hits == 2
@@ -0,0 +1,66 @@
+from sentiment_service import MultilingualSentimentAnalyzer, count_scripts, detect_script, script_spans
+
+def test_counts_every_preserved_script():
+    samples = {
+        'hi': 'धन्यवाद', 'bn': 'ধন্যবাদ', 'pa': 'ਧੰਨਵਾਦ', 'gu': 'આભાર', 'or': 'ଧନ୍ୟବାଦ',
+        'ta': 'நன்றி', 'te': 'ధన్యవాదాలు', 'kn': 'ಧನ್ಯವಾದ', 'ml': 'നന്ദി',
+    }
+    for lang, word in samples.items():
+        assert detect_script(f"Customer {word} ok") == lang
+
+def test_majority_script_wins():
+    assert count_scripts("ok ठीक ధన్యవాదాలు") == {'hi': 3, 'te': 10}
+    assert detect_script("ok ठीक ధన్యవాదాలు") == 'te'
+    assert detect_script("thank you") is None
+
+def test_routes_new_scripts_to_translation():
+    class RecordingStage:
+        last_errors = []
+        items = []
+
+        def translate(self, items):
+            RecordingStage.items = items
+            return [None] * len(items)
+
+    analyzer = MultilingualSentimentAnalyzer(translation_stage=RecordingStage())
+    analyzer.translation_cache = None
+    analyzer.detect_and_translate("நன்றி\nಧನ್ಯವಾದ\nhello")
+    assert RecordingStage.items == [('ta', 'நன்றி'), ('kn', 'ಧನ್ಯವಾದ')]
+
+def test_script_spans():
+    assert script_spans("मेरा order abhi tak deliver नहीं हुआ") == [
+        ('hi', 'मेरा'), (None, ' order abhi tak deliver '), ('hi', 'नहीं हुआ')
+    ]
+    # Digits and spaces between same-script words stay in the span
+    assert script_spans("धन्यवाद 2 बार") == [('hi', 'धन्यवाद 2 बार')]
+    assert script_spans("ok ठीक ధన్యవాదాలు") == [(None, 'ok '), ('hi', 'ठीक'), (None, ' '), ('te', 'ధన్యవాదాలు')]
+    assert script_spans("thank you") == [(None, 'thank you')]
+
+def test_only_indic_spans_are_translated(monkeypatch):
+    class DictionaryStage:
+        last_errors = []
+        items = []
+
+        def translate(self, items):
+            DictionaryStage.items = items
+            words = {'मेरा': 'my', 'नहीं हुआ': 'did not happen', 'धन्यवाद': 'thanks'}
+            return [words.get(content) for _, content in items]
+
+    text = "Customer: मेरा order abhi tak deliver नहीं हुआ\nAgent: धन्यवाद\nCustomer: मेरा refund?"
+    analyzer = MultilingualSentimentAnalyzer(translation_stage=DictionaryStage())
+    analyzer.translation_cache = None
+    translated, complete = analyzer.translate_text(text)
+    assert translated == (
+        "Customer: my order abhi tak deliver did not happen\nAgent: thanks\nCustomer: my refund?"
+    )
+    # Each distinct span is sent once per conversation
+    assert DictionaryStage.items == [('hi', 'मेरा'), ('hi', 'नहीं हुआ'), ('hi', 'धन्यवाद')]
+    assert complete
+
+    monkeypatch.setenv('SENTIMENT_SPAN_TRANSLATION', 'off')
+    whole_lines = MultilingualSentimentAnalyzer(translation_stage=DictionaryStage())
+    whole_lines.translation_cache = None
+    assert whole_lines.fingerprint != analyzer.fingerprint
+    _, complete = whole_lines.translate_text(text)
+    assert DictionaryStage.items[0] == ('hi', 'मेरा order abhi tak deliver नहीं हुआ')
+    assert not complete
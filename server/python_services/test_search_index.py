@@ -0,0 +1,114 @@
+import io
+import json
+import random
+
+import numpy as np
+import pytest
+
+import search_index
+from search_index import QueryError, SearchIndex, decode_set, document_entry, encode_set, parse_query, serve
+
+WORDS = "refund late delay cancel order deliver thanks great terrible waiting still happy".split()
+
+def make_documents(count=600, seed=0):
+    rng = random.Random(seed)
+    return [{
+        "_id": {"$oid": f"{i:024x}"},
+        "text": " ".join(rng.choice(WORDS) for _ in range(6)),
+        "sentiment": rng.choice(["slightly positive", "very negative"]),
+        "agent": {"$oid": f"{i % 3:024x}"},
+        "createdAt": {"$date": 1_700_000_000_000 + i * 1000},
+        "emotionalJourney": {"trend": {"direction": rng.choice(["declining", "improving"])}, "dominantEmotion": "neutral"}
+    } for i in range(count)]
+
+def brute_force(documents, removed, words_in, words_out=(), trend=None):
+    """Ids newest first, scanning every document"""
+    matches = []
+    for document in reversed(documents):
+        key = document["_id"]["$oid"]
+        words = document["text"].split()
+        if key in removed or not all(word in words for word in words_in) or any(word in words for word in words_out):
+            continue
+        if trend and document["emotionalJourney"]["trend"]["direction"] != trend:
+            continue
+        matches.append(key)
+    return matches
+
+def test_sets_round_trip():
+    for indices, kind in (([3, 70, 71, 999], search_index.SPARSE), (list(range(0, 1000, 3)), search_index.DENSE), ([], search_index.SPARSE)):
+        encoded_kind, data = encode_set(indices, 1000)
+        assert encoded_kind == kind
+        assert np.flatnonzero(decode_set(encoded_kind, data, 1000)).tolist() == indices
+    values = np.array([0, 127, 128, 2 ** 21, 2 ** 35], dtype=np.uint64)
+    assert search_index.decode_varints(search_index.encode_varints(values)).tolist() == values.tolist()
+
+def test_parse_query():
+    assert parse_query('refund AND (late OR delay) NOT cancel*') == ('and', [
+        ('term', 'refund'), ('or', [('term', 'late'), ('term', 'delay')]), ('not', ('prefix', 'cancel'))
+    ])
+    assert parse_query('Refund -late "still waiting"') == ('and', [
+        ('term', 'refund'), ('not', ('term', 'late')), ('and', [('term', 'still'), ('term', 'waiting')])
+    ])
+    assert parse_query('') == ('all',)
+    with pytest.raises(QueryError):
+        parse_query('(refund')
+
+def test_matches_a_full_scan_across_segments_and_reopen(tmp_path):
+    documents = make_documents()
+    index = SearchIndex(str(tmp_path), flush_docs=50, merge_factor=3)
+    for document in documents:
+        index.add(document_entry(document))
+    removed = {documents[i]["_id"]["$oid"] for i in range(0, len(documents), 7)}
+    for key in removed:
+        assert index.remove(key)
+    assert len(index.segments) > 1 and index.stats()["merges"] > 0
+
+    expected = brute_force(documents, removed, ["refund"], ["cancel"], trend="declining")
+    result = index.search('refund -cancel', facets={"trend": "declining"}, offset=5, limit=10, facet_counts=True)
+    assert result["total"] == len(expected) and result["ids"] == expected[5:15]
+    assert result["facets"]["trend"] == {"declining": len(expected)}
+    index._journal.close()  # Crash without flushing: the journal has the rest
+
+    index = SearchIndex(str(tmp_path), flush_docs=50, merge_factor=3)
+    assert index.search('refund -cancel', facets={"trend": "declining"}, offset=5, limit=10)["ids"] == expected[5:15]
+    index.optimize()
+    assert len(index.segments) == 1 and index.stats()["deleted"] == 0
+    assert index.search('refund -cancel', facets={"trend": "declining"}, limit=len(documents))["ids"] == expected
+    index.close()
+
+def test_facets_dates_and_replacement(tmp_path):
+    documents = make_documents(30)
+    index = SearchIndex(str(tmp_path), flush_docs=10)
+    for document in documents:
+        index.add(document_entry(document))
+
+    agent = f"{1:024x}"
+    result = index.search(facets={"agent": agent, "sentiment": ["very negative", "slightly positive"]}, limit=100)
+    assert result["ids"] == [document["_id"]["$oid"] for document in reversed(documents) if document["agent"]["$oid"] == agent]
+    result = index.search(created_from=1_700_000_000_000 + 20_000, limit=100)
+    assert result["total"] == 10
+
+    # Re-adding an id replaces the old version
+    replacement = dict(documents[0], text="completely different words")
+    index.add(document_entry(replacement))
+    assert index.search('completely')["ids"] == [documents[0]["_id"]["$oid"]]
+    assert index.search(facets={"agent": f"{0:024x}"})["total"] == 10
+    index.close()
+
+def test_serve(tmp_path):
+    documents = make_documents(5)
+    requests = [{"id": i, "op": "add", "document": document} for i, document in enumerate(documents)]
+    requests += [
+        {"id": 10, "op": "remove", "key": documents[0]["_id"]["$oid"]},
+        {"id": 11, "op": "search", "query": "", "limit": 10},
+        {"id": 12, "op": "search", "query": "(refund"},
+    ]
+    stdout = io.StringIO()
+    serve(SearchIndex(str(tmp_path)), stdin=io.StringIO("\n".join(json.dumps(r) for r in requests) + "\n"), stdout=stdout)
+    responses = {response.get("id"): response for response in map(json.loads, stdout.getvalue().splitlines()[1:])}
+
+    assert responses[10]["result"] == {"removed": True}
+    assert responses[11]["result"]["ids"] == [document["_id"]["$oid"] for document in reversed(documents[1:])]
+    assert responses[12]["code"] == "bad_query"
+    # Closing stdin flushed the buffered documents to a segment
+    assert SearchIndex(str(tmp_path)).stats()["segments"][0]["documents"] == 4
@@ -2,7 +2,7 @@ import json
 from sentiment_service import MultilingualSentimentAnalyzer
 
 def test_analyzer():
-    analyzer = MultilingualSentimentAnalyzer()
+    analyzer = MultilingualSentimentAnalyzer(debug=True)
     
     # Test cases with different scenarios
     test_conversations = [
@@ -0,0 +1,20 @@
+import io
+
+
+TRANSCRIPT = """Customer: I have been waiting for two weeks and nobody helps me!
+Agent: I am very sorry for the delay, let me check your order
+Customer: This is TERRIBLE service... why is it so slow??
+
+Agent: I have processed a full refund for you
+Customer: Okay thank you, that is great :)"""
+
+def test_stream_matches_whole_text_analysis(make_analyzer):
+    analyzer = make_analyzer()
+    expected = analyzer.analyze(TRANSCRIPT)
+    for chunk_lines in (1, 2, 200):
+        assert analyzer.analyze_stream(io.StringIO(TRANSCRIPT), chunk_lines=chunk_lines) == expected
+
+def test_stream_empty_inputs(make_analyzer):
+    analyzer = make_analyzer()
+    assert analyzer.analyze_stream(io.StringIO(""))["error"] == analyzer.analyze("")["error"]
+    assert analyzer.analyze_stream(io.StringIO("!!!\n...\n"))["error"] == "Text is empty after cleaning"
@@ -0,0 +1,131 @@
+import io
+import json
+import asyncio
+import time
+
+from analysis_server import AnalysisServer
+from sentiment_service import serve
+from tiers import TierPlanner
+
+TEXT = "Customer: This is terrible service\nAgent: I am sorry, let me fix that\nCustomer: Thank you, that is great"
+
+def test_planner_downgrades():
+    planner = TierPlanner(max_full_lines=10, max_fast_lines=100, fast_backlog=2, summary_backlog=4)
+    assert planner.choose('full', 5) == ('full', None)
+    assert planner.choose('full', 50) == ('fast', 'input_size')
+    assert planner.choose('full', 500) == ('summary', 'input_size')
+    assert planner.choose('full', 5, backlog=2) == ('fast', 'backlog')
+    assert planner.choose('fast', 5, backlog=4) == ('summary', 'backlog')
+    # Never upgraded
+    assert planner.choose('summary', 5) == ('summary', None)
+
+    planner.costs['full'] = 0.01
+    assert planner.choose('full', 5, deadline=1.0) == ('full', None)
+    assert planner.choose('full', 5, deadline=0.01) == ('fast', 'deadline')
+    assert planner.downgrades == {'input_size': 2, 'backlog': 2, 'deadline': 1}
+
+def test_planner_learns_costs():
+    planner = TierPlanner()
+    for _ in range(50):
+        planner.observe('full', 100, 0.1)
+    assert abs(planner.costs['full'] - 0.001) < 1e-4
+    assert abs(planner.estimate('full', 1000) - 1.0) < 0.1
+
+def test_fixed_planner_never_downgrades():
+    planner = TierPlanner.fixed()
+    assert planner.choose('full', 10 ** 6, backlog=10 ** 6) == ('full', None)
+
+def test_fast_tier_skips_translation(make_analyzer):
+    analyzer = make_analyzer()
+    calls = []
+    analyzer.translate_text = lambda text: (calls.append(text) or text, True)
+    result = analyzer.analyze(TEXT, tier='fast', timeline=True)
+
+    assert result["tier"] == 'fast' and "tier_reason" not in result
+    assert calls == []
+    assert result["timeline"]["count"] == 3
+
+def test_summary_tier(make_analyzer):
+    analyzer = make_analyzer()
+    full = analyzer.analyze(TEXT)
+    summary = analyzer.analyze(TEXT, tier='summary')
+    assert summary["tier"] == 'summary'
+    # Short texts are summarized whole
+    assert summary["score"] == full["score"]
+
+    long_text = "\n".join([TEXT] * 20)
+    summary = analyzer.analyze(long_text, tier='summary', timeline=True)
+    assert summary["timeline"]["count"] == 2 * analyzer.summary_sentences
+
+def test_downgrade_is_reported(make_analyzer):
+    analyzer = make_analyzer()
+    analyzer.planner = TierPlanner(max_full_lines=1)
+    result = analyzer.analyze(TEXT)
+    assert result["tier"] == 'fast'
+    assert result["tier_requested"] == 'full' and result["tier_reason"] == 'input_size'
+
+def test_serve_rejects_expired_deadline(make_analyzer):
+    requests = [
+        {"id": 1, "text": TEXT, "deadline_ms": 0},
+        {"id": 2, "text": TEXT, "deadline_ms": 60000},
+        {"id": 3, "text": TEXT, "tier": "premium"},
+    ]
+    analyzer = make_analyzer()
+    analyzer.translate_text = lambda text, deadline=None: (text, True)
+    stdout = io.StringIO()
+    serve(analyzer, stdin=io.StringIO("\n".join(json.dumps(r) for r in requests) + "\n"), stdout=stdout)
+    responses = [json.loads(line) for line in stdout.getvalue().splitlines()[1:]]
+
+    assert responses[0]["code"] == 'deadline_exceeded'
+    assert responses[1]["result"]["tier"] == 'full'
+    # A bad option is a result with an error, which the route answers with 400
+    assert responses[2]["result"]["error"] == 'Unknown tier: premium'
+
+def test_server_sheds_load(tmp_path, make_analyzer):
+    path = str(tmp_path / "analysis.sock")
+
+    async def scenario():
+        server = AnalysisServer(make_analyzer(), max_batch=4, max_wait=0.05, max_queue=4)
+        listener = await server.start(path=path)
+        try:
+            reader, writer = await asyncio.open_unix_connection(path)
+            for i in range(8):
+                writer.write((json.dumps({"id": i, "text": TEXT}) + "\n").encode('utf-8'))
+            await writer.drain()
+            responses = [json.loads(await reader.readline()) for _ in range(8)]
+            writer.close()
+            stats = server.stats()["batching"]
+        finally:
+            listener.close()
+            await server.close()
+        return responses, stats
+
+    responses, stats = asyncio.run(scenario())
+    overloaded = [r for r in responses if r.get("code") == 'overloaded']
+    assert len(overloaded) == 4 and stats["rejected"] == 4
+    assert sum("result" in r for r in responses) == 4
+
+def test_summary_tier_approximates_full(make_analyzer):
+    analyzer = make_analyzer()
+    long_text = "\n".join([TEXT] * 20)
+    full = analyzer.analyze(long_text)["emotional_journey"]
+    summary = analyzer.analyze(long_text, tier='summary')["emotional_journey"]
+    for end in ('start', 'end'):
+        assert abs(summary[end]["score"] - full[end]["score"]) < 0.05
+        assert summary[end]["state"] == full[end]["state"]
+
+def test_summary_fallback_shares_the_budget(make_analyzer):
+    analyzer = make_analyzer()
+    budgets = []
+
+    def translate(text, deadline=None):
+        budgets.append(deadline)
+        time.sleep(0.01)
+        # Merging the lines forces the per-sentence fallback
+        return text.replace('\n', ' '), True
+
+    analyzer.translate_text = translate
+    english, positions, total, complete = analyzer._summary_sentences("\n".join([TEXT] * 20), 1.0)
+    assert len(english) == len(positions) == 2 * analyzer.summary_sentences and complete
+    assert budgets[0] == 1.0
+    assert all(later < earlier for earlier, later in zip(budgets, budgets[1:]))
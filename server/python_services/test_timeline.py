@@ -0,0 +1,60 @@
+import numpy as np
+
+from sentiment_service import EMOTIONAL_STATES
+from timeline import SPEAKERS, build_timeline, lttb_indices, minmax_indices, unpack_timeline
+
+LINES = [
+    "Customer: I have been waiting for two weeks and nobody helps me",
+    "Agent: I am very sorry for the delay",
+    "Customer: This is terrible service",
+    "Agent: I have processed a full refund for you",
+    "Customer: Okay thank you that is great",
+]
+
+def test_full_timeline_matches_journey(make_analyzer):
+    analyzer = make_analyzer()
+    text = "\n".join(LINES)
+    result = analyzer.analyze(text, timeline={"points": 0})
+    timeline = unpack_timeline(result.pop("timeline"))
+
+    assert result == analyzer.analyze(text)
+    assert list(timeline["index"]) == list(range(len(LINES)))
+    assert [SPEAKERS[code] for code in timeline["speaker"]] == [line.split(":")[0] for line in LINES]
+    journey = result["emotional_journey"]
+    assert round(float(timeline["score"].min()), 3) == journey["emotional_range"]["min"]
+    assert round(float(timeline["score"].max()), 3) == journey["emotional_range"]["max"]
+    assert all(0 <= code < len(EMOTIONAL_STATES) for code in timeline["state"])
+
+def test_payload_size_is_bounded(make_analyzer):
+    analyzer = make_analyzer()
+    short = analyzer.analyze("\n".join(LINES * 40), timeline=50)["timeline"]
+    long = analyzer.analyze("\n".join(LINES * 400), timeline=50)["timeline"]
+
+    assert short["count"] == 200 and long["count"] == 2000
+    assert short["points"] == long["points"] == 50
+    assert len(short["score"]) == len(long["score"])
+
+def test_downsamplers_keep_extremes():
+    values = np.sin(np.linspace(0, 20, 5000))
+    values[1234] = 3.0
+
+    lttb = lttb_indices(values, 40)
+    assert len(lttb) == 40 and lttb[0] == 0 and lttb[-1] == 4999
+    assert np.all(np.diff(lttb) > 0)
+    assert 1234 in lttb
+
+    minmax = minmax_indices(values, 40)
+    assert len(minmax) <= 40 and np.all(np.diff(minmax) > 0)
+    assert 1234 in minmax
+    assert values[minmax].min() == values.min()
+
+def test_packed_round_trip():
+    speakers = ['Customer', 'Agent', 'Agent', 'Customer']
+    packed = build_timeline([-0.5, 0.25, 0.0, 0.9], speakers, [2, 6, 9, 8])
+    timeline = unpack_timeline(packed)
+
+    assert packed["count"] == packed["points"] == 4 and packed["method"] is None
+    assert [SPEAKERS[code] for code in timeline["speaker"]] == speakers
+    assert list(timeline["state"]) == [2, 6, 9, 8]
+    assert timeline["score"].dtype == np.float32
+    assert np.allclose(timeline["score"], [-0.5, 0.25, 0.0, 0.9])
@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from translation import (
+    BACKENDS, ChainBackend, CircuitBreaker, MyMemoryBackend, MyMemoryClient, PhraseTableBackend,
+    TranslationStage, _split_line, get_backend,
+)
+
+class FakeMyMemory(BaseHTTPRequestHandler):
+    """Local stand-in for the MyMemory API: upper-cases every line"""
+    mode = "ok"
+    queries = []
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        query = params["q"][0]
+        FakeMyMemory.queries.append((params["langpair"][0], query))
+
+        if FakeMyMemory.mode == "slow":
+            time.sleep(1.0)
+        if FakeMyMemory.mode == "down" or (FakeMyMemory.mode == "single" and "\n" in query):
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        translated = "\n".join(f"EN {line}" for line in query.split("\n"))
+        if FakeMyMemory.mode == "quota":
+            translated = "MYMEMORY WARNING: YOU USED ALL AVAILABLE FREE TRANSLATIONS FOR TODAY"
+        body = json.dumps({"responseData": {"translatedText": translated}, "responseStatus": 200}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    FakeMyMemory.mode = "ok"
+    FakeMyMemory.queries = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeMyMemory)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/get"
+    httpd.shutdown()
+
+def make_stage(url, breaker=None, **kwargs):
+    return TranslationStage(MyMemoryBackend(MyMemoryClient(base_url=url), breaker=breaker), **kwargs)
+
+def test_lines_are_deduplicated_and_coalesced_per_language(server):
+    stage = make_stage(server)
+    items = [("hi", "धन्यवाद"), ("te", "సరే"), ("hi", "ठीक है"), ("hi", "धन्यवाद")]
+    assert stage.translate(items) == ["EN धन्यवाद", "EN సరే", "EN ठीक है", "EN धन्यवाद"]
+    assert sorted(FakeMyMemory.queries) == [("hi|en", "धन्यवाद\nठीक है"), ("te|en", "సరే")]
+
+def test_chunks_are_measured_in_bytes(server):
+    stage = make_stage(server)
+    lines = [f"धन्यवाद {i:02d}" for i in range(40)]  # 24 bytes, 10 characters
+    assert stage.translate([("hi", line) for line in lines]) == [f"EN {line}" for line in lines]
+    assert len(FakeMyMemory.queries) == 3
+    assert all(len(query.encode('utf-8')) <= 450 for _, query in FakeMyMemory.queries)
+
+def test_oversize_lines_are_translated_in_pieces(server):
+    stage = make_stage(server)
+    line = " ".join(f"धन्यवाद {i}" for i in range(50))  # 1239 bytes
+    assert stage.translate([("hi", line)]) == [" ".join(f"EN {piece}" for piece in _split_line(line, 450))]
+    assert len(FakeMyMemory.queries) == 3
+    assert all(len(query.encode('utf-8')) <= 450 for _, query in FakeMyMemory.queries)
+
+def test_caller_deadline_cannot_extend_the_stage_deadline(server):
+    FakeMyMemory.mode = "slow"
+    stage = make_stage(server, request_timeout=5, deadline=0.2)
+    started = time.monotonic()
+    assert stage.translate([("hi", "धन्यवाद")], deadline=10) == [None]
+    assert time.monotonic() - started < 0.9
+
+def test_deadline_returns_untranslated_lines(server):
+    FakeMyMemory.mode = "slow"
+    stage = make_stage(server, request_timeout=5, deadline=0.2)
+    started = time.monotonic()
+    assert stage.translate([("hi", "धन्यवाद")]) == [None]
+    assert time.monotonic() - started < 0.9
+    assert "deadline" in stage.last_errors[0]
+
+def test_failed_chunk_is_retried_per_line_until_the_deadline(server):
+    FakeMyMemory.mode = "single"
+    backend = MyMemoryBackend(MyMemoryClient(base_url=server))
+    results = backend.translate_many("hi", ["धन्यवाद", "ठीक है"], timeout=5, deadline=time.monotonic() + 5)
+    assert [result.text for result in results] == ["EN धन्यवाद", "EN ठीक है"]
+    assert len(FakeMyMemory.queries) == 3
+
+    # Past the deadline no further requests start
+    FakeMyMemory.mode = "slow"
+    FakeMyMemory.queries = []
+    started = time.monotonic()
+    results = backend.translate_many("hi", ["धन्यवाद", "ठीक है", "सरे"], timeout=5, deadline=started + 0.3)
+    assert all(result.text is None for result in results)
+    assert time.monotonic() - started < 0.9 and len(FakeMyMemory.queries) == 1
+
+def test_circuit_opens_after_failures(server):
+    FakeMyMemory.mode = "down"
+    stage = make_stage(server, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    for _ in range(4):
+        assert stage.translate([("hi", "धन्यवाद")]) == [None]
+    assert len(FakeMyMemory.queries) == 2
+    assert stage.backend.breaker.state == "open"
+
+def test_quota_warning_trips_circuit(server):
+    FakeMyMemory.mode = "quota"
+    stage = make_stage(server)
+    assert stage.translate([("ml", "വളരെ നന്ദി")]) == [None]
+    assert stage.backend.breaker.state == "open"
+
+def test_half_open_trial_closes_circuit():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert not breaker.allow()
+    now[0] = 10.0
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+def test_phrase_table_matches_longest_phrases():
+    backend = PhraseTableBackend({"hi": {"ठीक है": "okay", "धन्यवाद": "thank you", "बहुत धन्यवाद": "thank you very much"}})
+    results = backend.translate_many("hi", ["ठीक है, बहुत धन्यवाद।", "बटन टूट गया"])
+    assert results[0].text == "okay thank you very much."
+    assert results[1].text is None and results[1].error
+    # Sentence boundaries survive, as they do through the web backends
+    assert backend.lookup("hi", "ठीक है। धन्यवाद।") == "okay. thank you."
+    assert backend.lookup("hi", "ठीक है धन्यवाद") == "okay thank you"
+
+def test_chain_sends_only_misses_to_the_web_backend(server):
+    phrases = PhraseTableBackend({"hi": {"धन्यवाद": "thank you"}})
+    stage = TranslationStage(ChainBackend([phrases, MyMemoryBackend(MyMemoryClient(base_url=server))]))
+    assert stage.translate([("hi", "धन्यवाद"), ("hi", "बटन टूट गया")]) == ["thank you", "EN बटन टूट गया"]
+    assert FakeMyMemory.queries == [("hi|en", "बटन टूट गया")]
+
+def test_registry_builds_backends_by_name():
+    assert {"mymemory", "phrase_table", "translate"} <= set(BACKENDS)
+    assert isinstance(get_backend("phrase_table"), PhraseTableBackend)
+    assert get_backend("phrase_table,mymemory").name == "phrase_table,mymemory"
+    with pytest.raises(ValueError):
+        get_backend("nope")
@@ -0,0 +1,47 @@
+from disk_cache import SQLiteCache, TranslationCache
+from sentiment_service import MultilingualSentimentAnalyzer
+
+def test_cache_survives_reopen_and_normalizes_keys(tmp_path):
+    path = str(tmp_path / "translations.sqlite3")
+    cache = TranslationCache(path)
+    cache.set_translation("hi", "धन्यवाद", "Thank you")
+    cache.close()
+
+    reopened = TranslationCache(path)
+    assert reopened.get_translation("hi", "  धन्यवाद ") == "Thank you"
+    assert reopened.get_translation("te", "धन्यवाद") is None
+    stats = reopened.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+def test_lru_eviction_and_ttl(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "lru.sqlite3"), max_entries=3)
+    cache.EVICT_EVERY = 1
+    for i in range(3):
+        cache.set(f"k{i}", str(i))
+    cache._conn.execute("UPDATE cache SET accessed = accessed - 1000 WHERE key = 'k0'")
+    cache.set("k3", "3")
+    assert cache.get("k0") is None
+    assert cache.get("k3") == "3"
+
+    cache.ttl_seconds = 10
+    cache._conn.execute("UPDATE cache SET created = created - 100 WHERE key = 'k3'")
+    assert cache.get("k3") is None
+
+def test_analyzer_translates_each_line_once(tmp_path):
+    rounds = []
+
+    class FakeStage:
+        last_errors = []
+
+        def translate(self, items):
+            rounds.append(items)
+            return ["thank you" for _ in items]
+
+    cache = TranslationCache(str(tmp_path / "translations.sqlite3"))
+    text = "धन्यवाद\nधन्यवाद"
+
+    first = MultilingualSentimentAnalyzer(translation_cache=cache, translation_stage=FakeStage())
+    assert first.detect_and_translate(text) == "thank you\nthank you"
+    second = MultilingualSentimentAnalyzer(translation_cache=cache, translation_stage=FakeStage())
+    assert second.detect_and_translate(text) == "thank you\nthank you"
+    assert len(rounds) == 1
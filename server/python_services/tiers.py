@@ -0,0 +1,79 @@
+import os
+import math
+
+# Quality tiers, most to least expensive:
+#   full    - translation, per-sentence VADER and TextBlob, whole-text scores
+#   fast    - no translation, VADER only
+#   summary - full treatment of only the first and last sentences
+TIERS = ('full', 'fast', 'summary')
+
+class TierPlanner:
+    """
+    Picks the tier a request actually gets. A request is never upgraded;
+    it is downgraded when the input is huge, when the worker has a backlog,
+    or when the cost estimate for its tier would overrun its deadline.
+    Costs are learned as a moving average of observed seconds per line
+    (per request for summary, whose cost does not grow with the input).
+    In the analysis server choose() runs on the I/O thread and observe()
+    on the CPU thread; each writes only its own dict, so no lock is needed.
+    """
+    ALPHA = 0.2
+
+    def __init__(self, max_full_lines=2000, max_fast_lines=20000, fast_backlog=8, summary_backlog=32):
+        self.max_full_lines = max_full_lines
+        self.max_fast_lines = max_fast_lines
+        self.fast_backlog = fast_backlog
+        self.summary_backlog = summary_backlog
+        # Conservative starting points until real timings come in
+        self.costs = {'full': 0.005, 'fast': 0.0002, 'summary': 0.05}
+        self.downgrades = {}
+
+    def estimate(self, tier, lines):
+        return self.costs[tier] if tier == 'summary' else self.costs[tier] * lines
+
+    def observe(self, tier, lines, seconds):
+        sample = seconds if tier == 'summary' else seconds / max(lines, 1)
+        self.costs[tier] += self.ALPHA * (sample - self.costs[tier])
+
+    def choose(self, requested, lines, deadline=None, backlog=0):
+        """Return (tier, reason); reason is None unless the request was downgraded"""
+        if requested not in TIERS:
+            raise ValueError(f"Unknown tier: {requested}")
+        tier, reason = requested, None
+
+        def lower(to, why):
+            nonlocal tier, reason
+            if TIERS.index(to) > TIERS.index(tier):
+                tier, reason = to, why
+
+        if lines > self.max_fast_lines:
+            lower('summary', 'input_size')
+        elif lines > self.max_full_lines:
+            lower('fast', 'input_size')
+
+        if backlog >= self.summary_backlog:
+            lower('summary', 'backlog')
+        elif backlog >= self.fast_backlog:
+            lower('fast', 'backlog')
+
+        if deadline is not None:
+            while tier != TIERS[-1] and self.estimate(tier, lines) > deadline:
+                lower(TIERS[TIERS.index(tier) + 1], 'deadline')
+
+        if reason is not None:
+            self.downgrades[reason] = self.downgrades.get(reason, 0) + 1
+        return tier, reason
+
+    @classmethod
+    def fixed(cls):
+        """A planner that never downgrades, for offline runs that must get the tier they ask for"""
+        return cls(max_full_lines=math.inf, max_fast_lines=math.inf, fast_backlog=math.inf, summary_backlog=math.inf)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_full_lines=int(os.environ.get('SENTIMENT_MAX_FULL_LINES', 2000)),
+            max_fast_lines=int(os.environ.get('SENTIMENT_MAX_FAST_LINES', 20000)),
+            fast_backlog=int(os.environ.get('SENTIMENT_FAST_BACKLOG', 8)),
+            summary_backlog=int(os.environ.get('SENTIMENT_SUMMARY_BACKLOG', 32))
+        )
@@ -0,0 +1,129 @@
+import base64
+import numpy as np
+
+# Speaker codes used in the packed "speaker" array
+SPEAKERS = ('Customer', 'Agent')
+DEFAULT_POINTS = 200
+
+def lttb_indices(values, points):
+    """
+    Largest-Triangle-Three-Buckets: indices of `points` samples that keep
+    the visual shape of the series. The first and last samples are always
+    kept; each bucket in between contributes the sample that forms the
+    largest triangle with the previous pick and the next bucket's mean.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    points = max(int(points), 3)
+    if n <= points:
+        return np.arange(n)
+
+    every = (n - 2) / (points - 2)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    previous = 0
+    for i in range(points - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = (end + next_end - 1) / 2
+        avg_y = values[end:next_end].mean()
+
+        x = np.arange(start, end)
+        area = np.abs(
+            (previous - avg_x) * (values[start:end] - values[previous])
+            - (previous - x) * (avg_y - values[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    selected[-1] = n - 1
+    return selected
+
+def minmax_indices(values, points):
+    """
+    Bucketed min/max: split the series into points // 2 equal buckets and
+    keep each bucket's lowest and highest sample, so no spike is lost.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    points = max(int(points), 2)
+    if n <= points:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, points // 2 + 1).astype(np.int64)
+    selected = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        bucket = values[start:end]
+        selected.append(start + int(np.argmin(bucket)))
+        selected.append(start + int(np.argmax(bucket)))
+    return np.unique(selected)
+
+DOWNSAMPLERS = {
+    'lttb': lttb_indices,
+    'minmax': minmax_indices
+}
+
+def timeline_options(value):
+    """
+    Normalize a request's timeline option: falsy means no timeline, True
+    the defaults, an int a point budget, and a dict {"points", "method"}.
+    Returns build_timeline keyword arguments, or None.
+    """
+    if not value:
+        return None
+    if value is True:
+        return {}
+    if isinstance(value, int):
+        return {"points": value}
+    if isinstance(value, dict):
+        options = {}
+        if "points" in value:
+            options["points"] = int(value["points"])
+        if "method" in value:
+            options["method"] = value["method"]
+        return options
+    raise ValueError(f"Invalid timeline option: {value!r}")
+
+def _pack(array):
+    return base64.b64encode(array.tobytes()).decode('ascii')
+
+def build_timeline(scores, speakers, states, points=DEFAULT_POINTS, method='lttb'):
+    """
+    Pack a per-sentence timeline into base64 little-endian arrays:
+    "index" (uint32 sentence positions), "score" (float32), "speaker" and
+    "state" (int8 codes into SPEAKERS and EMOTIONAL_STATES). Series longer
+    than points are downsampled with method ("lttb" or "minmax"); a
+    points of 0 keeps every sentence.
+    """
+    if method not in DOWNSAMPLERS:
+        raise ValueError(f"Unknown timeline method: {method}")
+
+    scores = np.asarray(scores, dtype=float)
+    count = len(scores)
+    if points and count > points:
+        index = DOWNSAMPLERS[method](scores, points)
+    else:
+        index = np.arange(count)
+        method = None
+
+    speaker_codes = np.array([SPEAKERS.index(speaker) for speaker in speakers], dtype=np.int8)
+    return {
+        "count": count,
+        "points": len(index),
+        "method": method,
+        "index": _pack(index.astype('<u4')),
+        "score": _pack(scores[index].astype('<f4')),
+        "speaker": _pack(speaker_codes[index]),
+        "state": _pack(np.asarray(states, dtype=np.int8)[index])
+    }
+
+def unpack_timeline(timeline):
+    """Decode build_timeline's output back into NumPy arrays"""
+    def unpack(key, dtype):
+        return np.frombuffer(base64.b64decode(timeline[key]), dtype=dtype)
+    return {
+        "index": unpack("index", '<u4'),
+        "score": unpack("score", '<f4'),
+        "speaker": unpack("speaker", np.int8),
+        "state": unpack("state", np.int8)
+    }
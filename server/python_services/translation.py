@@ -0,0 +1,538 @@
+import os
+import re
+import json
+import time
+import threading
+import unicodedata
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+MYMEMORY_URL = 'https://api.mymemory.translated.net/get'
+# MyMemory rejects queries longer than 500 bytes of UTF-8
+MAX_CHUNK_BYTES = 450
+
+class TranslationError(Exception):
+    pass
+
+class QuotaExceededError(TranslationError):
+    pass
+
+class CircuitOpenError(TranslationError):
+    pass
+
+class CircuitBreaker:
+    """
+    Stops calling a failing backend. After failure_threshold consecutive
+    failures the circuit opens and calls are refused for reset_timeout
+    seconds; then a single trial call is let through (half-open) and its
+    outcome closes or re-opens the circuit.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+
+    def trip(self):
+        """Open immediately, e.g. when the backend reports its quota is used up"""
+        with self._lock:
+            self.failures = max(self.failures, self.failure_threshold)
+            self.opened_at = self.clock()
+            self._trial_in_flight = False
+
+class TranslationResult(namedtuple('TranslationResult', ['text', 'error'])):
+    """Outcome for one line: text is the English translation, or None with an error message"""
+    __slots__ = ()
+
+    @classmethod
+    def ok(cls, text):
+        return cls(text, None)
+
+    @classmethod
+    def failed(cls, error):
+        return cls(None, str(error))
+
+def _remaining(timeout, deadline):
+    """The timeout for a request starting now, shortened to end by the deadline"""
+    if deadline is None:
+        return timeout
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TranslationError("Translation deadline exceeded")
+    return remaining if timeout is None else min(timeout, remaining)
+
+def _split_line(text, limit):
+    """
+    Pieces of text of at most limit bytes of UTF-8, cut after whitespace
+    where possible. A text within the limit is its own single piece.
+    """
+    if len(text.encode('utf-8')) <= limit:
+        return [text]
+    pieces = []
+    start, size, cut = 0, 0, None
+    for i, char in enumerate(text):
+        width = len(char.encode('utf-8'))
+        if size + width > limit:
+            end = cut if cut is not None else i
+            pieces.append(text[start:end].strip())
+            start, cut = end, None
+            size = len(text[start:i].encode('utf-8'))
+        size += width
+        if char.isspace():
+            cut = i + 1
+    pieces.append(text[start:].strip())
+    return [piece for piece in pieces if piece]
+
+class TranslationBackend:
+    """
+    Interface for translation backends. translate_many() translates a list
+    of lines from one source language to English and returns one
+    TranslationResult per line, in order. A backend should report per-line
+    failures in the results rather than raise. timeout bounds one request;
+    deadline, a time.monotonic() value, is when the caller stops waiting,
+    so no request should start after it.
+    """
+    name = ''
+    # Largest request the backend accepts, in UTF-8 bytes; None for no limit
+    max_chunk_bytes = None
+    # In-process backends are called directly instead of on the thread pool
+    local = False
+
+    def translate_many(self, lang, lines, timeout=None, deadline=None):
+        raise NotImplementedError
+
+    def stats(self):
+        return {"backend": self.name}
+
+BACKENDS = {}
+
+def register_backend(name):
+    """Class decorator adding a backend to the registry under the given name"""
+    def decorator(cls):
+        cls.name = name
+        BACKENDS[name] = cls
+        return cls
+    return decorator
+
+def get_backend(spec=None):
+    """
+    Build the backend named by spec, or by SENTIMENT_TRANSLATOR when spec is
+    None. A comma-separated list ("phrase_table,mymemory") builds a chain
+    that tries each backend in turn for the lines the previous one missed.
+    """
+    spec = spec or os.environ.get('SENTIMENT_TRANSLATOR', 'mymemory')
+    names = [name.strip() for name in spec.split(',') if name.strip()]
+    for name in names:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown translation backend: {name}. Available: {sorted(BACKENDS)}")
+    if len(names) == 1:
+        return BACKENDS[names[0]].from_env()
+    return ChainBackend([BACKENDS[name].from_env() for name in names])
+
+class MyMemoryClient:
+    """Minimal MyMemory API client with a per-request timeout"""
+
+    def __init__(self, base_url=MYMEMORY_URL, email=None, to_lang='en'):
+        self.base_url = base_url
+        self.email = email
+        self.to_lang = to_lang
+        self._local = threading.local()
+
+    def _session(self):
+        # requests.Session is not thread-safe; keep one per pool thread
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests  # Deferred: English-only traffic never needs it
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def translate(self, lang, text, timeout):
+        params = {'q': text, 'langpair': f'{lang}|{self.to_lang}'}
+        if self.email:
+            params['de'] = self.email
+
+        response = self._session().get(self.base_url, params=params, timeout=timeout)
+        if response.status_code == 429:
+            raise QuotaExceededError(response.text[:200])
+        response.raise_for_status()
+
+        data = response.json()
+        translated = (data.get('responseData') or {}).get('translatedText') or ''
+        if translated.startswith('MYMEMORY WARNING'):
+            raise QuotaExceededError(translated)
+        if data.get('responseStatus') not in (200, '200'):
+            raise TranslationError(translated or f"MyMemory status {data.get('responseStatus')}")
+        return translated
+
+@register_backend('mymemory')
+class MyMemoryBackend(TranslationBackend):
+    """
+    MyMemory web API. A chunk of lines goes out as one newline-joined
+    request; if it fails or the line breaks don't survive, the chunk is
+    retried one line per request until the deadline. A circuit breaker
+    stops calls while the API is failing.
+    """
+    max_chunk_bytes = MAX_CHUNK_BYTES
+
+    def __init__(self, client=None, breaker=None):
+        self.client = client or MyMemoryClient()
+        self.breaker = breaker or CircuitBreaker()
+        self.requests_made = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(MyMemoryClient(
+            base_url=os.environ.get('MYMEMORY_URL', MYMEMORY_URL),
+            email=os.environ.get('MYMEMORY_EMAIL')
+        ))
+
+    def _call(self, lang, text, timeout):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Translation circuit open, skipping {lang}")
+        self.requests_made += 1
+        try:
+            translated = self.client.translate(lang, text, timeout)
+        except QuotaExceededError:
+            self.breaker.trip()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return translated
+
+    def translate_many(self, lang, lines, timeout=None, deadline=None):
+        if len(lines) > 1:
+            try:
+                parts = self._call(lang, '\n'.join(lines), _remaining(timeout, deadline)).split('\n')
+                if len(parts) == len(lines):
+                    return [TranslationResult.ok(part.strip()) for part in parts]
+            except CircuitOpenError as e:
+                return [TranslationResult.failed(e) for _ in lines]
+            except Exception:
+                pass  # Retried line by line; a lone line may still go through
+
+        results = []
+        for line in lines:
+            try:
+                results.append(TranslationResult.ok(self._call(lang, line, _remaining(timeout, deadline))))
+            except Exception as e:
+                results.append(TranslationResult.failed(e))
+        return results
+
+    def stats(self):
+        return {"backend": self.name, "requests": self.requests_made, "circuit": self.breaker.state}
+
+@register_backend('translate')
+class TranslatePackageBackend(TranslationBackend):
+    """
+    The translate package's Translator, for its other providers
+    (SENTIMENT_TRANSLATE_PROVIDER=deepl, microsoft, libre, ...). It has no
+    request timeout of its own, so the stage deadline is the only bound.
+    """
+    max_chunk_bytes = MAX_CHUNK_BYTES
+
+    def __init__(self, provider=None, secret_access_key=None):
+        self.provider = provider
+        self.secret_access_key = secret_access_key
+        self._translators = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            provider=os.environ.get('SENTIMENT_TRANSLATE_PROVIDER'),
+            secret_access_key=os.environ.get('SENTIMENT_TRANSLATE_KEY')
+        )
+
+    def _translator(self, lang):
+        with self._lock:
+            translator = self._translators.get(lang)
+            if translator is None:
+                from translate import Translator
+                translator = Translator(
+                    to_lang='en', from_lang=lang,
+                    provider=self.provider, secret_access_key=self.secret_access_key
+                )
+                self._translators[lang] = translator
+            return translator
+
+    def translate_many(self, lang, lines, timeout=None, deadline=None):
+        results = []
+        for line in lines:
+            try:
+                _remaining(timeout, deadline)
+                translated = self._translator(lang).translate(line)
+                if not translated or translated.startswith('MYMEMORY WARNING'):
+                    raise TranslationError(translated or 'Empty translation')
+                results.append(TranslationResult.ok(translated))
+            except Exception as e:
+                results.append(TranslationResult.failed(e))
+        return results
+
+# Sentence terminators, and the English punctuation the dandas become
+_TERMINATORS = re.compile(r'([.!?\u0964\u0965]+)')
+_TERMINATOR_ENGLISH = {'\u0964': '.', '\u0965': '.'}
+
+@register_backend('phrase_table')
+class PhraseTableBackend(TranslationBackend):
+    """
+    Offline backend backed by a JSON phrase table of the form
+    {"hi": {"धन्यवाद": "thank you", ...}, "te": {...}}. A line is translated
+    by greedy longest-phrase matching over its words; lines with any
+    non-ASCII word the table doesn't cover are reported as misses.
+    """
+    local = True
+    DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'phrase_table.json')
+    # Sentence punctuation that is not part of a phrase
+    STRIP_CHARS = ' \t.,!?;:"\'()\u0964\u0965'
+
+    def __init__(self, table=None, path=None):
+        if table is None:
+            with open(path or self.DEFAULT_PATH, encoding='utf-8') as f:
+                table = json.load(f)
+        self.table = {}
+        self.max_words = 1
+        for lang, phrases in table.items():
+            entries = self.table.setdefault(lang, {})
+            for phrase, english in phrases.items():
+                words = tuple(self._words(phrase))
+                if words:
+                    entries[words] = english
+                    self.max_words = max(self.max_words, len(words))
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(path=os.environ.get('SENTIMENT_PHRASE_TABLE'))
+
+    def _words(self, text):
+        text = unicodedata.normalize('NFC', text)
+        return [word for word in (w.strip(self.STRIP_CHARS) for w in text.split()) if word]
+
+    def lookup(self, lang, line):
+        phrases = self.table.get(lang)
+        if not phrases:
+            return None
+
+        # Phrases never span a sentence boundary, and each boundary is
+        # re-emitted so the English splits into the same sentences
+        sentences = []
+        parts = _TERMINATORS.split(unicodedata.normalize('NFC', line))
+        for text, terminator in zip(parts[::2], parts[1::2] + ['']):
+            words = self._words(text)
+            if not words:
+                continue
+            english = self._match(phrases, words)
+            if english is None:
+                return None
+            sentences.append(english + _TERMINATOR_ENGLISH.get(terminator[:1], terminator[:1]))
+        return ' '.join(sentences) or None
+
+    def _match(self, phrases, words):
+        """Greedy longest-phrase translation of one sentence's words, or None"""
+        output = []
+        i = 0
+        while i < len(words):
+            for size in range(min(self.max_words, len(words) - i), 0, -1):
+                english = phrases.get(tuple(words[i:i + size]))
+                if english is not None:
+                    output.append(english)
+                    i += size
+                    break
+            else:
+                # Latin-script words (speaker labels, English in code-mixed
+                # lines) are already English and pass through unchanged
+                if not words[i].isascii():
+                    return None
+                output.append(words[i])
+                i += 1
+        return ' '.join(output)
+
+    def translate_many(self, lang, lines, timeout=None, deadline=None):
+        results = []
+        for line in lines:
+            english = self.lookup(lang, line)
+            if english is None:
+                self.misses += 1
+                results.append(TranslationResult.failed(f"No phrase table entry for {lang} line"))
+            else:
+                self.hits += 1
+                results.append(TranslationResult.ok(english))
+        return results
+
+    def stats(self):
+        return {"backend": self.name, "hits": self.hits, "misses": self.misses}
+
+class ChainBackend(TranslationBackend):
+    """Tries each backend in order, passing along only the lines still untranslated"""
+
+    def __init__(self, backends):
+        self.backends = backends
+        self.name = ','.join(backend.name for backend in backends)
+        self.local = all(backend.local for backend in backends)
+        limits = [backend.max_chunk_bytes for backend in backends if backend.max_chunk_bytes]
+        self.max_chunk_bytes = min(limits) if limits else None
+
+    def translate_many(self, lang, lines, timeout=None, deadline=None):
+        results = [None] * len(lines)
+        remaining = list(range(len(lines)))
+        for backend in self.backends:
+            if not remaining:
+                break
+            for i, result in zip(remaining, backend.translate_many(lang, [lines[i] for i in remaining], timeout, deadline)):
+                results[i] = result
+            remaining = [i for i in remaining if results[i].text is None]
+        return results
+
+    def stats(self):
+        return {"backend": self.name, "chain": [backend.stats() for backend in self.backends]}
+
+class TranslationStage:
+    """
+    Translates the non-English lines of a conversation in as few backend
+    calls as possible. Lines are deduplicated and packed per language into
+    chunks no larger than the backend accepts; chunks run concurrently on a
+    bounded thread pool under a per-request timeout and an overall deadline.
+    Lines that fail or miss the deadline come back as None so the caller
+    keeps the original text.
+    """
+    def __init__(self, backend, max_workers=4, request_timeout=5.0, deadline=15.0):
+        self.backend = backend
+        self.request_timeout = request_timeout
+        self.deadline = deadline
+        self.last_errors = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='translate')
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            get_backend(),
+            max_workers=int(os.environ.get('SENTIMENT_TRANSLATION_WORKERS', 4)),
+            request_timeout=float(os.environ.get('SENTIMENT_TRANSLATION_TIMEOUT', 5)),
+            deadline=float(os.environ.get('SENTIMENT_TRANSLATION_DEADLINE', 15))
+        )
+
+    def _chunks(self, lines):
+        limit = self.backend.max_chunk_bytes
+        if not limit:
+            yield lines
+            return
+        chunk, size = [], 0
+        for line in lines:
+            # Indic scripts take three bytes a character
+            length = len(line.encode('utf-8'))
+            if chunk and size + length + 1 > limit:
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(line)
+            size += length + 1
+        if chunk:
+            yield chunk
+
+    def translate(self, items, deadline=None):
+        """
+        Translate a list of (lang, text) pairs. Returns a list of the same
+        length holding the English text, or None where translation failed.
+        deadline (seconds) can only shorten the stage's own. A line longer
+        than the backend accepts is translated in pieces.
+        """
+        self.last_errors = []
+        started = time.monotonic()
+        deadline = self.deadline if deadline is None else min(deadline, self.deadline)
+
+        limit = self.backend.max_chunk_bytes
+        by_lang = {}
+        for lang, text in items:
+            unique = by_lang.setdefault(lang, {})
+            if text not in unique:
+                unique[text] = _split_line(text, limit) if limit else [text]
+        english = {lang: {} for lang in by_lang}
+
+        chunks = [
+            (lang, chunk)
+            for lang, unique in by_lang.items()
+            for chunk in self._chunks(list(dict.fromkeys(piece for pieces in unique.values() for piece in pieces)))
+        ]
+        if self.backend.local:
+            outcomes = [(lang, chunk, self.backend.translate_many(lang, chunk)) for lang, chunk in chunks]
+        else:
+            futures = {
+                self._executor.submit(
+                    self.backend.translate_many, lang, chunk, self.request_timeout, started + deadline
+                ): (lang, chunk)
+                for lang, chunk in chunks
+            }
+            done, not_done = wait(futures, timeout=max(0.0, deadline - (time.monotonic() - started)))
+            for future in not_done:
+                future.cancel()
+                lang, chunk = futures[future]
+                self.last_errors.append(f"Translation deadline exceeded for {len(chunk)} {lang} line(s)")
+            outcomes = []
+            for future in done:
+                lang, chunk = futures[future]
+                try:
+                    outcomes.append((lang, chunk, future.result()))
+                except Exception as e:
+                    outcomes.append((lang, chunk, [TranslationResult.failed(e)] * len(chunk)))
+
+        for lang, chunk, results in outcomes:
+            errors = set()
+            for line, result in zip(chunk, results):
+                if result.text:
+                    english[lang][line] = result.text
+                elif result.error:
+                    errors.add(result.error)
+            self.last_errors.extend(f"Translation error for language {lang}: {error}" for error in sorted(errors))
+
+        translated = []
+        for lang, text in items:
+            parts = [english[lang].get(piece) for piece in by_lang[lang][text]]
+            translated.append(' '.join(parts) if parts and all(parts) else None)
+        return translated
+
+    def stats(self):
+        return self.backend.stats()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,7 +1,28 @@
 const express = require('express');
 const router = express.Router();
 const SentimentAnalysis = require('../models/SentimentAnalysis');
+const SentimentRollup = require('../models/SentimentRollup');
+const Agent = require('../models/Agent');
 const auth = require('../middleware/auth');
+const { fieldKey, rollupUpdate, sinceDay, summarize, dailySeries, leaderboard } = require('../services/rollups');
+const { searchIndex } = require('../services/searchIndex');
+
+searchIndex.start();
+
+const MAX_ROLLUP_DAYS = 366;
+
+// Analyses matching an agent/sentiment filter, summed from the rollups
+// instead of counting the history itself
+const rollupTotal = async (match, sentiment) => {
+  const field = sentiment ? `$sentiments.${fieldKey(sentiment)}` : '$count';
+  const [row] = await SentimentRollup.aggregate([
+    { $match: match },
+    { $group: { _id: null, total: { $sum: field } } }
+  ]);
+  return row ? row.total : 0;
+};
+
+const rollupDays = (days) => Math.min(MAX_ROLLUP_DAYS, Math.max(1, parseInt(days) || 30));
 
 // Get all analysis history for the authenticated agent
 router.get('/', auth, async (req, res) => {
@@ -18,10 +39,37 @@ router.get('/', auth, async (req, res) => {
   }
 });
 
-// Get analysis history with pagination and filters
+// Get analysis history with pagination and filters. q is a boolean text
+// query ("refund -cancel*", "late OR delay"); q, trend and emotion are
+// answered from the search index, newest first.
 router.get('/search', auth, async (req, res) => {
   try {
-    const { page = 1, limit = 10, sentiment, startDate, endDate, sortBy = 'createdAt', sortOrder = -1 } = req.query;
+    const { page = 1, limit = 10, sentiment, trend, emotion, q, startDate, endDate, sortBy = 'createdAt', sortOrder = -1 } = req.query;
+    
+    // Calculate pagination
+    const skip = (parseInt(page) - 1) * parseInt(limit);
+
+    if ((q || trend || emotion) && searchIndex.enabled) {
+      const { total, ids } = await searchIndex.search({
+        query: q,
+        facets: { agent: req.user.id, sentiment, trend, emotion },
+        createdFrom: startDate ? new Date(startDate).getTime() : undefined,
+        createdTo: endDate ? new Date(endDate).getTime() : undefined,
+        offset: skip,
+        limit: parseInt(limit)
+      });
+
+      // Fetch just this page, in the index's order
+      const found = await SentimentAnalysis.find({ _id: { $in: ids }, agent: req.user.id });
+      const byId = new Map(found.map((analysis) => [analysis._id.toString(), analysis]));
+
+      return res.json({
+        analyses: ids.map((id) => byId.get(id)).filter(Boolean),
+        totalPages: Math.ceil(total / parseInt(limit)),
+        currentPage: parseInt(page),
+        total
+      });
+    }
     
     const query = { agent: req.user.id };
     
@@ -29,6 +77,16 @@ router.get('/search', auth, async (req, res) => {
     if (sentiment) {
       query.sentiment = sentiment;
     }
+    if (trend) {
+      query['emotionalJourney.trend.direction'] = trend;
+    }
+    if (emotion) {
+      query['emotionalJourney.dominantEmotion'] = emotion;
+    }
+    // Without the index, text queries scan the agent's history
+    if (q) {
+      query.text = { $regex: q.replace(/[.*+?^${}()|[\]\\]/g, '\\$&'), $options: 'i' };
+    }
     
     // Add date range filter if provided
     if (startDate || endDate) {
@@ -41,9 +99,6 @@ router.get('/search', auth, async (req, res) => {
       }
     }
     
-    // Calculate pagination
-    const skip = (parseInt(page) - 1) * parseInt(limit);
-    
     // Create sort object
     const sort = {};
     sort[sortBy] = parseInt(sortOrder);
@@ -54,8 +109,11 @@ router.get('/search', auth, async (req, res) => {
       .skip(skip)
       .limit(parseInt(limit));
     
-    // Get total count for pagination
-    const total = await SentimentAnalysis.countDocuments(query);
+    // Get total count for pagination; rollups count by agent, day and
+    // sentiment, so other filters still count documents
+    const total = query.createdAt || trend || emotion || q
+      ? await SentimentAnalysis.countDocuments(query)
+      : await rollupTotal({ agent: req.user._id }, sentiment);
     
     res.json({
       analyses,
@@ -64,11 +122,31 @@ router.get('/search', auth, async (req, res) => {
       total
     });
   } catch (error) {
+    if (error.code === 'bad_query') {
+      return res.status(400).json({ message: error.message });
+    }
     console.error('Error searching analysis history:', error);
     res.status(500).json({ message: 'Server error' });
   }
 });
 
+// Daily statistics for the authenticated agent from the rollups
+router.get('/rollups', auth, async (req, res) => {
+  try {
+    const days = rollupDays(req.query.days);
+    const rollups = await SentimentRollup.find({ agent: req.user._id, day: { $gte: sinceDay(days) } }).lean();
+
+    res.json({
+      days,
+      summary: summarize(rollups),
+      daily: dailySeries(rollups)
+    });
+  } catch (error) {
+    console.error('Error fetching analysis rollups:', error);
+    res.status(500).json({ message: 'Server error' });
+  }
+});
+
 // Get a specific analysis by ID
 router.get('/:id', auth, async (req, res) => {
   try {
@@ -104,7 +182,7 @@ router.get('/admin/all', auth, async (req, res) => {
       .skip((parseInt(page) - 1) * parseInt(limit))
       .limit(parseInt(limit));
     
-    const total = await SentimentAnalysis.countDocuments();
+    const total = await rollupTotal({});
     
     res.json({
       analyses,
@@ -118,6 +196,58 @@ router.get('/admin/all', auth, async (req, res) => {
   }
 });
 
+// Admin route - Daily statistics across agents (or one, with ?agent=)
+router.get('/admin/rollups', auth, async (req, res) => {
+  try {
+    if (req.user.role !== 'admin') {
+      return res.status(403).json({ message: 'Access denied' });
+    }
+
+    const days = rollupDays(req.query.days);
+    const query = { day: { $gte: sinceDay(days) } };
+    if (req.query.agent) {
+      query.agent = req.query.agent;
+    }
+    const rollups = await SentimentRollup.find(query).lean();
+
+    res.json({
+      days,
+      summary: summarize(rollups),
+      daily: dailySeries(rollups)
+    });
+  } catch (error) {
+    console.error('Error fetching analysis rollups:', error);
+    res.status(500).json({ message: 'Server error' });
+  }
+});
+
+// Admin route - Agents ranked over the last ?days= days
+router.get('/admin/leaderboard', auth, async (req, res) => {
+  try {
+    if (req.user.role !== 'admin') {
+      return res.status(403).json({ message: 'Access denied' });
+    }
+
+    const { sortBy = 'score', minCount = 1 } = req.query;
+    const days = rollupDays(req.query.days);
+    const rollups = await SentimentRollup.find({ day: { $gte: sinceDay(days) } }).lean();
+    const ranking = leaderboard(rollups, { sortBy, minCount: parseInt(minCount) || 1 });
+
+    const agents = await Agent.find({ _id: { $in: ranking.map((entry) => entry.agent) } })
+      .select('name email department');
+    const agentsById = new Map(agents.map((agent) => [agent._id.toString(), agent]));
+
+    res.json({
+      days,
+      sortBy,
+      agents: ranking.map((entry) => ({ ...entry, agent: agentsById.get(entry.agent) || { _id: entry.agent } }))
+    });
+  } catch (error) {
+    console.error('Error fetching agent leaderboard:', error);
+    res.status(500).json({ message: 'Server error' });
+  }
+});
+
 // Delete an analysis (can only delete own analyses)
 router.delete('/:id', auth, async (req, res) => {
   try {
@@ -129,6 +259,13 @@ router.delete('/:id', auth, async (req, res) => {
     if (!analysis) {
       return res.status(404).json({ message: 'Analysis not found' });
     }
+
+    const { filter, update } = rollupUpdate(analysis, -1);
+    await SentimentRollup.updateOne(filter, update);
+    if (searchIndex.enabled) {
+      searchIndex.remove(analysis._id)
+        .catch((indexError) => console.error('Error removing analysis from search index:', indexError.message));
+    }
     
     res.json({ message: 'Analysis deleted successfully' });
   } catch (error) {
@@ -3,29 +3,51 @@ const router = express.Router();
 const { PythonShell } = require('python-shell');
 const path = require('path');
 const SentimentAnalysis = require('../models/SentimentAnalysis');
+const SentimentRollup = require('../models/SentimentRollup');
+const { rollupUpdate } = require('../services/rollups');
+const { searchIndex } = require('../services/searchIndex');
 const auth = require('../middleware/auth');
+const { pool } = require('../services/sentimentWorkerPool');
+const { SentimentSocketClient } = require('../services/sentimentSocketClient');
 
-// Function to check and install Python dependencies
+// Readiness self-check: confirms the Python packages are importable without
+// installing anything. Run `python3 setup_dependencies.py` manually to install.
 const checkDependencies = async () => {
   const options = {
     mode: 'json',
     pythonPath: 'python3',
-    scriptPath: path.join(__dirname, '../python_services')
+    scriptPath: path.join(__dirname, '../python_services'),
+    args: ['--check']
   };
 
   try {
-    await PythonShell.run('setup_dependencies.py', options);
+    const [status] = await PythonShell.run('setup_dependencies.py', options);
+    if (!status || !status.ready) {
+      console.error('Python dependencies missing:', status ? status.missing : 'unknown');
+    }
   } catch (error) {
-    console.error('Error installing dependencies:', error);
+    console.error('Error checking dependencies:', error);
   }
 };
 
 // Call this once when the server starts
 checkDependencies();
 
+// Long-lived analysis workers, so each request skips interpreter startup.
+// SENTIMENT_BACKEND=server uses one micro-batching analysis server instead.
+const sentimentPool = process.env.SENTIMENT_BACKEND === 'server'
+  ? new SentimentSocketClient()
+  : pool;
+sentimentPool.start();
+
+// Time budget for requests that don't send deadline_ms; 0 means none
+const DEFAULT_DEADLINE_MS = parseInt(process.env.SENTIMENT_DEADLINE_MS, 10) || 0;
+const SHED_STATUS = { overloaded: 503, deadline_exceeded: 504 };
+
 router.post('/analyze', auth, async (req, res) => {
   try {
-    const { text } = req.body;
+    const { text, timings, timeline, tier } = req.body;
+    const deadlineMs = Number(req.body.deadline_ms) || DEFAULT_DEADLINE_MS;
     
     if (!text) {
       return res.status(400).json({ 
@@ -51,27 +73,19 @@ router.post('/analyze', auth, async (req, res) => {
           emotional_range: {
             min: 0.000,
             max: 0.000
-          }
+          },
+          change_points: []
         },
         confidence: 0.000
       });
     }
 
-    let options = {
-      mode: 'json',
-      pythonPath: 'python3',
-      scriptPath: path.join(__dirname, '../python_services'),
-      args: [text]
-    };
-
     try {
-      const results = await PythonShell.run('sentiment_service.py', options);
-      if (!results || !results[0]) {
-        throw new Error('Invalid response from Python script');
+      const result = await sentimentPool.analyze(text, { timings, timeline, tier, deadlineMs });
+      if (!result) {
+        throw new Error('Invalid response from Python worker');
       }
       
-      const result = results[0];
-      
       // Check if there's an error in the result
       if (result.error) {
         return res.status(400).json(result);
@@ -108,10 +122,16 @@ router.post('/analyze', auth, async (req, res) => {
               emotionalRange: {
                 min: result.emotional_journey.emotional_range.min,
                 max: result.emotional_journey.emotional_range.max
-              }
+              },
+              changePoints: result.emotional_journey.change_points || []
             }
           };
 
+          // Downsampled, so its size doesn't grow with the call
+          if (result.timeline) {
+            analysisData.timeline = result.timeline;
+          }
+
           console.log('Analysis data prepared:', JSON.stringify(analysisData, null, 2));
 
           const analysis = new SentimentAnalysis(analysisData);
@@ -130,6 +150,16 @@ router.post('/analyze', auth, async (req, res) => {
           }
           
           console.log('Analysis saved successfully with ID:', savedAnalysis._id);
+
+          // Keep the dashboard aggregates current; the analysis itself is
+          // already stored, so a failed rollup only logs
+          const { filter, update } = rollupUpdate(savedAnalysis);
+          SentimentRollup.updateOne(filter, update, { upsert: true })
+            .catch((rollupError) => console.error('Error updating sentiment rollup:', rollupError.message));
+          if (searchIndex.enabled) {
+            searchIndex.add(savedAnalysis)
+              .catch((indexError) => console.error('Error indexing analysis:', indexError.message));
+          }
           
           // Add the saved analysis data to the result
           result.savedAnalysisId = savedAnalysis._id;
@@ -154,8 +184,14 @@ router.post('/analyze', auth, async (req, res) => {
       res.json(result);
     } catch (pythonError) {
       console.error('Python execution error:', pythonError);
-      res.status(500).json({
-        error: "Error processing sentiment analysis",
+      // Shed load quickly instead of letting latency grow
+      const status = SHED_STATUS[pythonError.code] || 500;
+      if (status === 503) {
+        res.set('Retry-After', '1');
+      }
+      res.status(status).json({
+        error: status === 500 ? "Error processing sentiment analysis" : pythonError.message,
+        code: pythonError.code,
         sentiment: "neutral",
         score: 0.000,
         emotional_journey: {
@@ -177,7 +213,8 @@ router.post('/analyze', auth, async (req, res) => {
           emotional_range: {
             min: 0.000,
             max: 0.000
-          }
+          },
+          change_points: []
         },
         confidence: 0.000
       });
@@ -214,4 +251,21 @@ router.post('/analyze', auth, async (req, res) => {
   }
 });
 
+// Cumulative counters and per-stage latency histograms from every worker;
+// admins only, as it exposes worker pids, queue depth and cache statistics
+router.get('/metrics', auth, async (req, res) => {
+  try {
+    if (req.user.role !== 'admin') {
+      return res.status(403).json({ message: 'Access denied' });
+    }
+
+    const body = await sentimentPool.metrics();
+    res.set('Content-Type', 'text/plain; version=0.0.4');
+    res.send(body);
+  } catch (error) {
+    console.error('Metrics error:', error);
+    res.status(500).send(`# error: ${error.message}\n`);
+  }
+});
+
 module.exports = router;
\ No newline at end of file
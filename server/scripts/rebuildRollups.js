@@ -0,0 +1,59 @@
+const mongoose = require('mongoose');
+const SentimentAnalysis = require('../models/SentimentAnalysis');
+const SentimentRollup = require('../models/SentimentRollup');
+const { rollupUpdate } = require('../services/rollups');
+const path = require('path');
+require('dotenv').config({ path: path.join(__dirname, '../.env') });
+
+const BATCH_SIZE = 1000;
+
+// Recompute every rollup from the stored analyses. Run once after deploying
+// rollups, and after bulk changes made outside the API (such as a
+// python_services/backfill.py re-score).
+const rebuildRollups = async () => {
+  try {
+    const uri = process.env.MONGODB_URI;
+    if (!uri) {
+      throw new Error('MONGODB_URI is not defined in environment variables');
+    }
+
+    console.log('Connecting to MongoDB...');
+    await mongoose.connect(uri);
+    console.log('Connected to MongoDB');
+
+    const { deletedCount } = await SentimentRollup.deleteMany({});
+    console.log(`Removed ${deletedCount} rollups`);
+
+    const cursor = SentimentAnalysis.find({})
+      .select('agent sentiment score confidence emotionalJourney.dominantEmotion createdAt')
+      .lean()
+      .cursor();
+
+    let operations = [];
+    let analyses = 0;
+    for await (const analysis of cursor) {
+      const { filter, update } = rollupUpdate(analysis);
+      operations.push({ updateOne: { filter, update, upsert: true } });
+      analyses += 1;
+      if (operations.length === BATCH_SIZE) {
+        await SentimentRollup.bulkWrite(operations, { ordered: false });
+        operations = [];
+        console.log(`${analyses} analyses rolled up`);
+      }
+    }
+    if (operations.length) {
+      await SentimentRollup.bulkWrite(operations, { ordered: false });
+    }
+
+    const rollups = await SentimentRollup.countDocuments();
+    console.log(`\nRolled up ${analyses} analyses into ${rollups} agent-days`);
+  } catch (error) {
+    console.error('Error:', error.message);
+    process.exitCode = 1;
+  } finally {
+    await mongoose.disconnect();
+    console.log('Disconnected from MongoDB');
+  }
+};
+
+rebuildRollups();
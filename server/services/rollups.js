@@ -0,0 +1,218 @@
+// Pre-aggregated analysis statistics per (agent, UTC day).
+//
+// Each saved analysis becomes one $inc on its rollup document: counts by
+// sentiment and dominant emotion, sums and sums of squares of score and
+// confidence, and one bin of a fixed-width score histogram. Every field is
+// a plain sum, so updates are O(1) and atomic, a delete is the same update
+// negated, and any set of rollups merges by adding them up. Means,
+// variances and quantiles are derived when read.
+
+// Scores lie in [-100, 100]; one-point bins bound quantile error to a point
+const SCORE_MIN = -100;
+const SCORE_MAX = 100;
+const SCORE_BIN_WIDTH = 1;
+const SCORE_BINS = (SCORE_MAX - SCORE_MIN) / SCORE_BIN_WIDTH;
+const QUANTILES = { p10: 0.1, p25: 0.25, p50: 0.5, p75: 0.75, p90: 0.9 };
+
+function dayKey(date) {
+  return new Date(date).toISOString().slice(0, 10);
+}
+
+// Days as YYYY-MM-DD keys compare in date order; days=1 means today only
+function sinceDay(days, now = new Date()) {
+  const since = new Date(now);
+  since.setUTCDate(since.getUTCDate() - Math.max(1, days) + 1);
+  return dayKey(since);
+}
+
+// Labels become field names, which may not contain '.' or start with '$'
+function fieldKey(label) {
+  return String(label || 'unknown').replace(/[.$]/g, '_');
+}
+
+function scoreBin(score) {
+  const bin = Math.floor((score - SCORE_MIN) / SCORE_BIN_WIDTH);
+  return Math.min(SCORE_BINS - 1, Math.max(0, bin));
+}
+
+// { filter, update } that adds (sign 1) or removes (sign -1) one analysis
+function rollupUpdate(analysis, sign = 1) {
+  const score = Number(analysis.score) || 0;
+  const confidence = Number(analysis.confidence) || 0;
+  const emotion = analysis.emotionalJourney && analysis.emotionalJourney.dominantEmotion;
+  return {
+    filter: { agent: analysis.agent, day: dayKey(analysis.createdAt || Date.now()) },
+    update: {
+      $inc: {
+        count: sign,
+        [`sentiments.${fieldKey(analysis.sentiment)}`]: sign,
+        [`emotions.${fieldKey(emotion)}`]: sign,
+        'score.sum': sign * score,
+        'score.sumSq': sign * score * score,
+        'confidence.sum': sign * confidence,
+        'confidence.sumSq': sign * confidence * confidence,
+        [`scoreBins.${scoreBin(score)}`]: sign
+      }
+    }
+  };
+}
+
+function addCounts(target, counts) {
+  for (const [key, value] of Object.entries(counts || {})) {
+    target[key] = (target[key] || 0) + value;
+  }
+}
+
+function emptyRollup() {
+  return {
+    count: 0,
+    sentiments: {},
+    emotions: {},
+    score: { sum: 0, sumSq: 0 },
+    confidence: { sum: 0, sumSq: 0 },
+    scoreBins: {}
+  };
+}
+
+// Sum rollup documents (plain objects, e.g. from .lean()) into one
+function mergeRollups(rollups) {
+  const merged = emptyRollup();
+  for (const rollup of rollups) {
+    merged.count += rollup.count || 0;
+    addCounts(merged.sentiments, rollup.sentiments);
+    addCounts(merged.emotions, rollup.emotions);
+    for (const metric of ['score', 'confidence']) {
+      merged[metric].sum += (rollup[metric] && rollup[metric].sum) || 0;
+      merged[metric].sumSq += (rollup[metric] && rollup[metric].sumSq) || 0;
+    }
+    addCounts(merged.scoreBins, rollup.scoreBins);
+  }
+  return merged;
+}
+
+function moments({ sum, sumSq }, count) {
+  if (count <= 0) {
+    return { mean: 0, variance: 0, stddev: 0 };
+  }
+  const mean = sum / count;
+  // Bounded values keep the sums well inside double precision; clamp the
+  // rounding noise left over when every value is equal
+  const variance = Math.max(0, sumSq / count - mean * mean);
+  return { mean, variance, stddev: Math.sqrt(variance) };
+}
+
+// Quantiles from the histogram, interpolating linearly inside a bin
+function quantiles(scoreBins, count) {
+  const bins = Object.entries(scoreBins || {})
+    .map(([bin, n]) => [Number(bin), n])
+    .filter(([, n]) => n > 0)
+    .sort((a, b) => a[0] - b[0]);
+  const result = {};
+  for (const [name, q] of Object.entries(QUANTILES)) {
+    if (count <= 0 || bins.length === 0) {
+      result[name] = 0;
+      continue;
+    }
+    const rank = q * count;
+    let seen = 0;
+    for (const [bin, n] of bins) {
+      if (seen + n >= rank) {
+        result[name] = SCORE_MIN + (bin + (rank - seen) / n) * SCORE_BIN_WIDTH;
+        break;
+      }
+      seen += n;
+    }
+    if (result[name] === undefined) {
+      result[name] = SCORE_MIN + (bins[bins.length - 1][0] + 1) * SCORE_BIN_WIDTH;
+    }
+  }
+  return result;
+}
+
+function round(value) {
+  return Math.round(value * 1000) / 1000;
+}
+
+function roundAll(values) {
+  return Object.fromEntries(Object.entries(values).map(([key, value]) => [key, round(value)]));
+}
+
+function dropZeros(counts) {
+  return Object.fromEntries(Object.entries(counts).filter(([, n]) => n !== 0));
+}
+
+// Dashboard figures for a set of rollups
+function summarize(rollups) {
+  const merged = mergeRollups(rollups);
+  return {
+    count: merged.count,
+    sentiments: dropZeros(merged.sentiments),
+    emotions: dropZeros(merged.emotions),
+    score: {
+      ...roundAll(moments(merged.score, merged.count)),
+      ...roundAll(quantiles(merged.scoreBins, merged.count))
+    },
+    confidence: roundAll(moments(merged.confidence, merged.count))
+  };
+}
+
+// One summary per day, oldest first
+function dailySeries(rollups) {
+  const days = new Map();
+  for (const rollup of rollups) {
+    if (!days.has(rollup.day)) {
+      days.set(rollup.day, []);
+    }
+    days.get(rollup.day).push(rollup);
+  }
+  return [...days.keys()].sort().map((day) => ({ day, ...summarize(days.get(day)) }));
+}
+
+const LEADERBOARD_KEYS = {
+  score: (entry) => entry.score.mean,
+  confidence: (entry) => entry.confidence.mean,
+  count: (entry) => entry.count,
+  positive: (entry) => entry.count ? positiveCount(entry.sentiments) / entry.count : 0
+};
+
+// Sentiment labels grade polarity ('slightly positive' ... 'extremely positive')
+function positiveCount(sentiments) {
+  return Object.entries(sentiments)
+    .filter(([label]) => label.endsWith('positive'))
+    .reduce((total, [, n]) => total + n, 0);
+}
+
+// Per-agent summaries ranked by sortBy; agents with fewer than minCount
+// analyses in the window are left out so one lucky call doesn't top it
+function leaderboard(rollups, { sortBy = 'score', minCount = 1 } = {}) {
+  const key = LEADERBOARD_KEYS[sortBy] || LEADERBOARD_KEYS.score;
+  const agents = new Map();
+  for (const rollup of rollups) {
+    const agent = String(rollup.agent);
+    if (!agents.has(agent)) {
+      agents.set(agent, []);
+    }
+    agents.get(agent).push(rollup);
+  }
+  return [...agents.entries()]
+    .map(([agent, agentRollups]) => ({ agent, ...summarize(agentRollups) }))
+    .filter((entry) => entry.count >= minCount)
+    .sort((a, b) => key(b) - key(a))
+    .map((entry, index) => ({ rank: index + 1, ...entry }));
+}
+
+module.exports = {
+  SCORE_MIN,
+  SCORE_MAX,
+  SCORE_BIN_WIDTH,
+  dayKey,
+  sinceDay,
+  fieldKey,
+  scoreBin,
+  rollupUpdate,
+  mergeRollups,
+  quantiles,
+  summarize,
+  dailySeries,
+  leaderboard
+};
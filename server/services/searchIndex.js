@@ -0,0 +1,59 @@
+const { SentimentWorkerPool } = require('./sentimentWorkerPool');
+
+// Full-text and facet index over analyzed transcripts, kept by one
+// long-lived `search_index.py serve` process (see python_services/search_index.py).
+// The index has a single writer, so the pool has a single worker; requests
+// are answered in the order they were sent, so a search sees every add
+// sent before it. SENTIMENT_SEARCH_INDEX=off disables it.
+class SearchIndexClient {
+  constructor(options = {}) {
+    this.enabled = !/^(off|0|false|none)$/i.test(process.env.SENTIMENT_SEARCH_INDEX || '');
+    this.pool = new SentimentWorkerPool({
+      size: 1,
+      scriptName: 'search_index.py',
+      scriptArgs: ['serve'],
+      requestTimeoutMs: 10000,
+      ...options
+    });
+  }
+
+  start() {
+    if (this.enabled) {
+      this.pool.start();
+    }
+    return this;
+  }
+
+  // analysis: a saved SentimentAnalysis document; re-adding an id replaces it
+  add(analysis) {
+    const document = typeof analysis.toJSON === 'function' ? analysis.toJSON() : analysis;
+    return this.pool.request({ op: 'add', document });
+  }
+
+  remove(id) {
+    return this.pool.request({ op: 'remove', key: String(id) });
+  }
+
+  // query: boolean terms ("refund -cancel*", "late OR delay"); facets maps
+  // sentiment, trend, emotion or agent to a value or a list of values.
+  // Resolves to { total, ids } with ids newest first.
+  search({ query = '', facets = {}, createdFrom, createdTo, offset = 0, limit = 20, facetCounts = false } = {}) {
+    const payload = { op: 'search', query, facets, offset, limit, facet_counts: facetCounts };
+    if (createdFrom !== undefined) {
+      payload.created_from = createdFrom;
+    }
+    if (createdTo !== undefined) {
+      payload.created_to = createdTo;
+    }
+    return this.pool.request(payload);
+  }
+
+  stop() {
+    this.pool.stop();
+  }
+}
+
+// Shared index used by the routes
+const searchIndex = new SearchIndexClient();
+
+module.exports = { searchIndex, SearchIndexClient };
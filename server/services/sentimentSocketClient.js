@@ -0,0 +1,246 @@
+const { spawn } = require('child_process');
+const net = require('net');
+const os = require('os');
+const path = require('path');
+const readline = require('readline');
+const { analysisError } = require('./sentimentWorkerPool');
+
+const SCRIPT_DIR = path.join(__dirname, '../python_services');
+const SCRIPT_NAME = 'sentiment_service.py';
+
+// Client for `sentiment_service.py server`, the asyncio analysis server that
+// micro-batches concurrent requests. Speaks the same newline-delimited JSON
+// as the worker pool, over one Unix socket connection. With `spawn` the
+// client starts and supervises the server itself; otherwise it connects to
+// one started elsewhere.
+class SentimentSocketClient {
+  constructor(options = {}) {
+    this.options = {
+      socketPath: process.env.SENTIMENT_SOCKET || path.join(os.tmpdir(), 'sentiment-analysis.sock'),
+      spawn: true,
+      pythonPath: 'python3',
+      scriptPath: SCRIPT_DIR,
+      requestTimeoutMs: 60000,
+      reconnectDelayMs: 1000,
+      // How late past its deadline a response may still be accepted
+      deadlineGraceMs: 500,
+      ...options
+    };
+    this.process = null;
+    this.socket = null;
+    this.connected = false;
+    this.pending = new Map();
+    this.queue = [];
+    this.nextId = 1;
+    this.restarts = 0;
+    this.stopped = false;
+  }
+
+  start() {
+    if (this.options.spawn) {
+      this.spawnServer();
+    } else {
+      this.connect();
+    }
+    return this;
+  }
+
+  spawnServer() {
+    const { pythonPath, scriptPath, socketPath } = this.options;
+    this.process = spawn(pythonPath, [SCRIPT_NAME, 'server', '--socket', socketPath], {
+      cwd: scriptPath,
+      stdio: ['ignore', 'pipe', 'pipe']
+    });
+
+    // The server prints a ready event once it is listening
+    readline.createInterface({ input: this.process.stdout }).on('line', (line) => {
+      try {
+        if (JSON.parse(line).event === 'ready') {
+          this.connect();
+        }
+      } catch (error) {
+        console.error('Sentiment server sent invalid JSON:', line);
+      }
+    });
+
+    this.process.stderr.on('data', (data) => {
+      console.error('Sentiment server stderr:', data.toString().trim());
+    });
+
+    this.process.on('error', (error) => {
+      console.error('Sentiment server failed to start:', error.message);
+    });
+
+    this.process.on('exit', (code, signal) => {
+      this.process = null;
+      if (this.stopped) {
+        return;
+      }
+      this.restarts += 1;
+      const delay = Math.min(1000 * 2 ** Math.min(this.restarts - 1, 5), 30000);
+      console.error(`Sentiment server exited (code ${code}, signal ${signal}), restarting in ${delay}ms`);
+      setTimeout(() => {
+        if (!this.stopped) {
+          this.spawnServer();
+        }
+      }, delay);
+    });
+  }
+
+  connect() {
+    const socket = net.createConnection(this.options.socketPath);
+    this.socket = socket;
+
+    socket.on('connect', () => {
+      this.connected = true;
+      this.restarts = 0;
+      this.flushQueue();
+    });
+
+    readline.createInterface({ input: socket })
+      .on('line', (line) => this.handleLine(line))
+      // readline re-emits socket errors, which the socket handler reports
+      .on('error', () => {});
+
+    socket.on('error', (error) => {
+      console.error('Sentiment server connection error:', error.message);
+    });
+
+    socket.on('close', () => {
+      this.connected = false;
+      this.socket = null;
+      for (const request of this.pending.values()) {
+        clearTimeout(request.timer);
+        request.reject(new Error('Sentiment server connection closed'));
+      }
+      this.pending.clear();
+
+      // A spawned server reconnects through its ready event after a restart
+      if (!this.stopped && (!this.options.spawn || this.process)) {
+        setTimeout(() => {
+          if (!this.stopped && !this.socket) {
+            this.connect();
+          }
+        }, this.options.reconnectDelayMs);
+      }
+    });
+  }
+
+  handleLine(line) {
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch (error) {
+      console.error('Sentiment server sent invalid JSON:', line);
+      return;
+    }
+
+    const request = this.pending.get(message.id);
+    if (!request) {
+      return;
+    }
+    this.pending.delete(message.id);
+    clearTimeout(request.timer);
+
+    if (message.error) {
+      request.reject(analysisError(message.error, message.code));
+    } else {
+      request.resolve(message.result);
+    }
+  }
+
+  flushQueue() {
+    while (this.connected && this.queue.length) {
+      this.write(this.queue.shift());
+    }
+  }
+
+  write(request) {
+    let { payload } = request;
+    if (request.deadlineAt) {
+      // The server queues and sheds load itself; only the budget left
+      // after waiting for the connection is passed on
+      const remaining = request.deadlineAt - Date.now();
+      if (remaining <= 0) {
+        clearTimeout(request.timer);
+        request.reject(analysisError('Deadline exceeded while queued', 'deadline_exceeded'));
+        return;
+      }
+      payload = { ...payload, deadline_ms: remaining };
+    }
+    request.id = this.nextId++;
+    this.pending.set(request.id, request);
+    this.socket.write(JSON.stringify({ id: request.id, ...payload }) + '\n');
+  }
+
+  request(payload, deadlineMs = null) {
+    return new Promise((resolve, reject) => {
+      const deadlineAt = deadlineMs ? Date.now() + deadlineMs : null;
+      let timeoutMs = this.options.requestTimeoutMs;
+      let timeoutError = analysisError(`Sentiment server timed out after ${timeoutMs}ms`);
+      if (deadlineAt) {
+        timeoutMs = Math.min(timeoutMs, deadlineMs + this.options.deadlineGraceMs);
+        timeoutError = analysisError('Deadline exceeded', 'deadline_exceeded');
+      }
+
+      // The clock starts here, so requests queued while the server is down
+      // or restarting time out too instead of waiting for the connection
+      const request = { payload, deadlineAt, resolve, reject, id: null };
+      request.timer = setTimeout(() => {
+        const queued = this.queue.indexOf(request);
+        if (queued !== -1) {
+          this.queue.splice(queued, 1);
+          reject(timeoutError);
+        } else if (this.pending.delete(request.id)) {
+          reject(timeoutError);
+        }
+      }, timeoutMs);
+
+      this.queue.push(request);
+      this.flushQueue();
+    });
+  }
+
+  analyze(text, options = {}) {
+    const payload = { op: 'analyze', text, timings: Boolean(options.timings) };
+    if (options.timeline) {
+      payload.timeline = options.timeline;
+    }
+    if (options.tier) {
+      payload.tier = options.tier;
+    }
+    return this.request(payload, options.deadlineMs || null);
+  }
+
+  metrics() {
+    return this.request({ op: 'metrics' });
+  }
+
+  status() {
+    return [{
+      pid: this.process ? this.process.pid : null,
+      socketPath: this.options.socketPath,
+      connected: this.connected,
+      pending: this.pending.size,
+      queued: this.queue.length,
+      restarts: this.restarts
+    }];
+  }
+
+  stop() {
+    this.stopped = true;
+    if (this.socket) {
+      this.socket.destroy();
+    }
+    if (this.process) {
+      this.process.kill('SIGTERM');
+    }
+    for (const { reject, timer } of this.queue) {
+      clearTimeout(timer);
+      reject(new Error('Sentiment server client stopped'));
+    }
+    this.queue = [];
+  }
+}
+
+module.exports = { SentimentSocketClient };
@@ -0,0 +1,349 @@
+const { spawn } = require('child_process');
+const readline = require('readline');
+const path = require('path');
+
+const SCRIPT_DIR = path.join(__dirname, '../python_services');
+const SCRIPT_NAME = 'sentiment_service.py';
+
+// Errors carry the worker's machine-readable code ('overloaded',
+// 'deadline_exceeded') so routes can map them to HTTP statuses
+function analysisError(message, code) {
+  const error = new Error(message);
+  if (code) {
+    error.code = code;
+  }
+  return error;
+}
+
+// A single long-lived `sentiment_service.py --serve` process.
+// Requests and responses are newline-delimited JSON correlated by id.
+class SentimentWorker {
+  constructor(pool, index) {
+    this.pool = pool;
+    this.index = index;
+    this.process = null;
+    this.ready = false;
+    this.pending = new Map();
+    this.nextId = 1;
+    this.restarts = 0;
+    this.lastPong = 0;
+    this.stopped = false;
+  }
+
+  start() {
+    const { pythonPath, scriptPath, scriptName, scriptArgs } = this.pool.options;
+
+    this.ready = false;
+    this.process = spawn(pythonPath, [scriptName, ...scriptArgs], {
+      cwd: scriptPath,
+      stdio: ['pipe', 'pipe', 'pipe']
+    });
+
+    const lines = readline.createInterface({ input: this.process.stdout });
+    lines.on('line', (line) => this.handleLine(line));
+
+    this.process.stderr.on('data', (data) => {
+      console.error(`Sentiment worker ${this.index} stderr:`, data.toString().trim());
+    });
+
+    this.process.on('error', (error) => {
+      console.error(`Sentiment worker ${this.index} failed to start:`, error.message);
+    });
+
+    this.process.on('exit', (code, signal) => this.handleExit(code, signal));
+  }
+
+  handleLine(line) {
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch (error) {
+      console.error(`Sentiment worker ${this.index} sent invalid JSON:`, line);
+      return;
+    }
+
+    if (message.event === 'ready') {
+      this.ready = true;
+      this.lastPong = Date.now();
+      this.pool.drainQueue();
+      return;
+    }
+
+    const request = this.pending.get(message.id);
+    if (!request) {
+      return;
+    }
+
+    this.pending.delete(message.id);
+    clearTimeout(request.timer);
+
+    if (message.error) {
+      request.reject(analysisError(message.error, message.code));
+    } else {
+      request.resolve(message.result);
+    }
+    this.pool.drainQueue();
+  }
+
+  handleExit(code, signal) {
+    this.ready = false;
+    this.process = null;
+
+    for (const request of this.pending.values()) {
+      clearTimeout(request.timer);
+      request.reject(new Error(`Sentiment worker exited (code ${code}, signal ${signal})`));
+    }
+    this.pending.clear();
+
+    if (this.stopped) {
+      return;
+    }
+
+    // Back off on repeated crashes so a broken environment doesn't spin
+    this.restarts += 1;
+    const delay = Math.min(1000 * 2 ** Math.min(this.restarts - 1, 5), 30000);
+    console.error(`Sentiment worker ${this.index} exited, restarting in ${delay}ms`);
+    setTimeout(() => {
+      if (!this.stopped) {
+        this.start();
+      }
+    }, delay);
+  }
+
+  send(payload, timeoutMs) {
+    return new Promise((resolve, reject) => {
+      if (!this.process || !this.ready) {
+        return reject(new Error('Sentiment worker is not ready'));
+      }
+
+      const id = this.nextId++;
+      const timer = setTimeout(() => {
+        if (this.pending.delete(id)) {
+          reject(new Error(`Sentiment worker timed out after ${timeoutMs}ms`));
+          // A worker that stops answering is wedged; kill it so it restarts
+          this.kill();
+        }
+      }, timeoutMs);
+
+      this.pending.set(id, { resolve, reject, timer });
+      this.process.stdin.write(JSON.stringify({ id, ...payload }) + '\n');
+    });
+  }
+
+  async ping() {
+    if (!this.ready) {
+      return;
+    }
+    try {
+      await this.send({ op: 'ping' }, this.pool.options.healthCheckTimeoutMs);
+      this.lastPong = Date.now();
+      this.restarts = 0;
+    } catch (error) {
+      console.error(`Sentiment worker ${this.index} failed health check:`, error.message);
+    }
+  }
+
+  kill() {
+    if (this.process) {
+      this.process.kill('SIGKILL');
+    }
+  }
+
+  stop() {
+    this.stopped = true;
+    this.kill();
+  }
+}
+
+function mergePrometheus(texts) {
+  const families = new Map();
+  for (const text of texts) {
+    let family = null;
+    for (const line of text.split('\n')) {
+      if (!line) {
+        continue;
+      }
+      const comment = line.match(/^# (HELP|TYPE) (\S+)/);
+      const name = comment ? comment[2] : family;
+      if (!families.has(name)) {
+        families.set(name, { comments: [], samples: [] });
+      }
+      const entry = families.get(name);
+      if (comment) {
+        family = name;
+        if (!entry.comments.includes(line)) {
+          entry.comments.push(line);
+        }
+      } else {
+        entry.samples.push(line);
+      }
+    }
+  }
+
+  let output = '';
+  for (const { comments, samples } of families.values()) {
+    output += [...comments, ...samples].map((line) => line + '\n').join('');
+  }
+  return output;
+}
+
+// Fixed-size pool of sentiment workers. Each worker pays the import and
+// lexicon-load cost once; requests go to the least busy ready worker.
+class SentimentWorkerPool {
+  constructor(options = {}) {
+    this.options = {
+      size: parseInt(process.env.SENTIMENT_WORKERS, 10) || 2,
+      pythonPath: 'python3',
+      scriptPath: SCRIPT_DIR,
+      // Any script speaking the same protocol, such as search_index.py serve
+      scriptName: SCRIPT_NAME,
+      scriptArgs: ['--serve'],
+      requestTimeoutMs: 60000,
+      // Requests queued or in flight before new ones are refused
+      maxQueue: parseInt(process.env.SENTIMENT_MAX_QUEUE, 10) || 100,
+      // How late past its deadline a response may still be accepted
+      deadlineGraceMs: 500,
+      healthCheckIntervalMs: 30000,
+      healthCheckTimeoutMs: 5000,
+      ...options
+    };
+    this.workers = [];
+    this.queue = [];
+    this.healthTimer = null;
+  }
+
+  start() {
+    if (this.workers.length) {
+      return this;
+    }
+
+    for (let i = 0; i < this.options.size; i++) {
+      const worker = new SentimentWorker(this, i);
+      worker.start();
+      this.workers.push(worker);
+    }
+
+    this.healthTimer = setInterval(() => {
+      this.workers.forEach((worker) => worker.ping());
+    }, this.options.healthCheckIntervalMs);
+    this.healthTimer.unref();
+
+    return this;
+  }
+
+  pickWorker() {
+    let best = null;
+    for (const worker of this.workers) {
+      if (worker.ready && (!best || worker.pending.size < best.pending.size)) {
+        best = worker;
+      }
+    }
+    return best;
+  }
+
+  drainQueue() {
+    while (this.queue.length) {
+      const worker = this.pickWorker();
+      if (!worker) {
+        return;
+      }
+      const { payload, deadlineAt, resolve, reject } = this.queue.shift();
+      let message = payload;
+
+      if (payload.op === 'analyze') {
+        // Requests already waiting on this worker; the worker downgrades
+        // the tier when it is backed up
+        message = { ...message, backlog: worker.pending.size };
+      }
+
+      if (deadlineAt === null) {
+        worker.send(message, this.options.requestTimeoutMs).then(resolve, reject);
+        continue;
+      }
+
+      const remaining = deadlineAt - Date.now();
+      if (remaining <= 0) {
+        reject(analysisError('Deadline exceeded while queued', 'deadline_exceeded'));
+        continue;
+      }
+
+      // Give up on the response, but not on the worker, once the deadline
+      // has passed; the worker plans its tier against the same budget
+      let timer;
+      const expired = new Promise((_, rejectExpired) => {
+        timer = setTimeout(
+          () => rejectExpired(analysisError('Deadline exceeded', 'deadline_exceeded')),
+          remaining + this.options.deadlineGraceMs
+        );
+      });
+      Promise.race([worker.send({ ...message, deadline_ms: remaining }, this.options.requestTimeoutMs), expired])
+        .then(resolve, reject)
+        .finally(() => clearTimeout(timer));
+    }
+  }
+
+  // Requests queued here plus those waiting inside the workers
+  backlog() {
+    return this.workers.reduce((total, worker) => total + worker.pending.size, this.queue.length);
+  }
+
+  request(payload, deadlineMs = null) {
+    return new Promise((resolve, reject) => {
+      if (payload.op === 'analyze' && this.backlog() >= this.options.maxQueue) {
+        return reject(analysisError('Sentiment analysis is overloaded, try again later', 'overloaded'));
+      }
+      const deadlineAt = deadlineMs ? Date.now() + deadlineMs : null;
+      this.queue.push({ payload, deadlineAt, resolve, reject });
+      this.drainQueue();
+    });
+  }
+
+  // options: timings, timeline, tier ('full', 'fast' or 'summary') and
+  // deadlineMs, the time budget for the whole request
+  analyze(text, options = {}) {
+    const payload = { op: 'analyze', text, timings: Boolean(options.timings) };
+    if (options.timeline) {
+      payload.timeline = options.timeline;
+    }
+    if (options.tier) {
+      payload.tier = options.tier;
+    }
+    return this.request(payload, options.deadlineMs || null);
+  }
+
+  // Prometheus text for every ready worker, merged so each metric family
+  // appears once. Samples carry a pid label, so they stay distinct.
+  async metrics() {
+    const workers = this.workers.filter((worker) => worker.ready);
+    const texts = await Promise.all(workers.map((worker) =>
+      worker.send({ op: 'metrics' }, this.options.healthCheckTimeoutMs).catch(() => '')
+    ));
+    return mergePrometheus(texts);
+  }
+
+  status() {
+    return this.workers.map((worker) => ({
+      index: worker.index,
+      pid: worker.process ? worker.process.pid : null,
+      ready: worker.ready,
+      pending: worker.pending.size,
+      restarts: worker.restarts,
+      lastPong: worker.lastPong
+    }));
+  }
+
+  stop() {
+    clearInterval(this.healthTimer);
+    this.workers.forEach((worker) => worker.stop());
+    this.workers = [];
+    for (const { reject } of this.queue) {
+      reject(new Error('Sentiment worker pool stopped'));
+    }
+    this.queue = [];
+  }
+}
+
+// Shared pool used by the routes
+const pool = new SentimentWorkerPool();
+
+module.exports = { pool, SentimentWorkerPool, mergePrometheus, analysisError };